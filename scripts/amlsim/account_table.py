@@ -0,0 +1,184 @@
+import numpy as np
+
+
+class Categories:
+    """Mapping between categorical values (e.g. country codes) and integer codes"""
+
+    def __init__(self):
+        self.values = list()
+        self.codes = dict()
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def decode(self, codes):
+        """Convert a code array to an object array of the values"""
+        return np.array(self.values, dtype=object)[codes] if self.values else np.array([], dtype=object)
+
+
+class AccountTable:
+    """Columnar account attribute table.
+    Each account is a row with typed NumPy columns: initial balance, categorical codes of
+    country, business type and bank ID, and a SAR flag. Normal models are kept only for
+    accounts which belong to them, and optional attributes of raw account lists are kept as lists.
+    """
+
+    def __init__(self, capacity=1024):
+        self.num_rows = 0
+        self.init_balance = np.zeros(capacity, dtype=np.float64)
+        self.country_code = np.zeros(capacity, dtype=np.int32)
+        self.business_code = np.zeros(capacity, dtype=np.int32)
+        self.bank_code = np.zeros(capacity, dtype=np.int32)
+        self.is_sar = np.zeros(capacity, dtype=bool)
+        self.countries = Categories()
+        self.businesses = Categories()
+        self.banks = Categories()
+        self.attrs = dict()  # Optional attribute name -> value list
+        self.normal_models = dict()  # Row -> list of NormalModel objects
+        self._ids = None  # Account IDs, only if they are not equal to the row numbers
+        self._index = None  # Account ID -> row, only if they are not equal to the row numbers
+
+    def __len__(self):
+        return self.num_rows
+
+    def __contains__(self, acct_id):
+        return self.row(acct_id) is not None
+
+    def _reserve(self, num):
+        """Extend the columns to store additional rows"""
+        required = self.num_rows + num
+        capacity = len(self.init_balance)
+        if required <= capacity:
+            return
+        capacity = max(required, capacity * 2)
+        for name in ("init_balance", "country_code", "business_code", "bank_code", "is_sar"):
+            column = getattr(self, name)
+            extended = np.zeros(capacity, dtype=column.dtype)
+            extended[:self.num_rows] = column[:self.num_rows]
+            setattr(self, name, extended)
+
+    def _append_ids(self, acct_ids):
+        if self._ids is None:
+            if isinstance(acct_ids, range) and acct_ids.start == self.num_rows and acct_ids.step == 1:
+                return  # Account IDs are still the row numbers
+            acct_ids = list(acct_ids)
+            if acct_ids == list(range(self.num_rows, self.num_rows + len(acct_ids))):
+                return
+            self._ids = list(range(self.num_rows))
+            self._index = {a: a for a in self._ids}
+        for acct_id in acct_ids:
+            self._index[acct_id] = len(self._ids)
+            self._ids.append(acct_id)
+
+    def add_accounts(self, acct_ids, init_balances, country, business, bank_id, **attr):
+        """Add accounts sharing the same country, business type and bank ID
+        :param acct_ids: Account IDs (range or list)
+        :param init_balances: Initial balance array
+        :param country: Country name
+        :param business: Business type
+        :param bank_id: Bank ID
+        :param attr: Optional attribute value lists
+        """
+        num = len(acct_ids)
+        self._reserve(num)
+        self._append_ids(acct_ids)
+        rows = slice(self.num_rows, self.num_rows + num)
+        self.init_balance[rows] = init_balances
+        self.country_code[rows] = self.countries.encode(country)
+        self.business_code[rows] = self.businesses.encode(business)
+        self.bank_code[rows] = self.banks.encode(bank_id)
+        self.is_sar[rows] = False
+        for name, values in attr.items():
+            self.attrs.setdefault(name, [None] * self.num_rows).extend(values)
+        self.num_rows += num
+        for values in self.attrs.values():
+            values.extend([None] * (self.num_rows - len(values)))
+
+    def add_account(self, acct_id, init_balance, country, business, bank_id, is_sar=False, **attr):
+        """Add an account
+        :param acct_id: Account ID
+        :param init_balance: Initial balance
+        :param country: Country name
+        :param business: Business type
+        :param bank_id: Bank ID
+        :param is_sar: SAR flag
+        :param attr: Optional attributes
+        """
+        self.add_accounts([acct_id], [init_balance], country, business, bank_id,
+                          **{k: [v] for k, v in attr.items()})
+        self.is_sar[self.num_rows - 1] = is_sar
+
+    def row(self, acct_id):
+        """Row number of an account (None if absent)"""
+        if self._index is not None:
+            return self._index.get(acct_id)
+        if isinstance(acct_id, (int, np.integer)) and 0 <= acct_id < self.num_rows:
+            return int(acct_id)
+        return None
+
+    def _existing_row(self, acct_id):
+        row = self.row(acct_id)
+        if row is None:
+            raise KeyError("Account %s does not exist" % str(acct_id))
+        return row
+
+    def acct_ids(self):
+        """Account IDs in the row order"""
+        return list(range(self.num_rows)) if self._ids is None else self._ids
+
+    def bank_id(self, acct_id):
+        return self.banks.values[self.bank_code[self._existing_row(acct_id)]]
+
+    def set_sar(self, acct_id, is_sar=True):
+        self.is_sar[self._existing_row(acct_id)] = is_sar
+
+    def set_sars(self, acct_ids, is_sar=True):
+        """Set the SAR flags of accounts at once
+        :param acct_ids: Account ID array
+        :param is_sar: SAR flag
+        """
+        acct_ids = np.asarray(acct_ids)
+        if self._index is None and acct_ids.dtype.kind in "iu":
+            absent = (acct_ids < 0) | (acct_ids >= self.num_rows)
+            if absent.any():
+                raise KeyError("Account %s does not exist" % str(acct_ids[absent][0]))
+            self.is_sar[acct_ids] = is_sar
+        else:
+            self.is_sar[[self._existing_row(acct_id) for acct_id in acct_ids.tolist()]] = is_sar
+
+    def attr(self, acct_id, name):
+        return self.attrs[name][self._existing_row(acct_id)]
+
+    def to_dict(self, acct_id):
+        """Attributes of an account as a dict (the former per-node attribute dict)"""
+        row = self._existing_row(acct_id)
+        attr = {"init_balance": float(self.init_balance[row]),
+                "country": self.countries.values[self.country_code[row]],
+                "business": self.businesses.values[self.business_code[row]],
+                "bank_id": self.banks.values[self.bank_code[row]],
+                "is_sar": bool(self.is_sar[row])}
+        for name, values in self.attrs.items():
+            attr[name] = values[row]
+        return attr
+
+    def bank_accounts(self):
+        """Account IDs for each bank
+        :return: Dict of bank ID and account ID array
+        """
+        ids = np.arange(self.num_rows) if self._ids is None else np.array(self._ids, dtype=object)
+        codes = self.bank_code[:self.num_rows]
+        return {bank_id: ids[codes == code] for code, bank_id in enumerate(self.banks.values)}
+
+    def add_normal_model(self, acct_id, normal_model):
+        self.normal_models.setdefault(self._existing_row(acct_id), list()).append(normal_model)
+
+    def get_normal_models(self, acct_id):
+        return self.normal_models.get(self.row(acct_id), [])
@@ -0,0 +1,326 @@
+from array import array
+from collections import OrderedDict
+
+import networkx as nx
+import numpy as np
+
+from amlsim.account_table import Categories
+
+
+# One row per alert
+ALERT_DTYPE = np.dtype([
+    ("model_id", np.int32),  # AML typology model ID
+    ("reason", np.int32),  # Code of the typology name
+    ("schedule", np.int32),  # Transaction schedule model ID
+    ("start", np.int64),  # Start step
+    ("end", np.int64),  # End step (inclusive)
+    ("main", np.int64),  # Position of the main account in the member arrays
+    ("is_sar", np.bool_),  # SAR flag
+])
+
+
+class PendingAlert:
+    """Members and transactions of an AML typology being generated.
+    It keeps the order of accounts in which they first appear as members or transaction endpoints,
+    and the amount ranges of the accounts as transactions are added.
+    """
+
+    def __init__(self, model_id, reason, schedule, start, end):
+        """
+        :param model_id: AML typology model ID
+        :param reason: AML typology name
+        :param schedule: Transaction schedule model ID
+        :param start: Start step
+        :param end: End step (inclusive)
+        """
+        self.model_id = model_id
+        self.reason = reason
+        self.schedule = schedule
+        self.start = start
+        self.end = end
+        self.accts = OrderedDict()  # Account ID -> whether it is a member (False for e.g. external account -1)
+        self.edges = OrderedDict()  # (originator, beneficiary) -> (amount, date)
+        self.ranges = dict()  # Account ID -> [min, max] amounts (None if an amount was overwritten)
+
+    def add_member(self, acct):
+        self.accts[acct] = True
+
+    def has_edge(self, orig, bene):
+        return (orig, bene) in self.edges
+
+    def add_edge(self, orig, bene, amount, date):
+        """Add a transaction (the amount and date of an existing transaction are overwritten)
+        """
+        if self.ranges is not None:
+            if (orig, bene) in self.edges:
+                self.ranges = None  # Aggregated again when the alert is stored
+            else:
+                update_amount_range(self.ranges, orig, amount)
+                update_amount_range(self.ranges, bene, amount)
+        self.accts.setdefault(orig, False)
+        self.accts.setdefault(bene, False)
+        self.edges[(orig, bene)] = (amount, date)
+
+    def amount_ranges(self):
+        """
+        :return: Account ID -> [min, max] amounts of the transactions
+        """
+        if self.ranges is None:
+            self.ranges = dict()
+            for (orig, bene), (amount, _) in self.edges.items():
+                update_amount_range(self.ranges, orig, amount)
+                update_amount_range(self.ranges, bene, amount)
+        return self.ranges
+
+
+def update_amount_range(ranges, acct, amount):
+    """Update the minimum and maximum transaction amounts of an account
+    :param ranges: Account ID -> [min, max] amount dict
+    :param acct: Account ID
+    :param amount: Transaction amount
+    """
+    amount_range = ranges.get(acct)
+    if amount_range is None:
+        ranges[acct] = [amount, amount]
+    elif amount < amount_range[0]:
+        amount_range[0] = amount
+    elif amount > amount_range[1]:
+        amount_range[1] = amount
+
+
+class AlertStore:
+    """Compact store of AML typology alerts.
+    Alerts are rows of a structured array, and their members (with min/max amounts) and transactions
+    are kept in flat arrays with offsets. Alert IDs are the row numbers.
+    networkx subgraphs of alerts are built on demand for tools which need them.
+    """
+
+    def __init__(self, accounts=None, capacity=1024):
+        """
+        :param accounts: AccountTable to add account attributes to the subgraph views
+        :param capacity: Initial number of alert rows
+        """
+        self.accounts = accounts
+        self.num_rows = 0
+        self.rows = np.zeros(capacity, dtype=ALERT_DTYPE)
+        self.reasons = Categories()
+        self.members = list()  # Member account IDs
+        self.min_amounts = array("d")  # Minimum transaction amount of each member
+        self.max_amounts = array("d")  # Maximum transaction amount of each member
+        self.member_offsets = array("q", [0])
+        self.edge_src = list()  # Originator account IDs
+        self.edge_dst = list()  # Beneficiary account IDs
+        self.edge_amounts = array("d")
+        self.edge_dates = array("q")
+        self.edge_offsets = array("q", [0])
+
+    def __len__(self):
+        return self.num_rows
+
+    def __contains__(self, alert_id):
+        return isinstance(alert_id, (int, np.integer)) and 0 <= alert_id < self.num_rows
+
+    def __iter__(self):
+        return iter(range(self.num_rows))
+
+    def __getitem__(self, alert_id):
+        if alert_id not in self:
+            raise KeyError(alert_id)
+        return self.subgraph(alert_id)
+
+    def keys(self):
+        return range(self.num_rows)
+
+    def values(self):
+        return (self.subgraph(i) for i in range(self.num_rows))
+
+    def items(self):
+        return ((i, self.subgraph(i)) for i in range(self.num_rows))
+
+    def add(self, alert, main_acct, is_sar):
+        """Store an alert
+        :param alert: PendingAlert object
+        :param main_acct: Main account ID (it must be a member)
+        :param is_sar: Whether the alert is SAR
+        :return: Alert ID
+        """
+        members = [acct for acct, is_member in alert.accts.items() if is_member]
+        if main_acct not in alert.accts or not alert.accts[main_acct]:
+            raise ValueError("Main account %s is not a member of the alert" % str(main_acct))
+        ranges = alert.amount_ranges()
+        for acct in members:
+            if acct not in ranges:
+                raise ValueError("Alert member %s has no transactions" % str(acct))
+
+        if self.num_rows == len(self.rows):
+            self.rows = np.concatenate([self.rows, np.zeros(len(self.rows), dtype=ALERT_DTYPE)])
+        alert_id = self.num_rows
+        self.rows[alert_id] = (alert.model_id, self.reasons.encode(alert.reason), alert.schedule,
+                               alert.start, alert.end, len(self.members) + members.index(main_acct), is_sar)
+        self.num_rows += 1
+
+        self.members.extend(members)
+        self.min_amounts.extend(ranges[acct][0] for acct in members)
+        self.max_amounts.extend(ranges[acct][1] for acct in members)
+        self.member_offsets.append(len(self.members))
+        for (orig, bene), (amount, date) in alert.edges.items():
+            self.edge_src.append(orig)
+            self.edge_dst.append(bene)
+            self.edge_amounts.append(amount)
+            self.edge_dates.append(date)
+        self.edge_offsets.append(len(self.edge_src))
+        return alert_id
+
+    def add_alerts(self, model_id, reason, schedule, starts, ends, is_sar, members, member_counts, mains,
+                   src, dst, amounts, dates, edge_counts):
+        """Store alerts of the same typology at once. Members of each alert are contiguous in the member array,
+        and transactions are grouped by alert with their endpoints given as positions in the member array.
+        :param model_id: AML typology model ID
+        :param reason: AML typology name
+        :param schedule: Transaction schedule model ID
+        :param starts: Start step of each alert
+        :param ends: End step (inclusive) of each alert
+        :param is_sar: Whether the alerts are SAR
+        :param members: Member account ID array
+        :param member_counts: Number of members of each alert
+        :param mains: Position of the main account of each alert in the member array
+        :param src: Member position of the originator of each transaction
+        :param dst: Member position of the beneficiary of each transaction
+        :param amounts: Transaction amount array
+        :param dates: Transaction timestamp array
+        :param edge_counts: Number of transactions of each alert
+        :return: Alert IDs (range)
+        """
+        num = len(member_counts)
+        member_counts = np.asarray(member_counts, dtype=np.int64)
+        edge_counts = np.asarray(edge_counts, dtype=np.int64)
+        mains = np.asarray(mains, dtype=np.int64)
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        member_offsets = np.cumsum(member_counts)
+        edge_offsets = np.cumsum(edge_counts)
+        member_alerts = np.repeat(np.arange(num), member_counts)
+        edge_alerts = np.repeat(np.arange(num), edge_counts)
+        if ((mains < member_offsets - member_counts) | (mains >= member_offsets)).any():
+            raise ValueError("Main accounts must be members of the alerts")
+        if (member_alerts[src] != edge_alerts).any() or (member_alerts[dst] != edge_alerts).any():
+            raise ValueError("Transactions must be between members of the alerts")
+        min_amounts = np.full(len(members), np.inf)
+        max_amounts = np.full(len(members), -np.inf)
+        for endpoints in (src, dst):
+            np.minimum.at(min_amounts, endpoints, amounts)
+            np.maximum.at(max_amounts, endpoints, amounts)
+        no_tx = np.flatnonzero(min_amounts == np.inf)
+        if len(no_tx) > 0:
+            raise ValueError("Alert member %s has no transactions" % str(members[no_tx[0]]))
+
+        begin = self.num_rows
+        if begin + num > len(self.rows):
+            capacity = max(begin + num, 2 * len(self.rows))
+            self.rows = np.concatenate([self.rows, np.zeros(capacity - len(self.rows), dtype=ALERT_DTYPE)])
+        rows = self.rows[begin:begin + num]
+        rows["model_id"] = model_id
+        rows["reason"] = self.reasons.encode(reason)
+        rows["schedule"] = schedule
+        rows["start"] = starts
+        rows["end"] = ends
+        rows["main"] = len(self.members) + mains
+        rows["is_sar"] = is_sar
+        self.num_rows += num
+
+        members = np.asarray(members)
+        self.member_offsets.frombytes((len(self.members) + member_offsets).astype(np.int64).tobytes())
+        self.members.extend(members.tolist())
+        self.min_amounts.frombytes(min_amounts.tobytes())
+        self.max_amounts.frombytes(max_amounts.tobytes())
+        self.edge_offsets.frombytes((len(self.edge_src) + edge_offsets).astype(np.int64).tobytes())
+        self.edge_src.extend(members[src].tolist())
+        self.edge_dst.extend(members[dst].tolist())
+        self.edge_amounts.frombytes(amounts.tobytes())
+        self.edge_dates.frombytes(np.asarray(dates, dtype=np.int64).tobytes())
+        return range(begin, begin + num)
+
+    def extend(self, other, acct_map=None):
+        """Append all alerts of another store (e.g. one generated for a single bank)
+        :param other: AlertStore object
+        :param acct_map: Account ID array to translate the non-negative account IDs of the other store
+        (e.g. bank-local IDs to global ones). Other account IDs (e.g. external account -1) are kept.
+        :return: Alert IDs of the appended alerts
+        """
+        def translate(accts):
+            if acct_map is None:
+                return accts
+            return [int(acct_map[acct]) if isinstance(acct, (int, np.integer)) and acct >= 0 else acct
+                    for acct in accts]
+
+        num = len(other)
+        begin = self.num_rows
+        if begin + num > len(self.rows):
+            capacity = max(begin + num, 2 * len(self.rows))
+            self.rows = np.concatenate([self.rows, np.zeros(capacity - len(self.rows), dtype=ALERT_DTYPE)])
+        rows = other.rows[:num].copy()
+        rows["reason"] = [self.reasons.encode(reason) for reason in other.reasons.decode(rows["reason"])]
+        rows["main"] += len(self.members)
+        self.rows[begin:begin + num] = rows
+        self.num_rows += num
+
+        member_offset = len(self.members)
+        edge_offset = len(self.edge_src)
+        self.members.extend(translate(other.members))
+        self.min_amounts.extend(other.min_amounts)
+        self.max_amounts.extend(other.max_amounts)
+        self.member_offsets.extend(offset + member_offset for offset in other.member_offsets[1:])
+        self.edge_src.extend(translate(other.edge_src))
+        self.edge_dst.extend(translate(other.edge_dst))
+        self.edge_amounts.extend(other.edge_amounts)
+        self.edge_dates.extend(other.edge_dates)
+        self.edge_offsets.extend(offset + edge_offset for offset in other.edge_offsets[1:])
+        return range(begin, begin + num)
+
+    def row(self, alert_id):
+        """
+        :return: Record of the alert (model_id, reason, schedule, start, end, main, is_sar)
+        """
+        return self.rows[alert_id]
+
+    def reason(self, alert_id):
+        return self.reasons.values[self.rows[alert_id]["reason"]]
+
+    def main_acct(self, alert_id):
+        return self.members[self.rows[alert_id]["main"]]
+
+    def main_accts(self):
+        """
+        :return: Main account ID list of all alerts
+        """
+        return [self.members[i] for i in self.rows["main"][:self.num_rows].tolist()]
+
+    def member_range(self, alert_id):
+        """
+        :return: Begin and end positions of the alert members in the member arrays
+        """
+        return self.member_offsets[alert_id], self.member_offsets[alert_id + 1]
+
+    def edge_range(self, alert_id):
+        """
+        :return: Begin and end positions of the alert transactions in the edge arrays
+        """
+        return self.edge_offsets[alert_id], self.edge_offsets[alert_id + 1]
+
+    def subgraph(self, alert_id):
+        """Build a transaction subgraph of an alert with the same attributes as the generator used to keep
+        :param alert_id: Alert ID
+        :return: networkx DiGraph
+        """
+        row = self.rows[alert_id]
+        g = nx.DiGraph(model_id=int(row["model_id"]), reason=self.reason(alert_id),
+                       scheduleID=int(row["schedule"]), start=int(row["start"]), end=int(row["end"]),
+                       main_acct=self.main_acct(alert_id), is_sar=bool(row["is_sar"]))
+        begin, end = self.member_range(alert_id)
+        for acct in self.members[begin:end]:
+            g.add_node(acct, self.accounts.to_dict(acct) if self.accounts is not None else dict())
+        begin, end = self.edge_range(alert_id)
+        for e in range(begin, end):
+            g.add_edge(self.edge_src[e], self.edge_dst[e], amount=self.edge_amounts[e], date=self.edge_dates[e])
+        return g
@@ -0,0 +1,206 @@
+import random
+from itertools import islice
+
+import numpy as np
+
+
+class BankCapacityIndex:
+    """Number of typology member candidates of each bank, which answers random choices of banks
+    with enough candidates in O(log B) instead of scanning all B banks.
+    Banks are kept in the order of the bank pools (dict insertion order), and for each queried threshold,
+    a Fenwick tree over the banks counts those with at least the threshold candidates.
+    Choices use the given random.Random object (the global `random` module by default) and draw the same numbers
+    as random.choice/random.sample over the list of the matching bank IDs, so the results do not change
+    with the index.
+    Bulk choices for all typologies of an alert parameter row (choices, samples) are vectorized with NumPy.
+    """
+
+    def __init__(self, pools):
+        """
+        :param pools: Bank ID -> typology member candidates (IndexedPool)
+        """
+        self.pools = pools
+        self.bank_ids = list()  # Bank IDs in the order of the pools
+        self.positions = dict()  # Bank ID -> position
+        self.capacities = list()  # Number of candidates of each bank
+        self.trees = dict()  # Threshold -> Fenwick tree (1-based list) of banks with at least threshold candidates
+        self.counts = dict()  # Threshold -> number of banks with at least threshold candidates
+
+    def __len__(self):
+        self.sync()
+        return len(self.bank_ids)
+
+    def sync(self):
+        """Register banks added to the pools since the last call"""
+        if len(self.pools) > len(self.bank_ids):
+            for bank_id in islice(self.pools, len(self.bank_ids), None):
+                self.positions[bank_id] = len(self.bank_ids)
+                self.bank_ids.append(bank_id)
+                self.capacities.append(len(self.pools[bank_id]))
+            self.trees = dict()  # Rebuilt on demand
+            self.counts = dict()
+
+    def ids(self):
+        """
+        :return: List of all bank IDs in the order of the pools (must not be modified)
+        """
+        self.sync()
+        return self.bank_ids
+
+    def update(self, bank_id):
+        """Update the number of candidates of a bank after its pool changed
+        :param bank_id: Bank ID
+        """
+        pos = self.positions.get(bank_id)
+        if pos is None:
+            self.sync()
+            return
+        old = self.capacities[pos]
+        new = len(self.pools[bank_id])
+        if old == new:
+            return
+        self.capacities[pos] = new
+        lo, hi = min(old, new), max(old, new)
+        delta = 1 if new > old else -1
+        if hi - lo < len(self.trees):
+            thresholds = [k for k in range(lo + 1, hi + 1) if k in self.trees]
+        else:
+            thresholds = [k for k in self.trees if lo < k <= hi]
+        for k in thresholds:  # Banks whose indicator "at least k candidates" flips
+            tree = self.trees[k]
+            i = pos + 1
+            while i < len(tree):
+                tree[i] += delta
+                i += i & -i
+            self.counts[k] += delta
+
+    def _tree(self, threshold):
+        tree = self.trees.get(threshold)
+        if tree is None:
+            n = len(self.capacities)
+            tree = [0] + [1 if c >= threshold else 0 for c in self.capacities]
+            self.counts[threshold] = sum(tree)
+            for i in range(1, n + 1):  # Linear-time construction
+                j = i + (i & -i)
+                if j <= n:
+                    tree[j] += tree[i]
+            self.trees[threshold] = tree
+        return tree
+
+    @staticmethod
+    def _prefix(tree, pos):
+        """Number of matching banks before the position"""
+        total = 0
+        while pos > 0:
+            total += tree[pos]
+            pos -= pos & -pos
+        return total
+
+    @staticmethod
+    def _find(tree, rank):
+        """Position of the matching bank of the rank (0-based)"""
+        pos = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step > 0:
+            nxt = pos + step
+            if nxt < len(tree) and tree[nxt] <= rank:
+                pos = nxt
+                rank -= tree[nxt]
+            step >>= 1
+        return pos
+
+    def choice(self, num, exclude=None, rand=random):
+        """Choose a bank with at least the specified number of candidates randomly
+        :param num: Minimum number of candidates (0 for all banks)
+        :param exclude: Bank ID to be excluded
+        :param rand: random.Random object (default: the global random module)
+        :return: Bank ID, or None if not found
+        """
+        self.sync()
+        tree = self._tree(num)
+        count = self.counts[num]
+        pos = self.positions.get(exclude)
+        excluded = pos is not None and self.capacities[pos] >= num
+        if count - excluded <= 0:
+            return None
+        rank = rand.randrange(count - excluded)
+        if excluded and rank >= self._prefix(tree, pos):
+            rank += 1
+        return self.bank_ids[self._find(tree, rank)]
+
+    def sample(self, k, rand=random):
+        """Choose k distinct banks randomly (regardless of the numbers of candidates)
+        :param k: Number of banks
+        :param rand: random.Random object (default: the global random module)
+        :return: List of bank IDs
+        """
+        self.sync()
+        return [self.bank_ids[i] for i in rand.sample(range(len(self.bank_ids)), k)]
+
+    def choices(self, nums, excludes=None, np_rand=np.random):
+        """Choose a bank with enough candidates for each typology at once.
+        Candidates of the chosen banks are reserved for the typologies, so a bank is not chosen by more typologies
+        than its candidates can fill: typologies exceeding the capacity of their bank choose again among
+        the remaining capacities (the pools are not changed; update them after taking the members).
+        :param nums: Number of candidates required by each typology
+        :param excludes: Bank ID to be excluded for each typology (None for no exclusion)
+        :param np_rand: np.random.RandomState object (default: the global np.random module)
+        :return: Object array of the bank IDs (None if not found)
+        """
+        self.sync()
+        nums = np.asarray(nums, dtype=np.int64)
+        chosen = np.full(len(nums), -1, dtype=np.int64)
+        capacities = np.array(self.capacities, dtype=np.int64)
+        excluded_pos = np.full(len(nums), -1, dtype=np.int64)
+        if excludes is not None:
+            excluded_pos[:] = [self.positions.get(bank_id, -1) for bank_id in excludes]
+        pending = np.arange(len(nums))
+        while len(pending) > 0 and len(capacities) > 0:
+            order = np.argsort(-capacities, kind="stable")  # Banks in descending order of the capacities
+            ranks = np.empty(len(order), dtype=np.int64)
+            ranks[order] = np.arange(len(order))
+            # Banks with enough candidates are a prefix of the order
+            counts = np.searchsorted(-capacities[order], -nums[pending], side="right")
+            excluded_rank = np.where(excluded_pos[pending] >= 0, ranks[excluded_pos[pending]], len(order))
+            excluded = excluded_rank < counts
+            available = counts - excluded
+            found = available > 0
+            pending, available, excluded, excluded_rank = \
+                pending[found], available[found], excluded[found], excluded_rank[found]
+            if len(pending) == 0:
+                break
+            rank = np.minimum((np_rand.random_sample(len(pending)) * available).astype(np.int64), available - 1)
+            rank += excluded & (rank >= excluded_rank)
+            banks = order[rank]
+
+            # Accept the typologies in order while the chosen banks have enough candidates
+            by_bank = np.argsort(banks, kind="stable")
+            demands = np.cumsum(nums[pending][by_bank])
+            group_starts = np.flatnonzero(np.r_[True, banks[by_bank][1:] != banks[by_bank][:-1]])
+            group_sizes = np.diff(np.r_[group_starts, len(by_bank)])
+            demands -= np.repeat(demands[group_starts] - nums[pending][by_bank][group_starts], group_sizes)
+            accepted = np.zeros(len(pending), dtype=bool)
+            accepted[by_bank] = demands <= capacities[banks[by_bank]]
+            chosen[pending[accepted]] = banks[accepted]
+            capacities -= np.bincount(banks[accepted], nums[pending][accepted], len(capacities)).astype(np.int64)
+            pending = pending[~accepted]
+        bank_ids = np.array(self.bank_ids + [None], dtype=object)
+        return bank_ids[chosen]
+
+    def samples(self, k, num, np_rand=np.random):
+        """Choose k distinct banks randomly (regardless of the numbers of candidates) for each typology at once
+        :param k: Number of banks of a typology
+        :param num: Number of typologies
+        :param np_rand: np.random.RandomState object (default: the global np.random module)
+        :return: Object array of the bank IDs (shape: num x k)
+        """
+        self.sync()
+        if k > len(self.bank_ids):
+            raise ValueError("Sample larger than population or is negative")
+        chosen = np.zeros((num, k), dtype=np.int64)
+        for j in range(k):
+            rank = np_rand.randint(0, len(self.bank_ids) - j, num)
+            for prev in np.sort(chosen[:, :j], axis=1).T:  # Skip the banks already chosen in ascending order
+                rank += rank >= prev
+            chosen[:, j] = rank
+        return np.array(self.bank_ids, dtype=object)[chosen]
@@ -0,0 +1,129 @@
+import logging
+
+import numpy as np
+
+from amlsim.degree_sequence import remove_stubs
+from amlsim.sampling import AliasSampler
+
+
+logger = logging.getLogger(__name__)
+
+BASE_MODEL_TYPES = ("powerlaw",)  # Degree distributions of the base transaction graph sampled in-process
+POWERLAW_KEYS = ("type", "exponent", "min_degree", "max_degree", "mean_degree")
+DEFAULT_EXPONENT = 2.0
+MAX_EXPONENT = 10.0  # Upper bound of the exponent fitted to a mean degree
+
+
+def powerlaw_pmf(exponent, min_degree, max_degree):
+    """
+    :param exponent: Exponent of the power law (P(k) is proportional to k ** -exponent)
+    :param min_degree: Minimum degree (positive)
+    :param max_degree: Maximum degree
+    :return: Probability array of the degrees from min_degree to max_degree
+    """
+    degrees = np.arange(min_degree, max_degree + 1, dtype=np.float64)
+    weights = np.exp(-exponent * (np.log(degrees) - np.log(min_degree)))  # Scaled to avoid underflow
+    return weights / weights.sum()
+
+
+def powerlaw_mean(exponent, min_degree, max_degree):
+    return float(np.dot(powerlaw_pmf(exponent, min_degree, max_degree), np.arange(min_degree, max_degree + 1)))
+
+
+def fit_powerlaw_exponent(mean_degree, min_degree, max_degree, tolerance=1e-6):
+    """Find the exponent of a truncated power law with the mean degree by bisection
+    (the mean decreases as the exponent increases)
+    :param mean_degree: Target mean degree
+    :param min_degree: Minimum degree
+    :param max_degree: Maximum degree
+    :return: Exponent in [0, MAX_EXPONENT]
+    """
+    upper = powerlaw_mean(0.0, min_degree, max_degree)
+    lower = powerlaw_mean(MAX_EXPONENT, min_degree, max_degree)
+    if not lower <= mean_degree <= upper:
+        raise ValueError("Mean degree (%g) of the power law must be within [%g, %g] for degrees from %d to %d"
+                         % (mean_degree, lower, upper, min_degree, max_degree))
+    lo, hi = 0.0, MAX_EXPONENT
+    while hi - lo > tolerance:
+        mid = (lo + hi) / 2
+        if powerlaw_mean(mid, min_degree, max_degree) > mean_degree:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def parse_base_model(conf):
+    """Validate a "base_model" configuration of the graph generator
+    :param conf: Configuration dict (e.g. {"type": "powerlaw", "exponent": 2.1, "min_degree": 1, "max_degree": 100}).
+    "mean_degree" can be specified instead of "exponent". "max_degree" is the number of accounts - 1 by default.
+    :return: Configuration dict with all keys
+    """
+    if not isinstance(conf, dict):
+        raise ValueError("Base model must be a dict: %s" % str(conf))
+    model_type = conf.get("type")
+    if model_type not in BASE_MODEL_TYPES:
+        raise ValueError("Base model type (%s) must be one of %s" % (model_type, str(BASE_MODEL_TYPES)))
+    unknown = set(conf.keys()) - set(POWERLAW_KEYS)
+    if unknown:
+        raise ValueError("Unknown keys of the %s base model: %s" % (model_type, ", ".join(sorted(unknown))))
+    if conf.get("exponent") is not None and conf.get("mean_degree") is not None:
+        raise ValueError("Specify either exponent or mean_degree of the power law")
+
+    min_degree = int(conf.get("min_degree", 1))
+    max_degree = conf.get("max_degree")
+    if min_degree < 1:
+        raise ValueError("Minimum degree (%d) must be positive" % min_degree)
+    if max_degree is not None and int(max_degree) < min_degree:
+        raise ValueError("Maximum degree (%d) must not be less than the minimum degree (%d)"
+                         % (int(max_degree), min_degree))
+    mean_degree = conf.get("mean_degree")
+    exponent = conf.get("exponent")
+    if mean_degree is None and exponent is None:
+        exponent = DEFAULT_EXPONENT
+    return {
+        "type": model_type,
+        "exponent": None if exponent is None else float(exponent),
+        "min_degree": min_degree,
+        "max_degree": None if max_degree is None else int(max_degree),
+        "mean_degree": None if mean_degree is None else float(mean_degree),
+    }
+
+
+def balance_degree_sums(in_deg, out_deg, min_degree, rng):
+    """Remove stubs from the larger of the in/out-degree sequences so that their sums are equal.
+    Removed stubs are chosen uniformly from those above the minimum degree.
+    :param in_deg: In-degree array (updated)
+    :param out_deg: Out-degree array (updated)
+    :param min_degree: Minimum degree kept for all accounts
+    :param rng: np.random.Generator object
+    """
+    diff = int(in_deg.sum() - out_deg.sum())
+    larger = in_deg if diff > 0 else out_deg
+    if diff != 0:
+        larger -= remove_stubs(larger - min_degree, abs(diff), rng)
+
+
+def sample_powerlaw_degrees(model, num_nodes, rng):
+    """Sample in/out-degree sequences independently from a truncated discrete power law and balance their sums
+    :param model: Result of parse_base_model
+    :param num_nodes: Number of accounts
+    :param rng: np.random.Generator object
+    :return: In-degree and out-degree arrays (int64)
+    """
+    if num_nodes < 2:
+        raise ValueError("The power-law base model requires two or more accounts")
+    min_degree = model["min_degree"]
+    max_degree = num_nodes - 1 if model["max_degree"] is None else min(model["max_degree"], num_nodes - 1)
+    if max_degree < min_degree:
+        raise ValueError("Minimum degree (%d) must be less than the number of accounts (%d)" % (min_degree, num_nodes))
+    exponent = model["exponent"]
+    if exponent is None:
+        exponent = fit_powerlaw_exponent(model["mean_degree"], min_degree, max_degree)
+    sampler = AliasSampler(powerlaw_pmf(exponent, min_degree, max_degree))
+    in_deg = sampler.draw(num_nodes, rng) + min_degree
+    out_deg = sampler.draw(num_nodes, rng) + min_degree
+    balance_degree_sums(in_deg, out_deg, min_degree, rng)
+    logger.info("Sampled power-law degree sequences of %d accounts (exponent %.3f, degrees %d-%d, mean %.2f)"
+                % (num_nodes, exponent, min_degree, max_degree, in_deg.mean()))
+    return in_deg, out_deg
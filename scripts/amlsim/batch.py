@@ -0,0 +1,105 @@
+import csv
+import logging
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+
+from amlsim.cost_model import peak_rss_mb
+
+
+logger = logging.getLogger(__name__)
+
+# Outputs and timings of the generator for a single random seed
+SeedResult = namedtuple("SeedResult", [
+    "seed",  # Random seed
+    "output_dir",  # Output directory of the CSV files
+    "stages",  # List of (stage name, seconds) including the export
+    "elapsed",  # Elapsed time (seconds)
+    "peak_rss_mb",  # Peak RSS of the worker process (MB), or None if unknown
+])
+
+_param_files = None  # ParamFiles object shared by the generators of a worker process
+
+
+def parse_seeds(text):
+    """
+    :param text: Comma-separated random seeds (e.g. "1,2,3")
+    :return: List of the seeds
+    """
+    seeds = [int(s) for s in text.split(",") if s.strip() != ""]
+    if len(seeds) == 0:
+        raise ValueError("No random seeds: %s" % text)
+    if len(set(seeds)) != len(seeds):
+        raise ValueError("Duplicate random seeds: %s" % text)
+    return seeds
+
+
+def _init_worker(param_files):
+    global _param_files
+    os.environ.pop("RANDOM_SEED", None)  # Each task has its own seed in the configuration
+    _param_files = param_files
+
+
+def generate_seed(task):
+    """Run all generator stages and export the CSV files for a single random seed (called in a worker process)
+    :param task: Tuple of the generator class, configuration dict, simulation name and stages (name and methods)
+    :return: SeedResult object
+    """
+    generator_cls, conf, sim_name, stages = task
+    begin = time.time()
+    txg = generator_cls(conf, sim_name, _param_files)
+    timings = list()
+    for name, methods in stages:
+        stage_begin = time.time()
+        for method in methods:
+            getattr(txg, method)()
+        timings.append((name, time.time() - stage_begin))
+    stage_begin = time.time()
+    txg.export()
+    timings.append(("export", time.time() - stage_begin))
+    return SeedResult(txg.seed, txg.output_dir, timings, time.time() - begin, peak_rss_mb())
+
+
+def run_batch(tasks, num_workers, param_files):
+    """Run generator tasks of multiple random seeds sharing the parsed parameter files.
+    Each task runs in a new worker process, so that the peak RSS is measured per seed.
+    :param tasks: List of generate_seed arguments
+    :param num_workers: Number of worker processes (tasks run one by one in this process if 1 or less)
+    :param param_files: ParamFiles object (parse the files before, so that workers do not parse them again)
+    :return: List of SeedResult objects in the order of the tasks
+    """
+    if num_workers <= 1:
+        _init_worker(param_files)
+        return [generate_seed(task) for task in tasks]
+    with multiprocessing.Pool(min(num_workers, len(tasks)), initializer=_init_worker, initargs=(param_files,),
+                              maxtasksperchild=1) as pool:
+        return pool.map(generate_seed, tasks, chunksize=1)
+
+
+def write_summary(path, results):
+    """Write the timings of all seeds to a CSV file
+    :param path: Output CSV file path
+    :param results: List of SeedResult objects
+    """
+    stage_names = [name for name, _ in results[0].stages]
+    with open(path, "w", newline="") as wf:
+        writer = csv.writer(wf)
+        writer.writerow(["seed", "output_dir"] + stage_names + ["total", "peak_rss_mb"])
+        for result in results:
+            rss = "%.1f" % result.peak_rss_mb if result.peak_rss_mb is not None else ""
+            writer.writerow([result.seed, result.output_dir] + ["%.3f" % sec for _, sec in result.stages]
+                            + ["%.3f" % result.elapsed, rss])
+
+
+def log_summary(results):
+    """Log the total time and the peak RSS of each seed
+    :param results: List of SeedResult objects
+    """
+    for result in results:
+        logger.info("Seed %d: %.3f seconds (peak RSS %.1f MB) -> %s"
+                    % (result.seed, result.elapsed, result.peak_rss_mb if result.peak_rss_mb is not None else -1,
+                       result.output_dir))
+    total = sum(result.elapsed for result in results)
+    logger.info("Generated %d seeds (%.3f seconds in total, %.3f seconds per seed)"
+                % (len(results), total, total / len(results)))
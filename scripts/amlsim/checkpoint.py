@@ -0,0 +1,157 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import pickle
+import random
+import time
+from array import array
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+MIN_ARRAY_SIZE = 1024  # Smaller arrays are kept in the pickled object graph
+
+
+def config_hash(conf, input_dir, extra=None):
+    """Hash the configuration and all input parameter files
+    :param conf: Configuration dict
+    :param input_dir: Input parameter directory
+    :param extra: Other values affecting the results (e.g. random seed), must be JSON serializable
+    :return: Hex digest string
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(conf, sort_keys=True).encode("utf-8"))
+    h.update(json.dumps(extra, sort_keys=True).encode("utf-8"))
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            h.update(os.path.relpath(path, input_dir).encode("utf-8"))
+            with open(path, "rb") as rf:
+                for chunk in iter(lambda: rf.read(1 << 20), b""):
+                    h.update(chunk)
+    return h.hexdigest()
+
+
+class _ArrayPickler(pickle.Pickler):
+    """Pickler which moves large NumPy arrays and typed arrays out of the pickle stream"""
+
+    def __init__(self, file, arrays):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.arrays = arrays
+        self.ids = dict()  # id(obj) -> key, to share an array referenced more than once
+        self.objs = list()  # Keep the arrays alive so that their IDs are not reused
+
+    def persistent_id(self, obj):
+        if isinstance(obj, np.ndarray):
+            if obj.dtype.hasobject or obj.size < MIN_ARRAY_SIZE:
+                return None
+            kind = "ndarray"
+        elif isinstance(obj, array):
+            if len(obj) < MIN_ARRAY_SIZE:
+                return None
+            kind = "array:" + obj.typecode
+        else:
+            return None
+        key = self.ids.get(id(obj))
+        if key is None:
+            key = "a%d" % len(self.ids)
+            self.ids[id(obj)] = key
+            self.objs.append(obj)
+            self.arrays[key] = np.asarray(obj) if kind == "ndarray" else np.frombuffer(obj, dtype=obj.typecode)
+        return kind, key
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+
+    def __init__(self, file, arrays):
+        super().__init__(file)
+        self.arrays = arrays
+        self.loaded = dict()
+
+    def persistent_load(self, pid):
+        kind, key = pid
+        obj = self.loaded.get(key)
+        if obj is None:
+            values = self.arrays[key]
+            obj = values.copy() if kind == "ndarray" else array(kind.split(":")[1], values.tobytes())
+            self.loaded[key] = obj
+        return obj
+
+
+class Checkpointer:
+    """Save and load snapshots of a transaction graph generator after each stage.
+    A snapshot is a pair of files: "<stage>.npz" with large arrays and the pickled remaining state
+    (including the states of the random number generators), and "<stage>.json" as the manifest.
+    Iteration orders of restored sets may differ from the saved ones
+    (e.g. member rows of normal models can be exported in another order after resuming).
+    """
+
+    def __init__(self, directory, digest):
+        """
+        :param directory: Checkpoint directory
+        :param digest: Hash of the configuration and inputs (see config_hash)
+        """
+        self.directory = directory
+        self.digest = digest
+
+    def _paths(self, stage):
+        return os.path.join(self.directory, stage + ".npz"), os.path.join(self.directory, stage + ".json")
+
+    def save(self, stage, obj):
+        """Write a snapshot of an object after a stage
+        :param stage: Stage name
+        :param obj: Object whose attributes are saved (e.g. TransactionGenerator)
+        """
+        begin = time.time()
+        os.makedirs(self.directory, exist_ok=True)
+        npz_file, manifest_file = self._paths(stage)
+        arrays = dict()
+        buf = io.BytesIO()
+        state = {"attrs": obj.__dict__, "random": random.getstate(), "np_random": np.random.get_state()}
+        _ArrayPickler(buf, arrays).dump(state)
+        arrays["state"] = np.frombuffer(buf.getvalue(), dtype=np.uint8)
+        tmp_file = npz_file + ".tmp.npz"
+        np.savez(tmp_file, **arrays)
+        os.replace(tmp_file, npz_file)
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "stage": stage,
+            "config_hash": self.digest,
+            "num_arrays": len(arrays) - 1,
+            "size": os.path.getsize(npz_file),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with open(manifest_file, "w") as wf:
+            json.dump(manifest, wf, indent=2)
+        logger.info("Saved checkpoint of stage %s to %s (%d bytes, %.3f seconds)"
+                    % (stage, npz_file, manifest["size"], time.time() - begin))
+
+    def load(self, stage, obj):
+        """Restore a snapshot of a stage to an object
+        :param stage: Stage name
+        :param obj: Object whose attributes are restored
+        """
+        npz_file, manifest_file = self._paths(stage)
+        if not os.path.isfile(manifest_file) or not os.path.isfile(npz_file):
+            raise ValueError("No checkpoint of stage %s in %s" % (stage, self.directory))
+        with open(manifest_file, "r") as rf:
+            manifest = json.load(rf)
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("stage") != stage:
+            raise ValueError("Invalid checkpoint manifest: %s" % manifest_file)
+        if manifest.get("config_hash") != self.digest:
+            raise ValueError("Checkpoint %s was created with different configurations or inputs" % manifest_file)
+
+        begin = time.time()
+        with np.load(npz_file) as npz:
+            arrays = {key: npz[key] for key in npz.files}
+        state = _ArrayUnpickler(io.BytesIO(arrays.pop("state").tobytes()), arrays).load()
+        obj.__dict__.update(state["attrs"])
+        random.setstate(state["random"])
+        np.random.set_state(state["np_random"])
+        logger.info("Loaded checkpoint of stage %s from %s (%.3f seconds)" % (stage, npz_file, time.time() - begin))
@@ -0,0 +1,130 @@
+import re
+import sys
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+# Stages of the transaction graph generator with the CSV export
+STAGE_NAMES = ("normal_transactions", "account_list", "normal_models", "main_acct_candidates",
+               "alert_patterns", "active_edges", "export")
+
+# Coefficients (intercept, coefficient, exponent) of the wall time (seconds) and the peak RSS (MB) after each stage
+# as functions of the number of requested base transactions (sum of the in-degree sequence):
+# intercept + coefficient * size ** exponent.
+# Fitted with fit_cost_model from the generator logs of paramFiles/100, 1K, 10K and 100K
+# (default options: python engine and networkx backend).
+DEFAULT_COST_MODEL = {
+    "normal_transactions": {"seconds": (0.0005, 1.49e-05, 1.0), "rss_mb": (39.0, 0.00285, 0.9)},
+    "account_list": {"seconds": (0.00091, 8.43e-07, 0.85), "rss_mb": (39.0, 0.00285, 0.9)},
+    "normal_models": {"seconds": (0.00346, 5.21e-06, 1.05), "rss_mb": (39.0, 0.00285, 0.9)},
+    "main_acct_candidates": {"seconds": (0.0, 1.54e-06, 0.85), "rss_mb": (39.0, 0.00285, 0.9)},
+    "alert_patterns": {"seconds": (0.00318, 3.15e-07, 0.8), "rss_mb": (39.0, 0.00285, 0.9)},
+    "active_edges": {"seconds": (0.00154, 1.21e-06, 1.1), "rss_mb": (43.5, 0.000301, 1.1)},
+    "export": {"seconds": (0.00071, 5.5e-05, 0.8), "rss_mb": (43.5, 0.000301, 1.1)},
+}
+
+STAGE_LOG_PATTERN = re.compile(r"Finished stage (\w+) in ([0-9.]+) seconds \(peak RSS ([0-9.]+) MB\)")
+EDGES_LOG_PATTERN = re.compile(r"Requested (\d+) base transactions")
+
+
+def peak_rss_mb():
+    """
+    :return: Peak resident set size of this process (MB), or None if unknown
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024.0 * 1024.0) if sys.platform == "darwin" else max_rss / 1024.0  # Bytes on macOS
+
+
+def parse_stage_log(lines):
+    """Parse a log of the transaction graph generator
+    :param lines: Log lines
+    :return: Number of requested base transactions (0 if the base graph was loaded from the cache)
+    and dict of stage name -> (seconds, peak RSS MB)
+    """
+    num_edges = 0
+    stages = dict()
+    for line in lines:
+        m = EDGES_LOG_PATTERN.search(line)
+        if m is not None:
+            num_edges += int(m.group(1))
+            continue
+        m = STAGE_LOG_PATTERN.search(line)
+        if m is not None:
+            stages[m.group(1)] = (float(m.group(2)), float(m.group(3)))
+    return num_edges, stages
+
+
+EXPONENTS = np.arange(0.8, 1.61, 0.05)  # Candidate exponents of the problem size
+
+
+def fit_power(sizes, values):
+    """Fit value = intercept + coefficient * size ** exponent minimizing squared relative errors.
+    The exponent is chosen from EXPONENTS, and the intercept and the coefficient are non-negative.
+    :param sizes: Problem sizes (e.g. number of requested base transactions)
+    :param values: Measured values
+    :return: Tuple of intercept, coefficient and exponent
+    """
+    sizes = np.maximum(np.asarray(sizes, dtype=np.float64), 1.0)
+    values = np.asarray(values, dtype=np.float64)
+    if len(sizes) == 0:
+        raise ValueError("No samples to fit")
+    weights = 1.0 / np.maximum(values, 1e-3)
+    best = None
+    for exponent in EXPONENTS.tolist():
+        x = sizes ** exponent
+        a = np.stack([np.ones_like(x), x], axis=1) * weights[:, None]
+        (intercept, coefficient), _, _, _ = np.linalg.lstsq(a, values * weights, rcond=None)
+        if coefficient < 0:
+            intercept, coefficient = values.mean(), 0.0
+        elif intercept < 0:
+            intercept, coefficient = 0.0, (values * x * weights ** 2).sum() / (x * x * weights ** 2).sum()
+        error = (((intercept + coefficient * x - values) * weights) ** 2).sum()
+        if best is None or error < best[0] - 1e-12:
+            best = (error, float(intercept), float(coefficient), round(exponent, 2))
+    return best[1:]
+
+
+def fit_cost_model(samples):
+    """Fit the cost model from measurements
+    :param samples: List of (number of requested base transactions, dict of stage name -> (seconds, peak RSS MB)).
+    Samples without base transactions are ignored.
+    :return: Cost model dict (same format as DEFAULT_COST_MODEL)
+    """
+    samples = [(num_edges, stages) for num_edges, stages in samples if num_edges > 0]
+    model = dict()
+    for stage in STAGE_NAMES:
+        points = [(num_edges, stages[stage]) for num_edges, stages in samples if stage in stages]
+        if not points:
+            continue
+        sizes = [num_edges for num_edges, _ in points]
+        model[stage] = {"seconds": fit_power(sizes, [v[0] for _, v in points]),
+                        "rss_mb": fit_power(sizes, [v[1] for _, v in points])}
+    return model
+
+
+def power_value(coefficients, size):
+    intercept, coefficient, exponent = coefficients
+    return intercept + coefficient * max(size, 1) ** exponent
+
+
+def estimate_stages(num_edges, model=None):
+    """Estimate the wall time and the peak RSS of each stage
+    :param num_edges: Number of requested base transactions
+    :param model: Cost model dict (default: DEFAULT_COST_MODEL)
+    :return: List of (stage name, seconds, peak RSS MB)
+    """
+    model = DEFAULT_COST_MODEL if model is None else model
+    result = list()
+    for stage in STAGE_NAMES:
+        if stage not in model:
+            continue
+        result.append((stage, power_value(model[stage]["seconds"], num_edges),
+                       power_value(model[stage]["rss_mb"], num_edges)))
+    return result
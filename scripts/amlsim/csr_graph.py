@@ -0,0 +1,508 @@
+from collections.abc import Mapping, MutableMapping
+
+import numpy as np
+
+
+EDGE_ATTRS = ("edge_id", "active")  # Edge attributes held in arrays
+
+
+class CSRGraph:
+    """Array-backed directed graph with the subset of the networkx 1.11 DiGraph API
+    used by the transaction graph generator and the Nominator.
+
+    Accounts 0..num_nodes-1 are stored as int32 CSR (successors) and CSC (predecessors) adjacency
+    with edge ID and active flag arrays. Edges added later (e.g. by AML typologies) go to an append buffer
+    which is merged into the arrays once it grows larger than the compaction threshold.
+    Edge arrays are appended to the buffer at once, and the per-node index of the buffer is rebuilt on demand.
+    Other node IDs (e.g. the external account -1) are mapped to extra rows.
+    """
+
+    def __init__(self, num_nodes=0, src=(), dst=(), compact_threshold=1 << 20):
+        """Build a graph from edge arrays
+        :param num_nodes: Number of account vertices (node IDs must be in [0, num_nodes))
+        :param src: Originator node array (no parallel edges)
+        :param dst: Beneficiary node array
+        :param compact_threshold: Number of buffered edges to trigger merging them into the arrays
+        """
+        self.num_base = num_nodes
+        self.node = dict()  # Node ID -> attribute dict (nx compatible)
+        self.edge = self  # g.edge[u][v] is the same as g[u][v]
+        self.compact_threshold = compact_threshold
+        self._extra_ids = list()  # Row index - num_base -> node ID
+        self._extra_index = dict()  # Node ID -> row index
+        self._clear_buffer()
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        self._build(num_nodes, src, dst, np.full(len(src), -1, dtype=np.int32), np.zeros(len(src), dtype=bool))
+
+    def _clear_buffer(self):
+        self._buf_src = list()
+        self._buf_dst = list()
+        self._buf_edge_id = list()
+        self._buf_active = list()
+        self._buf_index = dict()  # (orig, bene) -> buffer position
+        self._buf_succ = dict()  # Node ID -> buffer positions of out-edges (None until rebuilt)
+        self._buf_pred = dict()  # Node ID -> buffer positions of in-edges (None until rebuilt)
+
+    def _buffer_adjacency(self):
+        """
+        :return: Node ID -> buffer positions of out-edges and in-edges (rebuilt after bulk appends)
+        """
+        if self._buf_succ is None:
+            succ = dict()
+            pred = dict()
+            for pos, (u, v) in enumerate(zip(self._buf_src, self._buf_dst)):
+                succ.setdefault(u, list()).append(pos)
+                pred.setdefault(v, list()).append(pos)
+            self._buf_succ = succ
+            self._buf_pred = pred
+        return self._buf_succ, self._buf_pred
+
+    def _build(self, num_rows, src, dst, edge_ids, active):
+        """Build CSR and CSC arrays from row index arrays
+        """
+        order = np.lexsort((dst, src))
+        self.indices = dst[order].astype(np.int32)
+        self.edge_ids = edge_ids[order]
+        self.active = active[order]
+        self.indptr = np.zeros(num_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_rows), out=self.indptr[1:])
+
+        in_order = np.argsort(self.indices, kind="stable")
+        self.in_indices = src[order][in_order].astype(np.int32)
+        self.in_pos = in_order.astype(np.int64)  # CSC position -> CSR position
+        self.in_indptr = np.zeros(num_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=num_rows), out=self.in_indptr[1:])
+        self._keys = None  # Sorted (src, dst) keys of stored edges, built on demand
+
+    def compact(self):
+        """Merge buffered edges into the CSR/CSC arrays
+        """
+        if not self._buf_src:
+            return
+        num_rows = self.num_base + len(self._extra_ids)
+        base_src = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+        buf_src = self._rows(_id_array(self._buf_src))
+        buf_dst = self._rows(_id_array(self._buf_dst))
+        src = np.concatenate([base_src, buf_src])
+        dst = np.concatenate([self.indices.astype(np.int64), buf_dst])
+        edge_ids = np.concatenate([self.edge_ids, np.array(self._buf_edge_id, dtype=np.int32)])
+        active = np.concatenate([self.active, np.array(self._buf_active, dtype=bool)])
+        self._build(num_rows, src, dst, edge_ids, active)
+        self._clear_buffer()
+
+    def _row(self, n):
+        """Row index of a node ID (None if absent)"""
+        if type(n) is int:
+            if 0 <= n < self.num_base:
+                return n
+        elif isinstance(n, np.integer) and 0 <= n < self.num_base:
+            return int(n)
+        return self._extra_index.get(n)
+
+    def _node_id(self, row):
+        return row if row < self.num_base else self._extra_ids[row - self.num_base]
+
+    def _node_ids(self, rows):
+        """Node ID array of row indices (base rows are the node IDs, extra rows are mapped through _extra_ids)"""
+        ids = rows.astype(np.int64)
+        extra = rows >= self.num_base
+        if not extra.any():
+            return ids
+        extra_ids = _id_array(self._extra_ids)
+        if extra_ids.dtype.kind not in "iu":
+            ids = ids.astype(object)
+        ids[extra] = extra_ids[rows[extra] - self.num_base]
+        return ids
+
+    def _rows(self, nodes):
+        """Row index array of node IDs in the graph"""
+        if nodes.dtype.kind in "iu":
+            rows = nodes.astype(np.int64)
+            extra = (rows < 0) | (rows >= self.num_base)
+        else:
+            rows = np.zeros(len(nodes), dtype=np.int64)
+            extra = np.ones(len(nodes), dtype=bool)
+        rows[extra] = [self._row(n) for n in nodes[extra].tolist()]
+        return rows
+
+    def _find(self, u, v):
+        """Locate an edge
+        :return: ("base", CSR position), ("buffer", buffer position) or None if absent
+        """
+        urow, vrow = self._row(u), self._row(v)
+        if urow is not None and vrow is not None and urow < len(self.indptr) - 1:
+            start, end = self.indptr[urow], self.indptr[urow + 1]
+            pos = start + np.searchsorted(self.indices[start:end], vrow)
+            if pos < end and self.indices[pos] == vrow:
+                return "base", int(pos)
+        pos = self._buf_index.get((u, v))
+        return None if pos is None else ("buffer", pos)
+
+    def is_multigraph(self):
+        return False
+
+    def is_directed(self):
+        return True
+
+    def has_node(self, n):
+        return self._row(n) is not None
+
+    def __contains__(self, n):
+        return self.has_node(n)
+
+    def __len__(self):
+        return self.number_of_nodes()
+
+    def add_node(self, n, attr_dict=None, **attr):
+        if not self.has_node(n):
+            self._extra_index[n] = self.num_base + len(self._extra_ids)
+            self._extra_ids.append(n)
+        node_attr = self.node.setdefault(n, dict())
+        if attr_dict is not None:
+            node_attr.update(attr_dict)
+        node_attr.update(attr)
+
+    def nodes(self, data=False):
+        node_ids = list(range(self.num_base)) + self._extra_ids
+        if data:
+            return [(n, self.node.get(n, dict())) for n in node_ids]
+        return node_ids
+
+    def number_of_nodes(self):
+        return self.num_base + len(self._extra_ids)
+
+    def number_of_edges(self):
+        return len(self.indices) + len(self._buf_src)
+
+    def add_edge(self, u, v, attr_dict=None, **attr):
+        """Add an edge or update attributes of an existing edge
+        """
+        if attr_dict is not None:
+            attr.update(attr_dict)
+        for n in (u, v):
+            if not self.has_node(n):
+                self.add_node(n)
+        loc = self._find(u, v)
+        if loc is None:
+            pos = len(self._buf_src)
+            self._buf_src.append(u)
+            self._buf_dst.append(v)
+            self._buf_edge_id.append(-1)
+            self._buf_active.append(False)
+            self._buf_index[(u, v)] = pos
+            if self._buf_succ is not None:
+                self._buf_succ.setdefault(u, list()).append(pos)
+                self._buf_pred.setdefault(v, list()).append(pos)
+            loc = ("buffer", pos)
+        _EdgeAttrs(self, loc).update(attr)
+        if len(self._buf_src) >= self.compact_threshold:
+            self.compact()
+
+    def add_edges_from(self, ebunch):
+        """Add edges. An array of edges (m x 2) is added at once by add_edge_arrays.
+        """
+        if isinstance(ebunch, np.ndarray) and ebunch.ndim == 2:
+            self.add_edge_arrays(ebunch[:, 0], ebunch[:, 1])
+            return
+        for u, v in ebunch:
+            self.add_edge(u, v)
+
+    def add_edge_arrays(self, src, dst):
+        """Add edges at once by appending the absent ones to the buffer (attributes of existing edges are kept)
+        :param src: Originator node array
+        :param dst: Beneficiary node array
+        :return: Boolean array of the edges newly added (False for existing edges and repeated pairs)
+        """
+        src = np.asarray(src)
+        dst = np.asarray(dst)
+        if src.dtype.kind not in "iu" or dst.dtype.kind not in "iu":
+            new = np.zeros(len(src), dtype=bool)
+            for i, (u, v) in enumerate(zip(src.tolist(), dst.tolist())):
+                new[i] = not self.has_edge(u, v)
+                if new[i]:
+                    self.add_edge(u, v)
+            return new
+        if len(src) == 0:
+            return np.zeros(0, dtype=bool)
+        in_base = (src >= 0) & (src < self.num_base) & (dst >= 0) & (dst < self.num_base)
+        for n in np.unique(np.concatenate([src[~in_base], dst[~in_base]])).tolist():
+            if not self.has_node(n):
+                self.add_node(n)
+        src_list = src.tolist()
+        dst_list = dst.tolist()
+        pairs = list(zip(src_list, dst_list))
+        new = np.zeros(len(pairs), dtype=bool)
+        new[list(dict(zip(reversed(pairs), range(len(pairs) - 1, -1, -1))).values())] = True  # First occurrences
+        new &= self.edge_positions(src, dst) < 0
+        buf_index = self._buf_index
+        new &= np.array([pair not in buf_index for pair in pairs], dtype=bool)
+        for i in np.flatnonzero(new & ~in_base).tolist():  # Edges of extra rows may be stored in the arrays
+            new[i] = self._find(src_list[i], dst_list[i]) is None
+
+        added = np.flatnonzero(new)
+        begin = len(self._buf_src)
+        added_src = src[added].tolist()
+        added_dst = dst[added].tolist()
+        self._buf_src.extend(added_src)
+        self._buf_dst.extend(added_dst)
+        self._buf_edge_id.extend([-1] * len(added))
+        self._buf_active.extend([False] * len(added))
+        buf_index.update(zip(zip(added_src, added_dst), range(begin, begin + len(added))))
+        self._buf_succ = self._buf_pred = None  # Rebuilt on demand
+        if len(self._buf_src) >= self.compact_threshold:
+            self.compact()
+        return new
+
+    def edge_positions(self, src, dst):
+        """Locate edges between account vertices in the CSR arrays at once
+        :param src: Originator node array
+        :param dst: Beneficiary node array
+        :return: CSR position array (-1 if the edge is not stored in the arrays, e.g. buffered)
+        """
+        src = np.asarray(src)
+        dst = np.asarray(dst)
+        positions = np.full(len(src), -1, dtype=np.int64)
+        if len(src) == 0 or src.dtype.kind not in "iu" or dst.dtype.kind not in "iu":
+            return positions
+        num_rows = len(self.indptr) - 1
+        if self._keys is None:
+            rows = np.repeat(np.arange(num_rows, dtype=np.int64), np.diff(self.indptr))
+            self._keys = rows * num_rows + self.indices
+        valid = (src >= 0) & (src < self.num_base) & (dst >= 0) & (dst < self.num_base)
+        queries = src[valid].astype(np.int64) * num_rows + dst[valid]
+        pos = np.minimum(np.searchsorted(self._keys, queries), max(len(self._keys) - 1, 0))
+        found = np.zeros(len(queries), dtype=bool)
+        if len(self._keys) > 0:
+            found = self._keys[pos] == queries
+        positions[np.flatnonzero(valid)[found]] = pos[found]
+        return positions
+
+    def set_edge_attrs(self, src, dst, name, values):
+        """Set an attribute of existing edges at once
+        :param src: Originator node array
+        :param dst: Beneficiary node array
+        :param name: Attribute name ("edge_id" or "active")
+        :param values: Attribute value array
+        """
+        if name not in EDGE_ATTRS:
+            raise KeyError("Unsupported edge attribute for CSRGraph: %s" % name)
+        src = np.asarray(src)
+        dst = np.asarray(dst)
+        values = np.asarray(values)
+        positions = self.edge_positions(src, dst)
+        stored = positions >= 0
+        arrays = {"edge_id": self.edge_ids, "active": self.active}
+        arrays[name][positions[stored]] = values[stored]
+        others = ~stored
+        buf_index = self._buf_index
+        buf_values = {"edge_id": self._buf_edge_id, "active": self._buf_active}[name]
+        for u, v, value in zip(src[others].tolist(), dst[others].tolist(), values[others].tolist()):
+            pos = buf_index.get((u, v))
+            if pos is None:
+                self[u][v][name] = value  # Edges of extra rows, or raises KeyError if absent
+            else:
+                buf_values[pos] = value
+
+    def has_edge(self, u, v):
+        return self._find(u, v) is not None
+
+    def successors(self, n):
+        row = self._row(n)
+        if row is None:
+            raise KeyError("The node %s is not in the graph." % str(n))
+        succ = self._node_ids(self.indices[self.indptr[row]:self.indptr[row + 1]]).tolist() \
+            if row < len(self.indptr) - 1 else []
+        return succ + [self._buf_dst[i] for i in self._buffer_adjacency()[0].get(n, ())]
+
+    def predecessors(self, n):
+        row = self._row(n)
+        if row is None:
+            raise KeyError("The node %s is not in the graph." % str(n))
+        pred = self._node_ids(self.in_indices[self.in_indptr[row]:self.in_indptr[row + 1]]).tolist() \
+            if row < len(self.in_indptr) - 1 else []
+        return pred + [self._buf_src[i] for i in self._buffer_adjacency()[1].get(n, ())]
+
+    def out_degree(self, nbunch=None):
+        if nbunch is None:
+            return {n: self.out_degree(n) for n in self.nodes()}
+        row = self._row(nbunch)
+        if row is None:
+            raise KeyError("The node %s is not in the graph." % str(nbunch))
+        deg = int(self.indptr[row + 1] - self.indptr[row]) if row < len(self.indptr) - 1 else 0
+        return deg + len(self._buffer_adjacency()[0].get(nbunch, ()))
+
+    def in_degree(self, nbunch=None):
+        if nbunch is None:
+            return {n: self.in_degree(n) for n in self.nodes()}
+        row = self._row(nbunch)
+        if row is None:
+            raise KeyError("The node %s is not in the graph." % str(nbunch))
+        deg = int(self.in_indptr[row + 1] - self.in_indptr[row]) if row < len(self.in_indptr) - 1 else 0
+        return deg + len(self._buffer_adjacency()[1].get(nbunch, ()))
+
+    def edges(self, data=False):
+        """List edges in the order of originator nodes (buffered edges follow the stored ones)
+        :param data: If True, it returns attribute dicts. If it is an attribute name, it returns the values
+        (None if absent) like networkx.
+        """
+        result = list()
+        num_rows = len(self.indptr) - 1
+        indptr = self.indptr.tolist()
+        dst_ids = self._node_ids(self.indices).tolist()
+        if data:
+            edge_ids = self.edge_ids.tolist()
+            active = self.active.tolist()
+        for n in self.nodes():
+            row = self._row(n)
+            if row < num_rows:
+                for pos in range(indptr[row], indptr[row + 1]):
+                    if data:
+                        result.append((n, dst_ids[pos], _attr_value(edge_ids[pos], active[pos], data)))
+                    else:
+                        result.append((n, dst_ids[pos]))
+            for pos in self._buffer_adjacency()[0].get(n, ()):
+                if data:
+                    attr = _attr_value(self._buf_edge_id[pos], self._buf_active[pos], data)
+                    result.append((n, self._buf_dst[pos], attr))
+                else:
+                    result.append((n, self._buf_dst[pos]))
+        return result
+
+    def edge_id_arrays(self):
+        """Edges with IDs as arrays in the order of edges()
+        :return: Originator node array, beneficiary node array and edge ID array
+        """
+        rows = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int64), np.diff(self.indptr))
+        buf_src = _id_array(self._buf_src)
+        buf_dst = _id_array(self._buf_dst)
+        src = np.concatenate([self._node_ids(rows), buf_src])
+        dst = np.concatenate([self._node_ids(self.indices), buf_dst])
+        edge_ids = np.concatenate([self.edge_ids, np.array(self._buf_edge_id, dtype=self.edge_ids.dtype)])
+        if len(buf_src) > 0:  # Buffered edges follow the stored ones of the same originator
+            order = np.argsort(np.concatenate([rows, self._rows(buf_src)]), kind="stable")
+            src, dst, edge_ids = src[order], dst[order], edge_ids[order]
+        has_id = edge_ids >= 0
+        return src[has_id], dst[has_id], edge_ids[has_id]
+
+    def __getitem__(self, u):
+        if not self.has_node(u):
+            raise KeyError(u)
+        return _Adjacency(self, u)
+
+    def subgraph(self, nbunch):
+        return CSRSubgraph(self, nbunch)
+
+
+def _id_array(node_ids):
+    """Node ID list to an integer array, or an object array if some IDs are not integers"""
+    if len(node_ids) == 0:
+        return np.zeros(0, dtype=np.int64)
+    ids = np.array(node_ids)
+    if ids.dtype.kind not in "iu":
+        ids = np.empty(len(node_ids), dtype=object)
+        ids[:] = node_ids
+    return ids
+
+
+def _attr_dict(edge_id, active):
+    return {"edge_id": edge_id, "active": active} if edge_id >= 0 else {"active": active}
+
+
+def _attr_value(edge_id, active, data):
+    attr = _attr_dict(edge_id, active)
+    return attr if data is True else attr.get(data)
+
+
+class CSRSubgraph:
+    """Induced subgraph view of CSRGraph. Edge attributes are shared with the parent graph.
+    """
+
+    def __init__(self, graph, nbunch):
+        self.graph = graph
+        self.node_set = set(n for n in nbunch if graph.has_node(n))
+
+    def is_multigraph(self):
+        return False
+
+    def nodes(self):
+        return list(self.node_set)
+
+    def edges(self, data=False):
+        result = list()
+        for u in self.node_set:
+            for v in self.graph.successors(u):
+                if v in self.node_set:
+                    result.append((u, v, self.graph[u][v].copy()) if data else (u, v))
+        return result
+
+    def __getitem__(self, u):
+        return self.graph[u]
+
+
+class _Adjacency(Mapping):
+    """Successors of a node: g[u] -> {v: edge attributes}"""
+
+    def __init__(self, graph, u):
+        self.graph = graph
+        self.u = u
+
+    def __getitem__(self, v):
+        loc = self.graph._find(self.u, v)
+        if loc is None:
+            raise KeyError(v)
+        return _EdgeAttrs(self.graph, loc)
+
+    def __iter__(self):
+        return iter(self.graph.successors(self.u))
+
+    def __len__(self):
+        return self.graph.out_degree(self.u)
+
+
+class _EdgeAttrs(MutableMapping):
+    """Edge attributes stored in the arrays of CSRGraph: g[u][v] -> {"edge_id": ..., "active": ...}"""
+
+    def __init__(self, graph, loc):
+        self.graph = graph
+        self.kind, self.pos = loc
+
+    def _arrays(self):
+        g = self.graph
+        if self.kind == "base":
+            return {"edge_id": g.edge_ids, "active": g.active}
+        return {"edge_id": g._buf_edge_id, "active": g._buf_active}
+
+    def __getitem__(self, key):
+        if key not in EDGE_ATTRS:
+            raise KeyError(key)
+        value = self._arrays()[key][self.pos]
+        if key == "edge_id":
+            if value < 0:
+                raise KeyError(key)  # Not assigned yet
+            return int(value)
+        return bool(value)
+
+    def __setitem__(self, key, value):
+        if key not in EDGE_ATTRS:
+            raise KeyError("Unsupported edge attribute for CSRGraph: %s" % key)
+        self._arrays()[key][self.pos] = value
+
+    def __delitem__(self, key):
+        raise KeyError("Edge attributes of CSRGraph cannot be deleted: %s" % key)
+
+    def __iter__(self):
+        return (k for k in EDGE_ATTRS if k in self)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def copy(self):
+        return dict(self.items())
@@ -0,0 +1,102 @@
+import numpy as np
+
+
+class DegreeSequence:
+    """Run-length encoded in/out-degree sequences loaded from a degree CSV file.
+    Each run has a count of accounts and their in/out-degrees, and the whole run list
+    is repeated to cover all accounts. Full sequences are expanded only on demand.
+    """
+
+    def __init__(self, counts, in_degrees, out_degrees, repeats=1):
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.in_values = np.asarray(in_degrees, dtype=np.int64)
+        self.out_values = np.asarray(out_degrees, dtype=np.int64)
+        self.repeats = repeats
+
+    @classmethod
+    def from_rows(cls, iterable):
+        """Parse rows of a degree CSV file (count, in-degree, out-degree) without the header
+        :param iterable: Rows of the degree CSV file
+        :return: DegreeSequence object (not repeated yet)
+        """
+        counts = list()
+        in_degrees = list()
+        out_degrees = list()
+        for row in iterable:
+            if row[0].startswith("#"):
+                continue
+            counts.append(int(row[0]))
+            in_degrees.append(int(row[1]))
+            out_degrees.append(int(row[2]))
+        return cls(counts, in_degrees, out_degrees)
+
+    def __len__(self):
+        return self.num_nodes
+
+    @property
+    def length(self):
+        """Length of the sequence before repetition"""
+        return int(self.counts.sum())
+
+    @property
+    def num_nodes(self):
+        return self.length * self.repeats
+
+    @property
+    def total_in_degree(self):
+        return int((self.counts * self.in_values).sum()) * self.repeats
+
+    @property
+    def total_out_degree(self):
+        return int((self.counts * self.out_values).sum()) * self.repeats
+
+    def validate(self):
+        """Validate the sums of in-degree and out-degree
+        """
+        if self.total_in_degree != self.total_out_degree:
+            raise ValueError("The sum of in-degree (%d) and out-degree (%d) must be same."
+                             % (self.total_in_degree, self.total_out_degree))
+
+    def repeat_to(self, num_v):
+        """Repeat the sequence to cover the specified number of accounts
+        :param num_v: Number of total account vertices
+        :return: New DegreeSequence object with num_v entries
+        """
+        length = self.length
+        if length == 0 or num_v % length != 0:
+            raise ValueError("The number of total accounts (%d) "
+                             "must be a multiple of the degree sequence length (%d)."
+                             % (num_v, length))
+        return DegreeSequence(self.counts, self.in_values, self.out_values, num_v // length)
+
+    def in_degrees(self, dtype=np.int32):
+        """Expand the in-degree sequence
+        :param dtype: Data type of the array
+        :return: In-degree array with one entry per account
+        """
+        return np.tile(np.repeat(self.in_values.astype(dtype), self.counts), self.repeats)
+
+    def out_degrees(self, dtype=np.int32):
+        """Expand the out-degree sequence
+        :param dtype: Data type of the array
+        :return: Out-degree array with one entry per account
+        """
+        return np.tile(np.repeat(self.out_values.astype(dtype), self.counts), self.repeats)
+
+    def to_lists(self):
+        """Expand the sequences into Python lists
+        :return: In-degree and out-degree sequence list
+        """
+        return self.in_degrees().tolist(), self.out_degrees().tolist()
+
+
+def remove_stubs(degrees, num, rng):
+    """Choose stubs (units of degrees) uniformly at random
+    :param degrees: Degree array
+    :param num: Number of stubs
+    :param rng: np.random.Generator object
+    :return: Number of chosen stubs of each entry
+    """
+    stubs = np.repeat(np.arange(len(degrees)), degrees)
+    chosen = rng.choice(len(stubs), num, replace=False)
+    return np.bincount(stubs[chosen], minlength=len(degrees))
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+ARRAY_NAMES = ("src", "dst")
+
+
+def cache_key(files, params):
+    """Content-addressed key of a base graph
+    :param files: Input file paths which determine the graph
+    :param params: Other parameters which determine the graph (JSON serializable dict)
+    :return: Hex digest string
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    for path in files:
+        with open(path, "rb") as rf:
+            file_hash = hashlib.sha256()
+            for chunk in iter(lambda: rf.read(1 << 20), b""):
+                file_hash.update(chunk)
+        h.update(file_hash.digest())
+    return h.hexdigest()
+
+
+class GraphCache:
+    """On-disk cache of realized base transaction graphs (edge arrays) with LRU eviction.
+    Each entry is a directory named by its key with .npy edge arrays and a JSON metadata file.
+    The modification time of the metadata file is the last access time.
+    """
+
+    def __init__(self, directory, max_bytes):
+        """
+        :param directory: Cache directory
+        :param max_bytes: Maximum total size of the cached entries
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _entry_dir(self, key):
+        return os.path.join(self.directory, key)
+
+    def get(self, key):
+        """Load a cached graph
+        :param key: Cache key
+        :return: Tuple of memory-mapped originator and beneficiary arrays and the metadata dict,
+        or None if not cached
+        """
+        entry_dir = self._entry_dir(key)
+        meta_file = os.path.join(entry_dir, META_FILE)
+        if not os.path.isfile(meta_file):
+            return None
+        try:
+            with open(meta_file, "r") as rf:
+                meta = json.load(rf)
+            src, dst = [np.load(os.path.join(entry_dir, name + ".npy"), mmap_mode="r") for name in ARRAY_NAMES]
+        except (OSError, ValueError) as e:
+            logger.warning("Broken base graph cache entry %s: %s" % (entry_dir, str(e)))
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        os.utime(meta_file)  # Mark as recently used
+        return src, dst, meta
+
+    def put(self, key, src, dst, meta):
+        """Store a graph and evict least recently used entries if the cache exceeds the size limit
+        :param key: Cache key
+        :param src: Originator array
+        :param dst: Beneficiary array
+        :param meta: Metadata dict (JSON serializable)
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        entry_dir = self._entry_dir(key)
+        tmp_dir = "%s.tmp%d" % (entry_dir, os.getpid())
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for name, values in zip(ARRAY_NAMES, (src, dst)):
+            np.save(os.path.join(tmp_dir, name + ".npy"), np.asarray(values, dtype=np.int64))
+        with open(os.path.join(tmp_dir, META_FILE), "w") as wf:
+            json.dump(meta, wf)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        self.evict(keep=key)
+
+    def entries(self):
+        """
+        :return: List of (last access time, size, key) of the cached entries
+        """
+        result = list()
+        if not os.path.isdir(self.directory):
+            return result
+        for key in os.listdir(self.directory):
+            meta_file = os.path.join(self._entry_dir(key), META_FILE)
+            if not os.path.isfile(meta_file):
+                continue
+            entry_dir = self._entry_dir(key)
+            size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+            result.append((os.path.getmtime(meta_file), size, key))
+        return result
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the total size is within the limit
+        :param keep: Key of the entry which is never removed (e.g. the one just stored)
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+            logger.info("Evicted base graph cache entry %s (%d bytes)" % (key, size))
@@ -0,0 +1,242 @@
+import random
+from array import array
+
+import numpy as np
+
+from amlsim.indexed_pool import IndexedPool
+from amlsim.sampling import AliasSampler
+
+
+class HubIndex:
+    """Hub accounts (main account candidates of AML typologies) maintained incrementally.
+    In/out-degrees of accounts are counted in typed arrays (array.array, which is faster than NumPy
+    for scalar updates and can be viewed as NumPy arrays for bulk queries) as transaction edges are added.
+    Once activated with the typology member candidates, accounts whose in/out-degree reaches
+    the threshold are kept in indexed pools (all banks and per bank) until they are removed.
+    Only integer account IDs in [0, n) are counted; other vertices (e.g. external account -1) are never hubs.
+    If weighted, hubs are chosen with probabilities proportional to their degrees (in + out) by alias tables
+    of the hubs (degrees when the table is built). Removed hubs are rejected, and a table is rebuilt
+    when a hub is added or more than half of its hubs are removed.
+    Main accounts of all typologies of an alert parameter row are taken at once by take().
+    """
+
+    def __init__(self, degree_threshold, num_nodes=0, weighted=False):
+        """
+        :param degree_threshold: Minimum in/out-degree of hub accounts
+        :param num_nodes: Initial number of account vertices
+        :param weighted: Whether hubs are chosen with probabilities proportional to their degrees
+        """
+        self.degree_threshold = degree_threshold
+        self.weighted = weighted
+        self.samplers = dict()  # Bank ID (None for all banks) -> hub account list and AliasSampler
+        self.in_degrees = array("q", bytes(8 * num_nodes))
+        self.out_degrees = array("q", bytes(8 * num_nodes))
+        self.removed = array("b", bytes(num_nodes))  # Accounts no longer available as hubs
+        self.hubs = IndexedPool()
+        self.bank_hubs = dict()  # Bank ID -> hub accounts
+        self.acct_to_bank = None  # Account ID -> bank ID (None until activated)
+        self.candidates = None  # Typology member candidates
+
+    def __len__(self):
+        return len(self.hubs)
+
+    def __contains__(self, acct):
+        return acct in self.hubs
+
+    def _index(self, n):
+        """Array index of an account vertex (None if it is not counted)"""
+        if type(n) is not int:
+            if not isinstance(n, np.integer):
+                return None
+            n = int(n)
+        if n < 0:
+            return None
+        if n >= len(self.in_degrees):
+            self._reserve(n + 1)
+        return n
+
+    def _reserve(self, num):
+        num = max(num, len(self.in_degrees) * 2) - len(self.in_degrees)
+        self.in_degrees.extend(array("q", bytes(8 * num)))
+        self.out_degrees.extend(array("q", bytes(8 * num)))
+        self.removed.extend(array("b", bytes(num)))
+
+    def _is_hub_degree(self, i):
+        return self.in_degrees[i] >= self.degree_threshold or self.out_degrees[i] >= self.degree_threshold
+
+    def _update(self, i):
+        if self.candidates is not None and not self.removed[i] and i not in self.hubs \
+                and i in self.candidates and self._is_hub_degree(i):
+            self._add_hub(i)
+
+    def _add_hub(self, acct):
+        self.hubs.add(acct)
+        bank_id = self.acct_to_bank[acct]
+        if self.samplers:
+            self.samplers.pop(None, None)
+            self.samplers.pop(bank_id, None)
+        if bank_id not in self.bank_hubs:
+            self.bank_hubs[bank_id] = IndexedPool()
+        self.bank_hubs[bank_id].add(acct)
+
+    def add_edge(self, orig, bene):
+        """Count a transaction edge
+        :param orig: Originator account ID
+        :param bene: Beneficiary account ID
+        """
+        num = len(self.in_degrees)
+        i = orig if type(orig) is int and 0 <= orig < num else self._index(orig)
+        if i is not None:
+            self.out_degrees[i] += 1
+            if self.candidates is not None:
+                self._update(i)
+        j = bene if type(bene) is int and 0 <= bene < num else self._index(bene)
+        if j is not None:
+            self.in_degrees[j] += 1
+            if self.candidates is not None:
+                self._update(j)
+
+    def add_edges(self, src, dst):
+        """Count transaction edges at once
+        :param src: Originator account ID array
+        :param dst: Beneficiary account ID array
+        """
+        src = np.asarray(src)
+        dst = np.asarray(dst)
+        if src.dtype.kind not in "iu" or dst.dtype.kind not in "iu":
+            for orig, bene in zip(src.tolist(), dst.tolist()):
+                self.add_edge(orig, bene)
+            return
+        src = src[src >= 0]
+        dst = dst[dst >= 0]
+        max_id = max(src.max() if len(src) else -1, dst.max() if len(dst) else -1)
+        if max_id >= len(self.in_degrees):
+            self._reserve(int(max_id) + 1)
+        np.add.at(np.frombuffer(self.out_degrees, dtype=np.int64), src, 1)
+        np.add.at(np.frombuffer(self.in_degrees, dtype=np.int64), dst, 1)
+        if self.candidates is not None:
+            for i in np.unique(np.concatenate([src, dst])).tolist():
+                self._update(i)
+
+    def hub_degree_nodes(self):
+        """Accounts with in/out-degree not less than the threshold regardless of their availability
+        :return: Account ID list
+        """
+        in_degrees = np.frombuffer(self.in_degrees, dtype=np.int64)
+        out_degrees = np.frombuffer(self.out_degrees, dtype=np.int64)
+        mask = (in_degrees >= self.degree_threshold) | (out_degrees >= self.degree_threshold)
+        return np.flatnonzero(mask).tolist()
+
+    def activate(self, acct_to_bank, candidates):
+        """Build the hub pools from the current degrees and keep them updated afterwards
+        :param acct_to_bank: Account ID -> bank ID dict
+        :param candidates: Typology member candidates (accounts not in it are excluded)
+        """
+        self.acct_to_bank = acct_to_bank
+        self.candidates = candidates
+        self.hubs = IndexedPool()
+        self.bank_hubs = dict()
+        self.samplers = dict()
+        for acct in self.hub_degree_nodes():
+            if not self.removed[acct] and acct in candidates:
+                self._add_hub(acct)
+
+    def remove(self, acct):
+        """Exclude an account from hubs (e.g. it became a typology member)
+        :param acct: Account ID
+        """
+        i = self._index(acct)
+        if i is None:
+            return
+        self.removed[i] = 1
+        if acct in self.hubs:
+            self.hubs.remove(acct)
+            self.bank_hubs[self.acct_to_bank[acct]].discard(acct)
+
+    def remove_many(self, accts):
+        """Exclude accounts from hubs at once
+        :param accts: Account ID array (no duplicates)
+        """
+        accts = np.asarray(accts)
+        if accts.dtype.kind not in "iu":
+            for acct in accts.tolist():
+                self.remove(acct)
+            return
+        accts = accts[accts >= 0]
+        if len(accts) == 0:
+            return
+        max_id = int(accts.max())
+        if max_id >= len(self.removed):
+            self._reserve(max_id + 1)
+        np.frombuffer(self.removed, dtype=np.int8)[accts] = 1
+        accts = accts.tolist()
+        self.hubs.discard_many(accts)
+        if self.acct_to_bank is not None:
+            bank_accts = dict()
+            for acct in accts:
+                bank_accts.setdefault(self.acct_to_bank.get(acct), list()).append(acct)
+            for bank_id, members in bank_accts.items():
+                if bank_id in self.bank_hubs:
+                    self.bank_hubs[bank_id].discard_many(members)
+
+    def _sampler(self, bank_id, pool):
+        """Alias table of the hub accounts of a bank (None for all banks), rebuilt if more than half were removed
+        :return: Hub account list and AliasSampler
+        """
+        entry = self.samplers.get(bank_id)
+        if entry is None or 2 * len(pool) < len(entry[0]):
+            accts = list(pool.items)
+            idx = np.array(accts, dtype=np.int64)
+            degrees = np.frombuffer(self.in_degrees, dtype=np.int64)[idx] \
+                + np.frombuffer(self.out_degrees, dtype=np.int64)[idx]
+            entry = (accts, AliasSampler(np.maximum(degrees, 1)))  # Hubs without edges have weight 1
+            self.samplers[bank_id] = entry
+        return entry
+
+    def choice(self, bank_id=None, rand=random):
+        """Choose a hub account randomly
+        :param bank_id: If specified, it chooses a hub account of the bank
+        :param rand: random.Random object (default: the global random module)
+        :return: Account ID
+        """
+        if bank_id is None:
+            pool = self.hubs
+        elif bank_id not in self.bank_hubs:
+            raise IndexError("No hub accounts in bank %s" % str(bank_id))
+        else:
+            pool = self.bank_hubs[bank_id]
+        if not self.weighted:
+            return pool.choice(rand)
+        if not pool.items:
+            raise IndexError("Cannot choose from an empty pool")
+
+        accts, sampler = self._sampler(bank_id, pool)
+        while True:
+            acct = accts[sampler.draw_one(rand)]
+            if acct in pool:
+                return acct
+
+    def take(self, num, np_rand=np.random):
+        """Choose distinct hub accounts randomly (from all banks) and exclude them from hubs
+        :param num: Number of hub accounts
+        :param np_rand: np.random.RandomState object (default: the global np.random module)
+        :return: Account ID array
+        """
+        if num > len(self.hubs):
+            raise ValueError("Only %d hub accounts are left for %d main accounts" % (len(self.hubs), num))
+        if not self.weighted:
+            accts = self.hubs.take(num, np_rand)
+        else:
+            pool = self.hubs
+            hub_list, sampler = self._sampler(None, pool)
+            chosen = dict()  # Distinct hub accounts in the order of the draws
+            while len(chosen) < num:
+                for i in sampler.draw(2 * (num - len(chosen)), np_rand).tolist():
+                    acct = hub_list[i]
+                    if acct in pool and acct not in chosen:
+                        chosen[acct] = None
+                        if len(chosen) == num:
+                            break
+            accts = np.array(list(chosen), dtype=np.int64)
+        self.remove_many(accts)
+        return accts
@@ -0,0 +1,114 @@
+import random
+
+import numpy as np
+
+
+class IndexedPool:
+    """Set of items which supports O(1) addition/removal and O(k) random sampling.
+    Items are stored in a dense list with a position map, and removed by swapping with the last item.
+    Sampling uses the given random.Random object (the global `random` module by default),
+    so the results are reproducible with the random seed.
+    Bulk operations (take, discard_many) remove many items at once by moving the items
+    of the tail into the vacated positions, and draw random numbers with NumPy.
+    """
+
+    def __init__(self, items=()):
+        self.items = list()  # Dense item list
+        self.pos = dict()  # Item -> position in the list
+        self.update(items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.pos
+
+    def __iter__(self):
+        return iter(list(self.items))
+
+    def add(self, item):
+        if item not in self.pos:
+            self.pos[item] = len(self.items)
+            self.items.append(item)
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def remove(self, item):
+        """Remove an item by swapping it with the last one. If absent, it raises KeyError.
+        :param item: Item to be removed
+        """
+        i = self.pos.pop(item)
+        last = self.items.pop()
+        if i < len(self.items):
+            self.items[i] = last
+            self.pos[last] = i
+
+    def discard(self, item):
+        if item in self.pos:
+            self.remove(item)
+
+    def _remove_positions(self, positions):
+        """Remove items at distinct positions at once
+        :param positions: Position array (no duplicates)
+        :return: List of the removed items
+        """
+        items = self.items
+        pos = self.pos
+        positions = np.asarray(positions, dtype=np.int64)
+        removed = [items[i] for i in positions.tolist()]
+        size = len(items) - len(positions)
+        in_tail = np.zeros(len(positions), dtype=bool)
+        in_tail[positions[positions >= size] - size] = True
+        holes = positions[positions < size].tolist()
+        fillers = (np.flatnonzero(~in_tail) + size).tolist()  # Remaining items in the tail
+        for item in removed:
+            del pos[item]
+        for i, j in zip(holes, fillers):
+            item = items[j]
+            items[i] = item
+            pos[item] = i
+        del items[size:]
+        return removed
+
+    def take(self, k, np_rand=np.random):
+        """Choose k distinct items randomly and remove them
+        :param k: Number of items
+        :param np_rand: np.random.RandomState object (default: the global np.random module)
+        :return: Array of the items (in random order)
+        """
+        if not 0 <= k <= len(self.items):
+            raise ValueError("Sample larger than population or is negative")
+        if k == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.array(self._remove_positions(np_rand.choice(len(self.items), k, replace=False)))
+
+    def discard_many(self, items):
+        """Remove items at once (absent items are ignored)
+        :param items: Item list or array (no duplicates)
+        """
+        if isinstance(items, np.ndarray):
+            items = items.tolist()
+        pos = self.pos
+        positions = [pos[item] for item in items if item in pos]
+        if positions:
+            self._remove_positions(positions)
+
+    def sample(self, k, rand=random):
+        """Choose k distinct items randomly
+        :param k: Number of items
+        :param rand: random.Random object (default: the global random module)
+        :return: List of items
+        """
+        items = self.items
+        return [items[i] for i in rand.sample(range(len(items)), k)]
+
+    def choice(self, rand=random):
+        """
+        :param rand: random.Random object (default: the global random module)
+        :return: Item chosen randomly
+        """
+        if not self.items:
+            raise IndexError("Cannot choose from an empty pool")
+        return self.items[rand.randrange(len(self.items))]
@@ -1,8 +1,9 @@
 import networkx as nx
 
 class Nominator:
-    def __init__(self, g, degree_threshold):
+    def __init__(self, g, degree_threshold, accounts=None):
         self.g = g
+        self.accounts = accounts  # AccountTable which holds normal models (None: node attributes of g)
         self.degree_threshold = degree_threshold
         self.remaining_count_dict = dict()
         self.used_count_dict = dict()
@@ -364,22 +365,28 @@ class Nominator:
         return all(self.is_in_type_relationship(type, node_id, {node_id, succ_id}) for succ_id in succ_ids)
 
 
+    def get_normal_models(self, node_id):
+        if self.accounts is None:
+            return self.g.node[node_id]['normal_models']
+        return self.accounts.get_normal_models(node_id)
+
+
     def is_in_type_relationship(self, type, main_id, node_ids=set()):
         node_ids = set(node_ids)
-        normal_models = self.g.node[main_id]['normal_models']
+        normal_models = self.get_normal_models(main_id)
         filtereds = (nm for nm in normal_models if nm.type == type and nm.main_id == main_id)
         return any(node_ids.issubset(filtered.node_ids) for filtered in filtereds)
 
 
     def normal_models_in_type_relationship(self, type, main_id, node_ids=set()):
         node_ids = set(node_ids)
-        normal_models = self.g.node[main_id]['normal_models']
+        normal_models = self.get_normal_models(main_id)
         filtereds = (nm for nm in normal_models if nm.type == type and nm.main_id == main_id)
         return [filtered for filtered in filtereds if node_ids.issubset(filtered.node_ids)]
 
 
     def fan_clumps(self, type, node_id):
-        normal_models = self.g.node[node_id]['normal_models']
+        normal_models = self.get_normal_models(node_id)
         filtereds = (nm for nm in normal_models if nm.type == type and nm.main_id == node_id)
         return (filtered.node_ids_without_main() for filtered in filtereds)
 
@@ -0,0 +1,61 @@
+import csv
+import os
+
+
+def read_param_rows(path):
+    """
+    :param path: Parameter CSV file path
+    :return: Header and rows (without comment and empty lines)
+    """
+    with open(path, "r") as rf:
+        reader = csv.reader(rf)
+        header = next(reader)
+        return header, [row for row in reader if len(row) > 0 and not row[0].startswith("#")]
+
+
+def write_param_rows(path, header, rows):
+    """
+    :param path: Parameter CSV file path
+    :param header: Header row
+    :param rows: Iterable of rows
+    """
+    with open(path, "w") as wf:
+        writer = csv.writer(wf)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+class ParamFiles:
+    """Rows of the parameter CSV files in an input directory and values parsed from them.
+    Files are read and parsed once on demand. The parsed values must not depend on random seeds,
+    so that generators of multiple seeds can share them.
+    """
+
+    def __init__(self, input_dir):
+        """
+        :param input_dir: Input parameter directory
+        """
+        self.input_dir = input_dir
+        self.cache = dict()
+
+    def rows(self, name):
+        """
+        :param name: Parameter file name in the input directory
+        :return: List of all rows (including the header and comment lines)
+        """
+        key = ("rows", name)
+        if key not in self.cache:
+            with open(os.path.join(self.input_dir, name), "r") as rf:
+                self.cache[key] = list(csv.reader(rf))
+        return self.cache[key]
+
+    def parse(self, name, parser):
+        """
+        :param name: Parameter file name in the input directory
+        :param parser: Function which takes all rows of the file
+        :return: Cached return value of the parser
+        """
+        key = ("parse", name, parser.__module__, parser.__qualname__)
+        if key not in self.cache:
+            self.cache[key] = parser(self.rows(name))
+        return self.cache[key]
@@ -5,5 +5,8 @@ class RandomAmount:
         self.min = min
         self.max = max
 
-    def getAmount(self):
-        return random.uniform(self.min, self.max)
+    def getAmount(self, rand=random):
+        """
+        :param rand: random.Random object (default: the global random module)
+        """
+        return rand.uniform(self.min, self.max)
@@ -0,0 +1,67 @@
+import random
+
+import numpy as np
+
+
+# Stages with independent random number streams (the values are the first elements of the spawn keys)
+STAGE_KEYS = {
+    "base_graph": 0,
+    "balances": 1,
+    "normal_models": 2,
+    "alert_patterns": 3,
+    "tx_types": 4,
+    "identities": 5,
+    "base_degrees": 6,
+}
+
+
+class RandomStreams:
+    """Independent random number streams of generator stages derived from one seed with NumPy SeedSequence.
+    A stream is identified by a stage name and optional integer keys (e.g. the row number of an alert parameter),
+    so that changing a stage or a row does not shift the random numbers of the others.
+    The generator objects are passed to the code of each stage; the global random and np.random are not touched.
+    Members of later alert rows still depend on earlier rows, which remove accounts from the shared candidate pools.
+    """
+
+    def __init__(self, seed):
+        """
+        :param seed: Root seed (non-negative integer)
+        """
+        if seed is None or seed < 0:
+            raise ValueError("Random streams require a non-negative seed: %s" % str(seed))
+        self.seed = seed
+
+    def seed_sequence(self, stage, *keys):
+        """
+        :param stage: Stage name in STAGE_KEYS
+        :param keys: Additional non-negative integer keys (e.g. row number)
+        :return: SeedSequence of the stream
+        """
+        if stage not in STAGE_KEYS:
+            raise KeyError("Unknown random stream stage: %s" % stage)
+        return np.random.SeedSequence(self.seed, spawn_key=(STAGE_KEYS[stage],) + tuple(keys))
+
+    def int_seed(self, stage, *keys):
+        """
+        :return: 32-bit integer seed of the stream (e.g. for functions taking an integer seed)
+        """
+        return int(self.seed_sequence(stage, *keys).generate_state(1)[0])
+
+    def python_random(self, stage, *keys):
+        """
+        :return: random.Random object of the stream
+        """
+        state = self.seed_sequence(stage, *keys).generate_state(4, dtype=np.uint64)
+        return random.Random(int.from_bytes(state.tobytes(), "little"))
+
+    def numpy_random(self, stage, *keys):
+        """
+        :return: np.random.Generator object of the stream
+        """
+        return np.random.default_rng(self.seed_sequence(stage, *keys))
+
+    def random_state(self, stage, *keys):
+        """
+        :return: np.random.RandomState object of the stream (the same API as the global np.random functions)
+        """
+        return np.random.RandomState(self.seed_sequence(stage, *keys).generate_state(4))
@@ -1,13 +1,35 @@
 import random
 import math
 
+import numpy as np
+
 
 class RoundedAmount:
     def __init__(self, min, max):
         self.min = min
         self.max = max
 
-    def getAmount(self):
+    def getAmount(self, rand=random):
+        """
+        :param rand: random.Random object (default: the global random module)
+        """
+        result = rand.randrange(*self.__get_range())
+        return float(result)
+
+    def getAmounts(self, size, np_rand=np.random):
+        """Draw rounded amounts at once with NumPy
+        :param size: Number of amounts
+        :param np_rand: np.random.RandomState object (default: the global np.random generator)
+        :return: Float array of amounts
+        """
+        start, stop, step = self.__get_range()
+        num_slots = len(range(start, stop, step))
+        if num_slots == 0:
+            raise ValueError("empty range for getAmounts (%d, %d, %d)" % (start, stop, step))
+        return (start + step * np_rand.randint(0, num_slots, size)).astype(float)
+
+    def __get_range(self):
+        """Start, stop and step size of rounded amounts"""
         min = int(self.min)
         max = int(self.max)
         range = max - min
@@ -23,8 +45,7 @@ class RoundedAmount:
         if (power_of_ten > 1):
             start = self.__get_starting_value(min, num_digits_power_of_ten)
         
-        result = random.randrange(start, max + 1, power_of_ten)
-        return float(result)
+        return start, max + 1, power_of_ten
 
     
     def __get_step_size(self, step_size, range):
@@ -0,0 +1,100 @@
+import random
+from bisect import bisect_right
+
+import numpy as np
+
+
+def check_weights(weights):
+    """
+    :param weights: Weights of the items
+    :return: Float64 array of the weights
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.ndim != 1 or len(weights) == 0:
+        raise ValueError("Weights must be a non-empty 1-D sequence")
+    if not np.isfinite(weights).all() or (weights < 0).any():
+        raise ValueError("Weights must be finite and non-negative")
+    if weights.sum() <= 0:
+        raise ValueError("The sum of weights must be positive")
+    return weights
+
+
+class CumulativeSampler:
+    """Choices of item indices with integer weights by a binary search of cumulative weights.
+    A draw takes one random.randrange call, which draws the same random number as random.choice
+    over a list where each index is repeated by its weight (without expanding the list).
+    """
+
+    def __init__(self, weights):
+        """
+        :param weights: Non-negative integer weights of the items
+        """
+        weights = check_weights(weights)
+        if (weights != np.floor(weights)).any():
+            raise ValueError("Weights of the cumulative sampler must be integers")
+        self.cumulative = np.cumsum(weights.astype(np.int64)).tolist()
+        self.total = self.cumulative[-1]
+
+    def __len__(self):
+        return len(self.cumulative)
+
+    def draw_one(self, rand=random):
+        """
+        :param rand: random.Random object (default: the global random module)
+        :return: Item index
+        """
+        return bisect_right(self.cumulative, rand.randrange(self.total))
+
+
+class AliasSampler:
+    """Choices of item indices with arbitrary non-negative weights by the alias method (Vose).
+    After an O(n) construction, each draw takes O(1) time, and batches of draws are vectorized with NumPy.
+    """
+
+    def __init__(self, weights):
+        """
+        :param weights: Non-negative weights of the items (need not be normalized or integers)
+        """
+        weights = check_weights(weights)
+        n = len(weights)
+        scaled = (weights * (n / weights.sum())).tolist()
+        prob = [1.0] * n  # Probability to keep the column (otherwise its alias is chosen)
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            g = large[-1]
+            prob[s] = scaled[s]
+            alias[s] = g
+            scaled[g] -= 1.0 - scaled[s]
+            if scaled[g] < 1.0:
+                small.append(large.pop())
+        # The remaining columns are full (up to rounding errors)
+        self.prob = np.array(prob, dtype=np.float64)
+        self.alias = np.array(alias, dtype=np.int64)
+        self._prob = prob
+        self._alias = alias
+
+    def __len__(self):
+        return len(self._prob)
+
+    def draw_one(self, rand=random):
+        """
+        :param rand: random.Random object (default: the global random module)
+        :return: Item index
+        """
+        x = rand.random() * len(self._prob)
+        i = int(x)
+        return i if x - i < self._prob[i] else self._alias[i]
+
+    def draw(self, size, rng=None):
+        """
+        :param size: Number of draws
+        :param rng: np.random.Generator or RandomState object (default: the global np.random generator)
+        :return: Item index array
+        """
+        rng = np.random if rng is None else rng
+        x = rng.random(size) * len(self.prob)
+        i = np.minimum(x.astype(np.int64), len(self.prob) - 1)
+        return np.where(x - i < self.prob[i], i, self.alias[i])
@@ -0,0 +1,245 @@
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from amlsim.degree_sequence import remove_stubs
+from amlsim.param_files import read_param_rows, write_param_rows
+
+
+logger = logging.getLogger(__name__)
+
+# Transaction edges, normal models and AML typologies generated for a single bank.
+# Account IDs are bank-local (positions in the account list of the bank).
+ShardResult = namedtuple("ShardResult", [
+    "src",  # Originator array in the order of edge IDs
+    "dst",  # Beneficiary array in the order of edge IDs
+    "normal_models",  # List of (type, member account IDs, main account ID)
+    "alerts",  # AlertStore of the bank-local AML typologies
+    "removed",  # Accounts removed from the typology member candidates
+    "elapsed",  # Elapsed time (seconds)
+])
+
+
+def split_counts(total, weights):
+    """Split an integer count in proportion to weights with the largest remainder method
+    :param total: Count to be split
+    :param weights: Weight of each part (e.g. number of accounts of each bank)
+    :return: Integer array of the parts (the sum is equal to the total)
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    quotas = total * weights / weights.sum()
+    counts = np.floor(quotas).astype(np.int64)
+    rest = total - int(counts.sum())
+    counts[np.argsort(counts - quotas, kind="stable")[:rest]] += 1
+    return counts
+
+
+def expected_inter_ratios(in_deg, out_deg, groups):
+    """Probabilities that stubs of each account belong to edges between groups
+    when the stubs of all accounts are matched at once
+    (an out-stub goes to another group in proportion to the in-stubs of the other groups, and vice versa)
+    :param in_deg: In-degree array of all accounts
+    :param out_deg: Out-degree array of all accounts
+    :param groups: List of account ID arrays of the groups
+    :return: In-stub and out-stub probability arrays of all accounts
+    """
+    in_ratios = np.zeros(len(in_deg), dtype=np.float64)
+    out_ratios = np.zeros(len(out_deg), dtype=np.float64)
+    total_in = max(int(np.sum(in_deg)), 1)
+    total_out = max(int(np.sum(out_deg)), 1)
+    for accts in groups:
+        in_ratios[accts] = 1.0 - np.sum(out_deg[accts]) / total_out
+        out_ratios[accts] = 1.0 - np.sum(in_deg[accts]) / total_in
+    return in_ratios, out_ratios
+
+
+def split_degrees(in_deg, out_deg, groups, inter_ratio, rng, inter_out_ratio=None):
+    """Split in/out-degree sequences of all accounts into those of the edges within each group (bank)
+    and those of the edges between groups. Each stub goes to the inter-group part with the given probability.
+    Surplus stubs of a group are moved to the inter-group part so that the in/out-degree sums of each group
+    are equal, and surplus stubs of the inter-group part are dropped.
+    :param in_deg: In-degree array of all accounts
+    :param out_deg: Out-degree array of all accounts
+    :param groups: List of account ID arrays of the groups
+    :param inter_ratio: Probability that a stub belongs to an inter-group edge (a float or an array of the accounts)
+    :param rng: np.random.Generator object
+    :param inter_out_ratio: Probability for out-stubs if different from inter_ratio (e.g. expected_inter_ratios)
+    :return: List of in/out-degree array pairs of the groups, inter-group in-degree and out-degree arrays
+    """
+    in_deg = np.asarray(in_deg, dtype=np.int64)
+    out_deg = np.asarray(out_deg, dtype=np.int64)
+    inter_in = rng.binomial(in_deg, inter_ratio)
+    inter_out = rng.binomial(out_deg, inter_ratio if inter_out_ratio is None else inter_out_ratio)
+    local_degrees = list()
+    for accts in groups:
+        local_in = in_deg[accts] - inter_in[accts]
+        local_out = out_deg[accts] - inter_out[accts]
+        diff = int(local_in.sum() - local_out.sum())
+        if diff > 0:
+            moved = remove_stubs(local_in, diff, rng)
+            local_in -= moved
+            inter_in[accts] += moved
+        elif diff < 0:
+            moved = remove_stubs(local_out, -diff, rng)
+            local_out -= moved
+            inter_out[accts] += moved
+        local_degrees.append((local_in, local_out))
+    diff = int(inter_in.sum() - inter_out.sum())
+    if diff > 0:
+        inter_in -= remove_stubs(inter_in, diff, rng)
+    elif diff < 0:
+        inter_out -= remove_stubs(inter_out, -diff, rng)
+    return local_degrees, inter_in, inter_out
+
+
+def match_inter_group_stubs(in_deg, out_deg, acct_groups, rng, max_passes=100):
+    """Match in/out-degree stubs into edges between accounts of different groups (banks).
+    Stubs are matched by random permutations, and edges within a group are repaired by swapping beneficiaries
+    with random partner edges in vectorized passes (as self loops in directed_configuration_model_edges).
+    Edges which cannot be repaired (e.g. most stubs belong to one group) are returned separately
+    so that their stubs can be matched within the group (see add_local_stubs).
+    :param in_deg: In-degree array of all accounts
+    :param out_deg: Out-degree array of all accounts
+    :param acct_groups: Group index array of all accounts
+    :param rng: np.random.Generator object
+    :param max_passes: Maximum number of repair passes
+    :return: Originator and beneficiary arrays of the edges between groups (parallel edges may remain),
+    and those of the unmatched edges within groups
+    """
+    nodes = np.arange(len(in_deg), dtype=np.int64)
+    src = rng.permutation(np.repeat(nodes, out_deg))
+    dst = rng.permutation(np.repeat(nodes, in_deg))
+    num_edges = len(dst)
+    for _ in range(max_passes):
+        targets = np.flatnonzero(acct_groups[src] == acct_groups[dst])
+        if len(targets) == 0:
+            break
+        partners = rng.integers(0, num_edges, size=len(targets))
+        # Both of the new edges must be between different groups
+        valid = ((acct_groups[src[targets]] != acct_groups[dst[partners]])
+                 & (acct_groups[src[partners]] != acct_groups[dst[targets]]))
+        targets, partners = targets[valid], partners[valid]
+        # Each edge can take part in at most one swap per pass
+        touched, counts = np.unique(np.concatenate([targets, partners]), return_counts=True)
+        conflicts = touched[counts > 1]
+        ok = ~(np.isin(targets, conflicts) | np.isin(partners, conflicts))
+        targets, partners = targets[ok], partners[ok]
+        dst[targets], dst[partners] = dst[partners], dst[targets]
+    inter = acct_groups[src] != acct_groups[dst]
+    return src[inter], dst[inter], src[~inter], dst[~inter]
+
+
+def add_local_stubs(local_degrees, groups, src, dst):
+    """Add the stubs of edges within groups (e.g. unmatched inter-group edges) to the local degree sequences.
+    Both ends of each edge are in the same group, so the in/out-degree sums of each group stay equal.
+    :param local_degrees: List of in/out-degree array pairs of the groups (updated)
+    :param groups: List of account ID arrays of the groups
+    :param src: Originator array
+    :param dst: Beneficiary array
+    """
+    num_accts = sum(len(accts) for accts in groups)
+    acct_groups = np.empty(num_accts, dtype=np.int64)
+    positions = np.empty(num_accts, dtype=np.int64)  # Account ID -> position in the group
+    for i, accts in enumerate(groups):
+        acct_groups[accts] = i
+        positions[accts] = np.arange(len(accts))
+    for i, (local_in, local_out) in enumerate(local_degrees):
+        np.add.at(local_out, positions[src[acct_groups[src] == i]], 1)
+        np.add.at(local_in, positions[dst[acct_groups[dst] == i]], 1)
+
+
+def write_degree_csv(path, in_deg, out_deg):
+    """Write run-length encoded in/out-degree sequences as a degree CSV file
+    :param path: Output file path
+    :param in_deg: In-degree array
+    :param out_deg: Out-degree array
+    """
+    in_deg = np.asarray(in_deg)
+    out_deg = np.asarray(out_deg)
+    starts = np.concatenate([[0], np.flatnonzero((np.diff(in_deg) != 0) | (np.diff(out_deg) != 0)) + 1])
+    counts = np.diff(np.concatenate([starts, [len(in_deg)]]))
+    write_param_rows(path, ["Count", "In-degree", "Out-degree"],
+                     zip(counts.tolist(), in_deg[starts].tolist(), out_deg[starts].tolist()))
+
+
+def write_shard_inputs(input_conf, directory, bank_id, bank_index, bank_weights, in_deg, out_deg):
+    """Write parameter files of a bank: its account and alert parameter rows, normal model counts
+    in proportion to the bank weights, and its degree sequences
+    :param input_conf: "input" section of the configuration
+    :param directory: Output directory of the parameter files
+    :param bank_id: Bank ID
+    :param bank_index: Position of the bank in bank_weights
+    :param bank_weights: Weight of each bank splitting the normal model counts (e.g. number of local transactions)
+    :param in_deg: In-degree array of the bank accounts
+    :param out_deg: Out-degree array of the bank accounts
+    :return: Number of alert parameter rows of the bank
+    """
+    input_dir = input_conf["directory"]
+    os.makedirs(directory, exist_ok=True)
+
+    header, rows = read_param_rows(os.path.join(input_dir, input_conf["accounts"]))
+    idx_bank = header.index("bank_id")
+    write_param_rows(os.path.join(directory, input_conf["accounts"]), header,
+                     [row for row in rows if row[idx_bank] == bank_id])
+
+    header, rows = read_param_rows(os.path.join(input_dir, input_conf["normal_models"]))
+    idx_count = header.index("count")
+    for row in rows:
+        row[idx_count] = str(split_counts(int(row[idx_count]), bank_weights)[bank_index])
+    write_param_rows(os.path.join(directory, input_conf["normal_models"]), header, rows)
+
+    header, rows = read_param_rows(os.path.join(input_dir, input_conf["alert_patterns"]))
+    idx_bank = header.index("bank_id") if "bank_id" in header else None
+    rows = [row for row in rows if idx_bank is not None and row[idx_bank] == bank_id]
+    write_param_rows(os.path.join(directory, input_conf["alert_patterns"]), header, rows)
+
+    write_degree_csv(os.path.join(directory, input_conf["degree"]), in_deg, out_deg)
+    shutil.copy(os.path.join(input_dir, input_conf["transaction_type"]),
+                os.path.join(directory, input_conf["transaction_type"]))
+    return len(rows)
+
+
+def _init_worker():
+    os.environ.pop("RANDOM_SEED", None)  # Each shard has its own seed in the configuration
+
+
+def generate_shard(task):
+    """Run generator stages for a single bank (called in a worker process)
+    :param task: Tuple of the generator class, configuration dict and method names
+    :return: ShardResult object
+    """
+    generator_cls, conf, methods = task
+    begin = time.time()
+    txg = generator_cls(conf)
+    for method in methods:
+        getattr(txg, method)()
+    src, dst, edge_ids = txg.get_edge_id_arrays()
+    order = np.argsort(edge_ids, kind="stable")
+    normal_models = [(nm.type, list(nm.node_ids), nm.main_id) for nm in txg.normal_models]
+    alerts = txg.alert_groups
+    alerts.accounts = None  # Account attributes are merged separately
+    candidates = np.array(txg.candidate_accts.items, dtype=np.int64)
+    removed = np.setdiff1d(np.arange(txg.num_accounts), candidates)
+    return ShardResult(np.asarray(src, dtype=np.int64)[order], np.asarray(dst, dtype=np.int64)[order],
+                       normal_models, alerts, removed, time.time() - begin)
+
+
+def run_shards(tasks, num_workers, weights=None):
+    """Run shard tasks on a process pool (larger ones first)
+    :param tasks: List of generate_shard arguments
+    :param num_workers: Number of worker processes
+    :param weights: Expected cost of each task (e.g. number of accounts)
+    :return: List of ShardResult objects in the order of the tasks
+    """
+    order = np.argsort(-np.asarray(weights), kind="stable") if weights is not None else np.arange(len(tasks))
+    with multiprocessing.Pool(min(num_workers, len(tasks)), initializer=_init_worker) as pool:
+        results = pool.map(generate_shard, [tasks[i] for i in order], chunksize=1)
+    shards = [None] * len(tasks)
+    for i, result in zip(order.tolist(), results):
+        shards[i] = result
+    return shards
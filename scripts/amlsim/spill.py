@@ -0,0 +1,166 @@
+import heapq
+import logging
+import os
+import re
+import struct
+from array import array
+from collections import OrderedDict
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+MEMORY_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+MEMORY_SIZE_PATTERN = re.compile(r"^\s*([0-9]+(?:\.[0-9]*)?)\s*([KMGT]?)i?B?\s*$", re.IGNORECASE)
+
+# Approximate bytes of the main structures of the generator (measured with CPython 3.7 and networkx 1.11)
+NX_EDGE_BYTES = 600  # Adjacency entries of a networkx DiGraph edge with its attribute dict
+CSR_EDGE_BYTES = 64  # Index, edge ID and flag arrays of a CSRGraph edge
+ACCOUNT_BYTES = 250  # Account table row, bank and candidate pools
+NORMAL_MODEL_BYTES = 600  # NormalModel object and its member set
+NORMAL_MODEL_MEMBER_BYTES = 80  # Member in the set and reference from the account table
+ALERT_MEMBER_BYTES = 52  # Member account in the AlertStore (list slot and int object) and min/max amounts
+ALERT_EDGE_BYTES = 104  # Transaction of an alert in the AlertStore
+
+DEFAULT_SPILL_RATIO = 0.8  # Spill finished artifacts when the estimated usage exceeds this ratio of the budget
+
+RECORD_HEADER = struct.Struct("<qI")  # Merge key and byte length of a line
+RUN_BUFFER_SIZE = 1 << 20  # Bytes of the file buffer of a run
+
+
+def parse_memory_size(text):
+    """Parse a memory size with an optional binary unit (e.g. "16G", "512MB" and "1048576")
+    :param text: Memory size string
+    :return: Number of bytes
+    """
+    m = MEMORY_SIZE_PATTERN.match(str(text))
+    if m is None:
+        raise ValueError("Invalid memory size: %s" % text)
+    return int(float(m.group(1)) * MEMORY_UNITS[m.group(2).upper()])
+
+
+class MemoryBudget:
+    """Approximate memory usage of the main structures of the generator against a budget.
+    The usage is estimated from the sizes of the structures, not measured.
+    """
+
+    def __init__(self, max_bytes, spill_ratio=DEFAULT_SPILL_RATIO):
+        """
+        :param max_bytes: Memory budget (bytes)
+        :param spill_ratio: Ratio of the budget from which finished artifacts are spilled
+        """
+        if max_bytes <= 0:
+            raise ValueError("Memory budget must be positive: %d" % max_bytes)
+        self.max_bytes = max_bytes
+        self.spill_ratio = spill_ratio
+
+    def estimate(self, txg, num_model_members=None):
+        """
+        :param txg: TransactionGenerator object
+        :param num_model_members: Total number of members of the normal models in memory (estimated if None)
+        :return: Structure name -> estimated bytes
+        """
+        edge_bytes = CSR_EDGE_BYTES if txg.graph_backend == "csr" else NX_EDGE_BYTES
+        if num_model_members is None:
+            num_model_members = 3 * len(txg.normal_models)
+        alerts = txg.alert_groups
+        return OrderedDict([
+            ("graph", (txg.edge_id - txg.num_spilled_edges) * edge_bytes),
+            ("accounts", len(txg.accounts) * ACCOUNT_BYTES),
+            ("normal_models", len(txg.normal_models) * NORMAL_MODEL_BYTES
+             + num_model_members * NORMAL_MODEL_MEMBER_BYTES),
+            ("alerts", len(alerts.members) * ALERT_MEMBER_BYTES + len(alerts.edge_src) * ALERT_EDGE_BYTES),
+        ])
+
+    def is_close(self, usage):
+        """
+        :param usage: Result of estimate
+        :return: Whether the usage is close to the budget
+        """
+        return sum(usage.values()) >= self.spill_ratio * self.max_bytes
+
+
+class RunFiles:
+    """Run files of formatted CSV lines of an output file.
+    Each run is a sequence of lines sorted by integer merge keys (e.g. alert IDs),
+    and the writer merges all runs and the lines still in memory by the keys.
+    """
+
+    def __init__(self, directory, name):
+        """
+        :param directory: Directory of the run files
+        :param name: Name of the output (prefix of the run files)
+        """
+        self.directory = directory
+        self.name = name
+        self.paths = list()
+        self.num_lines = 0
+
+    def __len__(self):
+        return len(self.paths)
+
+    def write_run(self, records):
+        """Write a run
+        :param records: Iterable of (key, formatted CSV line without the line terminator) in ascending order of keys
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, "%s.%d.run" % (self.name, len(self.paths)))
+        num = 0
+        with open(path, "wb", buffering=RUN_BUFFER_SIZE) as wf:
+            for key, line in records:
+                data = line.encode("utf-8")
+                wf.write(RECORD_HEADER.pack(key, len(data)))
+                wf.write(data)
+                num += 1
+        self.paths.append(path)
+        self.num_lines += num
+        logger.info("Spilled %d %s lines to %s" % (num, self.name, path))
+
+    @staticmethod
+    def read_run(path):
+        """
+        :param path: Run file path
+        :return: Generator of (key, line)
+        """
+        with open(path, "rb", buffering=RUN_BUFFER_SIZE) as rf:
+            while True:
+                header = rf.read(RECORD_HEADER.size)
+                if not header:
+                    break
+                key, size = RECORD_HEADER.unpack(header)
+                yield key, rf.read(size).decode("utf-8")
+
+    def merge(self, *others):
+        """Merge the runs and other sorted (key, line) iterables
+        :return: Generator of lines in the order of the keys
+        """
+        runs = [self.read_run(path) for path in self.paths] + list(others)
+        return (line for _, line in heapq.merge(*runs, key=lambda record: record[0]))
+
+    def remove(self):
+        for path in self.paths:
+            os.remove(path)
+        self.paths = list()
+
+
+def write_groups(path, groups):
+    """Write account groups (e.g. members of normal models) as flat arrays
+    :param path: Output file path (.npz)
+    :param groups: Iterable of integer account ID collections
+    """
+    members = array("q")
+    sizes = array("q")
+    for group in groups:
+        members.extend(group)
+        sizes.append(len(group))
+    np.savez(path, members=np.frombuffer(members, dtype=np.int64), sizes=np.frombuffer(sizes, dtype=np.int64))
+
+
+def read_groups(path):
+    """
+    :param path: File path written by write_groups
+    :return: Flat member account ID array and size array of the groups
+    """
+    with np.load(path) as data:
+        return data["members"], data["sizes"]
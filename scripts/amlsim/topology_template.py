@@ -0,0 +1,116 @@
+import logging
+import os
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_edgelist(lines, delimiter=",", comments="#"):
+    """Parse an edge list in the same way as networkx.read_edgelist with a DiGraph:
+    nodes are in the order of their first appearance and edges are grouped by originators.
+    Duplicate edges are ignored and columns after the first two (edge data) are not used.
+    :param lines: Lines of the edge list
+    :param delimiter: Column delimiter
+    :param comments: Marker of the comments
+    :return: List of node labels, originator and beneficiary node index arrays
+    """
+    node_index = dict()
+    edges = dict()  # (originator, beneficiary) -> None in the order of insertions
+    for line in lines:
+        p = line.find(comments)
+        if p >= 0:
+            line = line[:p]
+        s = line.strip().split(delimiter)
+        if len(s) < 2:
+            continue
+        u = node_index.setdefault(s[0], len(node_index))
+        v = node_index.setdefault(s[1], len(node_index))
+        edges[(u, v)] = None
+    src = np.array([u for u, _ in edges], dtype=np.int64)
+    dst = np.array([v for _, v in edges], dtype=np.int64)
+    order = np.argsort(src, kind="stable")
+    return list(node_index), src[order], dst[order]
+
+
+class TopologyTemplate:
+    """Subgraph topology of a custom AML typology as arrays of template node indices.
+    A template can be stamped onto many member account sets at once.
+    """
+
+    def __init__(self, nodes, src, dst):
+        """
+        :param nodes: List of node labels (the i-th member account is mapped to the i-th node)
+        :param src: Originator node index array
+        :param dst: Beneficiary node index array
+        """
+        self.nodes = nodes
+        self.src = np.asarray(src, dtype=np.int64)
+        self.dst = np.asarray(dst, dtype=np.int64)
+
+    @property
+    def num_nodes(self):
+        return len(self.nodes)
+
+    @property
+    def num_edges(self):
+        return len(self.src)
+
+    @classmethod
+    def from_graph(cls, topology):
+        """
+        :param topology: Topology graph (networkx DiGraph)
+        :return: TopologyTemplate with the nodes and edges in the order of the graph
+        """
+        nodes = topology.nodes()
+        node_index = {n: i for i, n in enumerate(nodes)}
+        edges = topology.edges()
+        return cls(nodes, [node_index[u] for u, _ in edges], [node_index[v] for _, v in edges])
+
+    @classmethod
+    def from_edgelist(cls, path):
+        """
+        :param path: Edge list CSV file path
+        :return: TopologyTemplate
+        """
+        with open(path, "r") as rf:
+            return cls(*parse_edgelist(rf))
+
+    def stamp(self, member_sets):
+        """Map the template nodes to member accounts of each set
+        :param member_sets: List of member account ID lists (or 2D array) of the same size as the template nodes
+        :return: Originator and beneficiary account ID arrays (edges of each member set in order)
+        """
+        members = np.asarray(member_sets)
+        if members.ndim != 2 or members.shape[1] != self.num_nodes:
+            raise ValueError("Each member set must have %d accounts (template nodes)" % self.num_nodes)
+        return members[:, self.src].ravel(), members[:, self.dst].ravel()
+
+
+class TemplateLibrary:
+    """Topology templates parsed from edge list files.
+    Each file is parsed once and parsed again only if its modification time changes.
+    """
+
+    def __init__(self):
+        self.templates = dict()  # Absolute path -> (modification time, TopologyTemplate)
+
+    def __len__(self):
+        return len(self.templates)
+
+    def get(self, path):
+        """
+        :param path: Edge list CSV file path
+        :return: TopologyTemplate
+        """
+        key = os.path.abspath(path)
+        mtime = os.stat(key).st_mtime_ns
+        cached = self.templates.get(key)
+        if cached is None or cached[0] != mtime:
+            template = TopologyTemplate.from_edgelist(key)
+            logger.info("Loaded topology template %s (%d nodes, %d edges)"
+                        % (path, template.num_nodes, template.num_edges))
+            cached = (mtime, template)
+            self.templates[key] = cached
+        return cached[1]
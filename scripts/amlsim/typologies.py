@@ -0,0 +1,718 @@
+import itertools
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from amlsim.random_amount import RandomAmount
+from amlsim.rounded_amount import RoundedAmount
+
+
+logger = logging.getLogger(__name__)
+
+
+class TypologyPlan:
+    """Members and transaction edges of the typologies of an alert parameter row,
+    chosen before drawing amounts and dates.
+    Members of each typology are contiguous in the member array, and edges are grouped by typology
+    with their endpoints given as positions in the member array.
+    """
+
+    def __init__(self, planned, members, member_counts, mains, src, dst, edge_counts, phases=None):
+        """
+        :param planned: Index array of the planned typologies in the row (the others failed)
+        :param members: Member account ID array
+        :param member_counts: Number of members of each planned typology
+        :param mains: Position of the main account of each planned typology in the member array
+        :param src: Member position of the originator of each edge
+        :param dst: Member position of the beneficiary of each edge
+        :param edge_counts: Number of edges of each planned typology
+        :param phases: Phase of each edge (e.g. position in a cycle, or scatter (0) and gather (1))
+        """
+        self.planned = planned
+        self.members = members
+        self.member_counts = member_counts
+        self.mains = mains
+        self.src = src
+        self.dst = dst
+        self.edge_counts = edge_counts
+        self.phases = phases if phases is not None else np.zeros(len(src), dtype=np.int64)
+
+
+def concat_ranges(begins, counts):
+    """Concatenate integer ranges [begin, begin + count) at once
+    :param begins: Begin of each range
+    :param counts: Length of each range
+    :return: Integer array
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    ends = np.cumsum(counts)
+    total = int(ends[-1]) if len(ends) else 0
+    return np.arange(total, dtype=np.int64) + np.repeat(np.asarray(begins, dtype=np.int64) - (ends - counts), counts)
+
+
+def join_groups(arrays, counts):
+    """Join groups of elements of typologies (e.g. originator and beneficiary accounts)
+    so that the elements of each typology are contiguous in the order of the groups
+    :param arrays: Element array of each group (elements of each typology are contiguous)
+    :param counts: Count array of each group (number of elements of each typology)
+    :return: Joined array, total count of each typology and begin positions of the groups (typologies x groups)
+    """
+    counts = np.stack([np.asarray(c, dtype=np.int64) for c in counts], axis=1)
+    totals = counts.sum(axis=1)
+    begins = np.cumsum(counts, axis=1) - counts + (np.cumsum(totals) - totals)[:, np.newaxis]
+    joined = np.empty(int(totals.sum()), dtype=np.result_type(*arrays))
+    for g, values in enumerate(arrays):
+        joined[concat_ranges(begins[:, g], counts[:, g])] = values
+    return joined, totals, begins
+
+
+def product_edges(orig_begins, orig_counts, bene_begins, bene_counts):
+    """All-to-all edges between two member groups of each typology (in the order of itertools.product)
+    :return: Originator and beneficiary position arrays and the number of edges of each typology
+    """
+    counts = orig_counts * bene_counts
+    inst = np.repeat(np.arange(len(counts)), counts)
+    local = concat_ranges(np.zeros(len(counts), dtype=np.int64), counts)
+    return orig_begins[inst] + local // bene_counts[inst], bene_begins[inst] + local % bene_counts[inst], counts
+
+
+class Typology:
+    """Base class of AML typology generators.
+
+    generate() adds a single typology with Python random numbers (reference implementation).
+    Regular typologies also implement plan() and emit() for batch generation:
+    plan() chooses members and edges of all typologies of an alert parameter row at once as arrays,
+    and emit() draws amounts and dates of all planned edges with NumPy.
+    Random generators are passed explicitly: `rand` is a random.Random object (or the global random module)
+    and `np_rand` is a np.random.RandomState object (or the global np.random module).
+    Each typology records the number of calls, wall time and emitted edges.
+    """
+    name = None  # Typology name in the alert parameter file
+    model_id = None  # Alert model ID
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.edges = 0
+
+    @property
+    def batchable(self):
+        return type(self).plan is not Typology.plan
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external, rand):
+        """Add a typology to the transaction graph
+        :param txg: TransactionGenerator object
+        :param sub_g: Transaction subgraph of this typology
+        :param num_accounts: Number of members
+        :param min_amount: Minimum amount of the transaction
+        :param max_amount: Maximum amount of the transaction
+        :param start_date: Start step
+        :param end_date: End step (inclusive)
+        :param is_external: Whether members are chosen from multiple banks
+        :param rand: random.Random object
+        :return: Main account ID, or None if failed
+        """
+        raise NotImplementedError
+
+    def plan(self, txg, sizes, is_external, np_rand):
+        """Choose members and transaction edges of typologies for batch generation
+        :param txg: TransactionGenerator object
+        :param sizes: Number of members of each typology
+        :param is_external: Whether members are chosen from multiple banks
+        :param np_rand: np.random.RandomState object choosing the members
+        :return: TypologyPlan object
+        """
+        raise NotImplementedError
+
+    def emit(self, txg, num_patterns, min_amount, max_amount, starts, ends, inst, phases, np_rand):
+        """Draw amounts and dates of planned edges. By default, each edge has a random amount and date.
+        :param txg: TransactionGenerator object
+        :param num_patterns: Number of typologies
+        :param min_amount: Minimum amount of the transaction
+        :param max_amount: Maximum amount of the transaction
+        :param starts: Start step of each typology
+        :param ends: End step of each typology (inclusive)
+        :param inst: Typology index of each edge
+        :param phases: Phase of each edge
+        :param np_rand: np.random.RandomState object
+        :return: Amount and date arrays
+        """
+        amounts = np_rand.uniform(min_amount, max_amount, len(inst))
+        return amounts, uniform_dates(starts, ends, inst, np_rand)
+
+    def demand(self, num_accounts, is_external):
+        """Accounts which a typology takes from the member candidates (used by the pre-flight check).
+        By default, the main account is a hub account and the others are members.
+        :param num_accounts: Number of members
+        :param is_external: Whether members are chosen from multiple banks
+        :return: Number of hub accounts (main accounts) and total number of accounts
+        """
+        return 1, num_accounts
+
+    def record(self, seconds, edges, calls=1):
+        self.calls += calls
+        self.seconds += seconds
+        self.edges += edges
+
+
+def uniform_dates(starts, ends, inst, np_rand):
+    """Draw a date of each edge uniformly from the period of its typology"""
+    if len(inst) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np_rand.randint(starts[inst], ends[inst] + 1)
+
+
+def phased_dates(starts, ends, inst, phases, np_rand):
+    """Draw dates of the first phase (before the middle day) and the second phase (after that)"""
+    if len(inst) == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = starts[inst]
+    ends = ends[inst]
+    mid_dates = (starts + ends) // 2
+    low = np.where(phases == 0, starts, mid_dates)
+    high = np.where(phases == 0, mid_dates, ends + 1)
+    return np_rand.randint(low, high)
+
+
+class TypologyRegistry:
+    """AML typology generators by name"""
+
+    def __init__(self):
+        self.typologies = OrderedDict()
+
+    def __contains__(self, name):
+        return name in self.typologies
+
+    def __getitem__(self, name):
+        return self.typologies[name]
+
+    def __iter__(self):
+        return iter(self.typologies.values())
+
+    def register(self, typology):
+        if typology.name in self.typologies:
+            raise ValueError("Typology %s is already registered" % typology.name)
+        if typology.model_id in self.model_ids().values():
+            raise ValueError("Model ID %d of typology %s is already used" % (typology.model_id, typology.name))
+        self.typologies[typology.name] = typology
+
+    def model_ids(self):
+        """Typology names and alert model IDs"""
+        return OrderedDict((t.name, t.model_id) for t in self.typologies.values())
+
+    def log_stats(self):
+        for t in self.typologies.values():
+            if t.calls > 0:
+                logger.info("Typology %s: %d typologies, %d edges, %.3f seconds"
+                            % (t.name, t.calls, t.edges, t.seconds))
+
+
+_typology_classes = list()
+
+
+def register_typology(cls):
+    """Class decorator to register a Typology subclass to new registries
+    """
+    _typology_classes.append(cls)
+    return cls
+
+
+def create_registry():
+    """Create a registry with instances of all registered typologies
+    :return: TypologyRegistry object
+    """
+    registry = TypologyRegistry()
+    for cls in _typology_classes:
+        registry.register(cls())
+    return registry
+
+
+@register_typology
+class FanOut(Typology):
+    """Single (main) account --> multiple accounts"""
+    name = "fan_out"
+    model_id = 1
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external, rand):
+        main_acct, main_bank_id = txg.reserve_main_acct(rand)
+        txg.add_typology_node(sub_g, main_acct)
+        num_neighbors = num_accounts - 1
+        amount = RoundedAmount(min_amount, max_amount).getAmount(rand)
+
+        if is_external:
+            sub_bank_id = txg.choose_other_bank(main_bank_id, num_neighbors, rand)
+            if sub_bank_id is None:
+                return None
+        else:
+            sub_bank_id = main_bank_id
+        sub_accts = txg.reserve_members(sub_bank_id, num_neighbors, rand)
+        for n in sub_accts:
+            txg.add_typology_node(sub_g, n)
+
+        for bene in sub_accts:
+            date = rand.randrange(start_date, end_date + 1)
+            txg.add_typology_edge(sub_g, main_acct, bene, amount, date)
+        return main_acct
+
+    def plan(self, txg, sizes, is_external, np_rand):
+        main_accts, main_bank_ids = txg.reserve_main_accts(len(sizes), np_rand)
+        num_neighbors = sizes - 1
+        planned = np.arange(len(sizes))
+        if is_external:
+            sub_bank_ids = txg.choose_other_banks(main_bank_ids, num_neighbors, np_rand)
+            planned = np.flatnonzero([bank_id is not None for bank_id in sub_bank_ids])
+            sub_bank_ids = sub_bank_ids[planned]
+        else:
+            sub_bank_ids = main_bank_ids
+        num_neighbors = num_neighbors[planned]
+        sub_accts = txg.reserve_bank_members(sub_bank_ids, num_neighbors, np_rand)
+        members, counts, begins = join_groups([main_accts[planned], sub_accts],
+                                              [np.ones(len(planned), dtype=np.int64), num_neighbors])
+        src = np.repeat(begins[:, 0], num_neighbors)
+        dst = concat_ranges(begins[:, 1], num_neighbors)
+        return TypologyPlan(planned, members, counts, begins[:, 0], src, dst, num_neighbors)
+
+    def emit(self, txg, num_patterns, min_amount, max_amount, starts, ends, inst, phases, np_rand):
+        # Same rounded amount for all edges of a typology
+        amounts = RoundedAmount(min_amount, max_amount).getAmounts(num_patterns, np_rand)[inst]
+        return amounts, uniform_dates(starts, ends, inst, np_rand)
+
+
+@register_typology
+class FanIn(FanOut):
+    """Multiple accounts --> single (main) account"""
+    name = "fan_in"
+    model_id = 2
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external, rand):
+        main_acct, main_bank_id = txg.reserve_main_acct(rand)
+        txg.add_typology_node(sub_g, main_acct)
+        num_neighbors = num_accounts - 1
+        amount = RoundedAmount(min_amount, max_amount).getAmount(rand)
+
+        if is_external:
+            sub_bank_id = txg.choose_other_bank(main_bank_id, num_neighbors, rand)
+            if sub_bank_id is None:
+                return None
+        else:
+            sub_bank_id = main_bank_id
+        sub_accts = txg.reserve_members(sub_bank_id, num_neighbors, rand)
+        for n in sub_accts:
+            txg.add_typology_node(sub_g, n)
+
+        for orig in sub_accts:
+            date = rand.randrange(start_date, end_date + 1)
+            txg.add_typology_edge(sub_g, orig, main_acct, amount, date)
+        return main_acct
+
+    def plan(self, txg, sizes, is_external, np_rand):
+        plan = FanOut.plan(self, txg, sizes, is_external, np_rand)
+        plan.src, plan.dst = plan.dst, plan.src
+        return plan
+
+
+@register_typology
+class Cycle(Typology):
+    """Cycle transactions. Each member keeps the margin of the received amount."""
+    name = "cycle"
+    model_id = 3
+
+    def demand(self, num_accounts, is_external):
+        return (0 if is_external else 1), num_accounts
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external, rand):
+        amount = RandomAmount(min_amount, max_amount).getAmount(rand)
+        dates = sorted([rand.randrange(start_date, end_date + 1) for _ in range(num_accounts)])
+
+        all_accts = self.reserve_cycle_members(txg, num_accounts, is_external, rand)
+        for n in all_accts:
+            txg.add_typology_node(sub_g, n)
+        main_acct = all_accts[0]
+
+        for i in range(num_accounts):
+            orig_acct = all_accts[i]
+            bene_acct = all_accts[(i + 1) % num_accounts]
+            txg.add_typology_edge(sub_g, orig_acct, bene_acct, amount, dates[i])
+            margin = amount * txg.margin_ratio  # Margin the beneficiary account can gain
+            amount = amount - margin  # max(amount - margin, min_amount)
+        return main_acct
+
+    @staticmethod
+    def reserve_cycle_members(txg, num_accounts, is_external, rand):
+        if is_external:
+            all_accts = list()
+            all_bank_ids = txg.get_all_bank_ids()
+            remain_num = num_accounts
+            while all_bank_ids:
+                num_accts_per_bank = remain_num // len(all_bank_ids)
+                new_members = txg.reserve_members(all_bank_ids.pop(), num_accts_per_bank, rand)
+                all_accts.extend(new_members)
+                remain_num -= len(new_members)
+            return all_accts
+        main_acct, main_bank_id = txg.reserve_main_acct(rand)
+        return [main_acct] + txg.reserve_members(main_bank_id, num_accounts - 1, rand)
+
+    def plan(self, txg, sizes, is_external, np_rand):
+        if is_external:
+            # Members are split evenly among the banks in the same order as reserve_cycle_members
+            groups = list()
+            group_counts = list()
+            remain_nums = sizes.copy()
+            all_bank_ids = txg.get_all_bank_ids()
+            while all_bank_ids:
+                nums = remain_nums // len(all_bank_ids)
+                bank_id = all_bank_ids.pop()
+                groups.append(txg.reserve_bank_members([bank_id] * len(sizes), nums, np_rand))
+                group_counts.append(nums)
+                remain_nums -= nums
+        else:
+            main_accts, main_bank_ids = txg.reserve_main_accts(len(sizes), np_rand)
+            groups = [main_accts, txg.reserve_bank_members(main_bank_ids, sizes - 1, np_rand)]
+            group_counts = [np.ones(len(sizes), dtype=np.int64), sizes - 1]
+        members, counts, begins = join_groups(groups, group_counts)
+        src = np.arange(len(members))
+        phases = src - np.repeat(begins[:, 0], counts)  # Position in the cycle
+        dst = src + 1
+        dst[begins[:, 0] + counts - 1] = begins[:, 0]  # The last member sends to the first one
+        return TypologyPlan(np.arange(len(sizes)), members, counts, begins[:, 0], src, dst, counts, phases)
+
+    def emit(self, txg, num_patterns, min_amount, max_amount, starts, ends, inst, phases, np_rand):
+        amounts = np_rand.uniform(min_amount, max_amount, num_patterns)[inst]
+        amounts = amounts * (1.0 - txg.margin_ratio) ** phases
+        dates = uniform_dates(starts, ends, inst, np_rand)
+        dates = dates[np.lexsort((dates, inst))]  # Transactions of a cycle are performed in order
+        return amounts, dates
+
+
+@register_typology
+class Bipartite(Typology):
+    """Originators -> many-to-many -> beneficiaries"""
+    name = "bipartite"
+    model_id = 4
+
+    def demand(self, num_accounts, is_external):
+        return 0, num_accounts
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external, rand):
+        orig_bank_id, bene_bank_id = self.choose_banks(txg, is_external, rand)
+
+        num_orig_accts = num_accounts // 2  # The former half members are originator accounts
+        num_bene_accts = num_accounts - num_orig_accts  # The latter half members are beneficiary accounts
+
+        orig_accts = txg.reserve_members(orig_bank_id, num_orig_accts, rand)
+        for n in orig_accts:
+            txg.add_typology_node(sub_g, n)
+        main_acct = orig_accts[0]
+
+        bene_accts = txg.reserve_members(bene_bank_id, num_bene_accts, rand)
+        for n in bene_accts:
+            txg.add_typology_node(sub_g, n)
+
+        for orig, bene in itertools.product(orig_accts, bene_accts):  # All-to-all transaction edges
+            amount = RandomAmount(min_amount, max_amount).getAmount(rand)
+            date = rand.randrange(start_date, end_date + 1)
+            txg.add_typology_edge(sub_g, orig, bene, amount, date)
+        return main_acct
+
+    @staticmethod
+    def choose_banks(txg, is_external, rand):
+        orig_bank_id = txg.bank_capacity.choice(0, rand=rand)
+        if is_external:
+            bene_bank_id = txg.bank_capacity.choice(0, exclude=orig_bank_id, rand=rand)
+        else:
+            bene_bank_id = orig_bank_id
+        return orig_bank_id, bene_bank_id
+
+    def plan(self, txg, sizes, is_external, np_rand):
+        any_banks = np.zeros(len(sizes), dtype=np.int64)
+        orig_bank_ids = txg.bank_capacity.choices(any_banks, np_rand=np_rand)
+        bene_bank_ids = txg.bank_capacity.choices(any_banks, orig_bank_ids, np_rand) if is_external else orig_bank_ids
+        num_orig_accts = sizes // 2
+        num_bene_accts = sizes - num_orig_accts
+        orig_accts = txg.reserve_bank_members(orig_bank_ids, num_orig_accts, np_rand)
+        bene_accts = txg.reserve_bank_members(bene_bank_ids, num_bene_accts, np_rand)
+        members, counts, begins = join_groups([orig_accts, bene_accts], [num_orig_accts, num_bene_accts])
+        src, dst, edge_counts = product_edges(begins[:, 0], num_orig_accts, begins[:, 1], num_bene_accts)
+        return TypologyPlan(np.arange(len(sizes)), members, counts, begins[:, 0], src, dst, edge_counts)
+
+
+@register_typology
+class Stack(Typology):
+    """Stacked bipartite layers"""
+    name = "stack"
+    model_id = 5
+
+    def demand(self, num_accounts, is_external):
+        return 0, num_accounts
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external, rand):
+        orig_bank_id, mid_bank_id, bene_bank_id = txg.choose_three_banks(is_external, rand)
+
+        # First and second 1/3 of members: originator and intermediate accounts
+        num_orig_accts = num_mid_accts = num_accounts // 3
+        # Last 1/3 of members: beneficiary accounts
+        num_bene_accts = num_accounts - num_orig_accts * 2
+
+        orig_accts = txg.reserve_members(orig_bank_id, num_orig_accts, rand)
+        for n in orig_accts:
+            txg.add_typology_node(sub_g, n)
+        main_acct = orig_accts[0]
+
+        mid_accts = txg.reserve_members(mid_bank_id, num_mid_accts, rand)
+        for n in mid_accts:
+            txg.add_typology_node(sub_g, n)
+        bene_accts = txg.reserve_members(bene_bank_id, num_bene_accts, rand)
+        for n in bene_accts:
+            txg.add_typology_node(sub_g, n)
+
+        for orig, bene in itertools.chain(itertools.product(orig_accts, mid_accts),
+                                          itertools.product(mid_accts, bene_accts)):  # all-to-all transactions
+            amount = RandomAmount(min_amount, max_amount).getAmount(rand)
+            date = rand.randrange(start_date, end_date + 1)
+            txg.add_typology_edge(sub_g, orig, bene, amount, date)
+        return main_acct
+
+    def plan(self, txg, sizes, is_external, np_rand):
+        orig_bank_ids, mid_bank_ids, bene_bank_ids = txg.choose_three_bank_arrays(is_external, len(sizes), np_rand)
+        num_orig_accts = num_mid_accts = sizes // 3
+        num_bene_accts = sizes - num_orig_accts * 2
+        groups = [txg.reserve_bank_members(orig_bank_ids, num_orig_accts, np_rand),
+                  txg.reserve_bank_members(mid_bank_ids, num_mid_accts, np_rand),
+                  txg.reserve_bank_members(bene_bank_ids, num_bene_accts, np_rand)]
+        members, counts, begins = join_groups(groups, [num_orig_accts, num_mid_accts, num_bene_accts])
+        first = product_edges(begins[:, 0], num_orig_accts, begins[:, 1], num_mid_accts)
+        second = product_edges(begins[:, 1], num_mid_accts, begins[:, 2], num_bene_accts)
+        src, edge_counts, _ = join_groups([first[0], second[0]], [first[2], second[2]])
+        dst = join_groups([first[1], second[1]], [first[2], second[2]])[0]
+        return TypologyPlan(np.arange(len(sizes)), members, counts, begins[:, 0], src, dst, edge_counts)
+
+
+@register_typology
+class RandomTransactions(Typology):
+    """Random transactions among members"""
+    name = "random"
+    model_id = 6
+
+    def demand(self, num_accounts, is_external):
+        return (0 if is_external else 1), num_accounts
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external, rand):
+        amount = RandomAmount(min_amount, max_amount).getAmount(rand)
+        date = rand.randrange(start_date, end_date + 1)
+
+        if is_external:
+            bank_id_iter = itertools.cycle(txg.bank_capacity.ids())
+            prev_acct = None
+            main_acct = None
+            for _ in range(num_accounts):
+                bank_id = next(bank_id_iter)
+                next_acct = txg.reserve_members(bank_id, 1, rand)[0]
+                if prev_acct is None:
+                    main_acct = next_acct
+                else:
+                    txg.add_typology_edge(sub_g, prev_acct, next_acct, amount, date)
+                txg.add_typology_node(sub_g, next_acct)
+                prev_acct = next_acct
+
+        else:
+            main_acct, main_bank_id = txg.reserve_main_acct(rand)
+            txg.add_typology_node(sub_g, main_acct)
+            sub_accts = txg.reserve_members(main_bank_id, num_accounts - 1, rand)
+            for n in sub_accts:
+                txg.add_typology_node(sub_g, n)
+            prev_acct = main_acct
+            for _ in range(num_accounts - 1):
+                next_acct = rand.choice([n for n in sub_accts if n != prev_acct])
+                txg.add_typology_edge(sub_g, prev_acct, next_acct, amount, date)
+                prev_acct = next_acct
+        return main_acct
+
+
+@register_typology
+class ScatterGather(Typology):
+    """Fan-out -> fan-in"""
+    name = "scatter_gather"
+    model_id = 7
+
+    def demand(self, num_accounts, is_external):
+        return 0, num_accounts
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external, rand):
+        orig_acct, mid_accts, bene_acct = self.reserve_scatter_gather_members(txg, num_accounts, is_external, rand)
+        for n in [orig_acct] + mid_accts + [bene_acct]:
+            txg.add_typology_node(sub_g, n)
+
+        # The date of all scatter transactions must be performed before middle day
+        mid_date = (start_date + end_date) // 2
+
+        for mid_acct in mid_accts:
+            scatter_amount = RandomAmount(min_amount, max_amount).getAmount(rand)
+            margin = scatter_amount * txg.margin_ratio  # Margin of the intermediate account
+            amount = scatter_amount - margin
+            scatter_date = rand.randrange(start_date, mid_date)
+            gather_date = rand.randrange(mid_date, end_date + 1)
+
+            txg.add_typology_edge(sub_g, orig_acct, mid_acct, scatter_amount, scatter_date)
+            txg.add_typology_edge(sub_g, mid_acct, bene_acct, amount, gather_date)
+        return orig_acct
+
+    @staticmethod
+    def reserve_scatter_gather_members(txg, num_accounts, is_external, rand):
+        orig_bank_id, mid_bank_id, bene_bank_id = txg.choose_three_banks(is_external, rand)
+        orig_acct = txg.reserve_members(orig_bank_id, 1, rand)[0]
+        mid_accts = txg.reserve_members(mid_bank_id, num_accounts - 2, rand)
+        bene_acct = txg.reserve_members(bene_bank_id, 1, rand)[0]
+        return orig_acct, mid_accts, bene_acct
+
+    def plan(self, txg, sizes, is_external, np_rand):
+        orig_bank_ids, mid_bank_ids, bene_bank_ids = txg.choose_three_bank_arrays(is_external, len(sizes), np_rand)
+        ones = np.ones(len(sizes), dtype=np.int64)
+        num_mid_accts = sizes - 2
+        groups = [txg.reserve_bank_members(orig_bank_ids, ones, np_rand),
+                  txg.reserve_bank_members(mid_bank_ids, num_mid_accts, np_rand),
+                  txg.reserve_bank_members(bene_bank_ids, ones, np_rand)]
+        members, counts, begins = join_groups(groups, [ones, num_mid_accts, ones])
+        # Scatter and gather transactions for each intermediate account
+        mid_positions = concat_ranges(begins[:, 1], num_mid_accts)
+        src = np.empty(2 * len(mid_positions), dtype=np.int64)
+        dst = np.empty(2 * len(mid_positions), dtype=np.int64)
+        src[0::2] = np.repeat(begins[:, 0], num_mid_accts)
+        dst[0::2] = src[1::2] = mid_positions
+        dst[1::2] = np.repeat(begins[:, 2], num_mid_accts)
+        phases = np.tile([0, 1], len(mid_positions))
+        return TypologyPlan(np.arange(len(sizes)), members, counts, begins[:, 0], src, dst, 2 * num_mid_accts,
+                            phases)
+
+    def emit(self, txg, num_patterns, min_amount, max_amount, starts, ends, inst, phases, np_rand):
+        # Intermediate accounts keep the margin of the scattered amount
+        amounts = np_rand.uniform(min_amount, max_amount, len(inst))
+        gather = np.flatnonzero(phases == 1)
+        amounts[gather] = amounts[gather - 1] * (1.0 - txg.margin_ratio)
+        return amounts, phased_dates(starts, ends, inst, phases, np_rand)
+
+
+@register_typology
+class GatherScatter(Typology):
+    """Fan-in -> fan-out"""
+    name = "gather_scatter"
+    model_id = 8
+
+    def demand(self, num_accounts, is_external):
+        return 0, (num_accounts - 1) // 2 * 2 + 1
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external, rand):
+        orig_accts, mid_acct, bene_accts = self.reserve_gather_scatter_members(txg, num_accounts, is_external, rand)
+        for n in orig_accts + [mid_acct] + bene_accts:
+            txg.add_typology_node(sub_g, n)
+
+        mid_date = (start_date + end_date) // 2
+        amount = RandomAmount(min_amount, max_amount).getAmount(rand)
+
+        for orig_acct in orig_accts:
+            date = rand.randrange(start_date, mid_date)
+            txg.add_typology_edge(sub_g, orig_acct, mid_acct, amount, date)
+
+        for bene_acct in bene_accts:
+            date = rand.randrange(mid_date, end_date + 1)
+            txg.add_typology_edge(sub_g, mid_acct, bene_acct, amount, date)
+        return mid_acct
+
+    @staticmethod
+    def reserve_gather_scatter_members(txg, num_accounts, is_external, rand):
+        orig_bank_id, mid_bank_id, bene_bank_id = txg.choose_three_banks(is_external, rand)
+        num_orig_accts = num_bene_accts = (num_accounts - 1) // 2
+        orig_accts = txg.reserve_members(orig_bank_id, num_orig_accts, rand)
+        mid_acct = txg.reserve_members(mid_bank_id, 1, rand)[0]
+        bene_accts = txg.reserve_members(bene_bank_id, num_bene_accts, rand)
+        return orig_accts, mid_acct, bene_accts
+
+    def plan(self, txg, sizes, is_external, np_rand):
+        orig_bank_ids, mid_bank_ids, bene_bank_ids = txg.choose_three_bank_arrays(is_external, len(sizes), np_rand)
+        ones = np.ones(len(sizes), dtype=np.int64)
+        num_orig_accts = num_bene_accts = (sizes - 1) // 2
+        groups = [txg.reserve_bank_members(orig_bank_ids, num_orig_accts, np_rand),
+                  txg.reserve_bank_members(mid_bank_ids, ones, np_rand),
+                  txg.reserve_bank_members(bene_bank_ids, num_bene_accts, np_rand)]
+        members, counts, begins = join_groups(groups, [num_orig_accts, ones, num_bene_accts])
+        # Gather transactions to the intermediate account followed by scatter transactions from it
+        edge_groups = [num_orig_accts, num_bene_accts]
+        src, edge_counts, _ = join_groups([concat_ranges(begins[:, 0], num_orig_accts),
+                                           np.repeat(begins[:, 1], num_bene_accts)], edge_groups)
+        dst = join_groups([np.repeat(begins[:, 1], num_orig_accts),
+                           concat_ranges(begins[:, 2], num_bene_accts)], edge_groups)[0]
+        phases = join_groups([np.zeros(num_orig_accts.sum(), dtype=np.int64),
+                              np.ones(num_bene_accts.sum(), dtype=np.int64)], edge_groups)[0]
+        return TypologyPlan(np.arange(len(sizes)), members, counts, begins[:, 1], src, dst, edge_counts, phases)
+
+    def emit(self, txg, num_patterns, min_amount, max_amount, starts, ends, inst, phases, np_rand):
+        # Same amount for all edges of a typology
+        amounts = np_rand.uniform(min_amount, max_amount, num_patterns)[inst]
+        return amounts, phased_dates(starts, ends, inst, phases, np_rand)
+
+
+def fragment_amount(total_amount, num_fragments, rand):
+    """Split an amount randomly into fragments. The last fragment is the remainder.
+    """
+    amounts = []
+    remaining = total_amount
+    for i in range(num_fragments - 1):
+        amt = rand.uniform(remaining * 0.1, remaining * 0.5)
+        amounts.append(amt)
+        remaining -= amt
+    amounts.append(remaining)
+    return amounts
+
+
+def fragment_steps(start_date, end_date, num_fragments, rand):
+    """Distribute fragmented transactions over the period (all on the first day if the period is too short)
+    """
+    if num_fragments > (end_date - start_date + 1):
+        return [start_date] * num_fragments
+    return sorted(rand.sample(range(start_date, end_date + 1), num_fragments))
+
+
+@register_typology
+class FragmentedDeposit(Typology):
+    """Cash deposits from the external account (-1) to the main account, split into smaller amounts"""
+    name = "fragmented_deposit"
+    model_id = 9
+
+    def demand(self, num_accounts, is_external):
+        return 1, 1  # Only the main account (the counterpart is the external account)
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external, rand):
+        main_acct, main_bank_id = txg.reserve_main_acct(rand)
+        txg.add_typology_node(sub_g, main_acct)
+
+        total_amount = RoundedAmount(min_amount, max_amount).getAmount(rand)
+        num_deposits = rand.randint(3, 7)
+        deposit_amounts = fragment_amount(total_amount, num_deposits, rand)
+        deposit_steps = fragment_steps(start_date, end_date, num_deposits, rand)
+
+        for amt, step in zip(deposit_amounts, deposit_steps):
+            txg.add_typology_edge(sub_g, -1, main_acct, amt, step)
+        return main_acct
+
+
+@register_typology
+class FragmentedWithdrawal(Typology):
+    """Cash withdrawals from the main account to the external account (-1), split into smaller amounts"""
+    name = "fragmented_withdrawal"
+    model_id = 10
+
+    def demand(self, num_accounts, is_external):
+        return 1, 1
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external, rand):
+        main_acct, main_bank_id = txg.reserve_main_acct(rand)
+        txg.add_typology_node(sub_g, main_acct)
+
+        total_amount = RoundedAmount(min_amount, max_amount).getAmount(rand)
+        num_withdrawals = rand.randint(3, 7)
+        withdrawal_amounts = fragment_amount(total_amount, num_withdrawals, rand)
+        withdrawal_steps = fragment_steps(start_date, end_date, num_withdrawals, rand)
+
+        for amt, step in zip(withdrawal_amounts, withdrawal_steps):
+            txg.add_typology_edge(sub_g, main_acct, -1, amt, step)
+        return main_acct
@@ -5,11 +5,12 @@ import os
 import shutil
 import datetime
 from dateutil.parser import parse
-from random import random
+import random
 from collections import defaultdict, Counter
 import re
 from datetime import timedelta
 from amlsim.account_data_type_lookup import AccountDataTypeLookup
+from amlsim.rng import RandomStreams
 from faker import Faker
 import numpy as np
 
@@ -519,11 +520,13 @@ class Schema:
 
 class LogConverter:
 
-    def __init__(self, conf, sim_name=None, fake=None):
+    def __init__(self, conf, sim_name=None, fake=None, rand=random, np_rand=np.random):
         self.reports = dict()  # SAR ID and transaction subgraph
         self.org_types = dict()  # ID, organization type
 
         self.fake = fake
+        self.rand = rand  # random.Random object or the random module for account types
+        self.np_rand = np_rand  # np.random.RandomState object or the np.random module for genders
 
         general_conf = conf.get('general', {})
         input_conf = conf.get('temporal', {})  # Input directory of this converter is temporal directory
@@ -621,7 +624,7 @@ class LogConverter:
             acct_type = ""
             acct_id = ""
 
-            gender = np.random.choice(['Male', 'Female'], p=[0.5, 0.5])
+            gender = self.np_rand.choice(['Male', 'Female'], p=[0.5, 0.5])
 
             good_address = False
             while good_address == False:
@@ -723,7 +726,7 @@ class LogConverter:
             self.org_types[int(acct_id)] = acct_type
 
             # Write a party row per account
-            is_individual = random() >= 0.5  # 50%: individual, 50%: organization
+            is_individual = self.rand.random() >= 0.5  # 50%: individual, 50%: organization
             party_id = str(acct_id)
             if is_individual:  # Individual
                 output_row = self.schema.get_party_ind_row(party_id)
@@ -1013,7 +1016,15 @@ if __name__ == "__main__":
     converter = LogConverter(conf, _sim_name)
     fake = Faker(['en_US'])
     Faker.seed(0)
-    converter = LogConverter(conf, _sim_name, fake)
+    _rand, _np_rand = random, np.random
+    if conf.get("graph_generator", {}).get("rng_streams", False):
+        # Use the independent random stream of the identity stage (see amlsim.rng)
+        _seed = os.getenv("RANDOM_SEED", conf["general"].get("random_seed"))
+        _streams = RandomStreams(None if _seed is None else int(_seed))
+        Faker.seed(_streams.int_seed("identities"))
+        _rand = _streams.python_random("identities")
+        _np_rand = _streams.random_state("identities")
+    converter = LogConverter(conf, _sim_name, fake, _rand, _np_rand)
     converter.convert_alert_members()
     converter.convert_acct_tx()
     converter.output_sar_cases()
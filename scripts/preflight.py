@@ -0,0 +1,286 @@
+"""
+Check whether a configuration of the transaction graph generator is feasible and estimate its resources
+before launching a run. It reads the configuration JSON and the parameter files without building the graph.
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from amlsim.base_model import parse_base_model, sample_powerlaw_degrees
+from amlsim.cost_model import estimate_stages, fit_cost_model, parse_stage_log
+from amlsim.degree_sequence import DegreeSequence
+from amlsim.param_files import read_param_rows
+from amlsim.rng import RandomStreams
+from amlsim.typologies import create_registry
+
+
+HUB_WARNING_RATIO = 0.8  # Warn if AML typologies use more than this ratio of the hub accounts
+MEMORY_WARNING_RATIO = 0.8  # Warn if the estimated peak RSS exceeds this ratio of the physical memory
+
+
+def physical_memory_mb():
+    """
+    :return: Physical memory size (MB), or None if unknown
+    """
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / (1024.0 * 1024.0)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def load_bank_sizes(path):
+    """
+    :param path: Aggregated account parameter file path
+    :return: Bank ID -> number of accounts (in the order of the account IDs)
+    """
+    header, rows = read_param_rows(path)
+    idx_count = header.index("count")
+    idx_bank = header.index("bank_id")
+    bank_sizes = OrderedDict()
+    for row in rows:
+        bank_sizes[row[idx_bank]] = bank_sizes.get(row[idx_bank], 0) + int(row[idx_count])
+    return bank_sizes
+
+
+def check_degrees(deg_path, num_accounts, errors):
+    """
+    :return: In-degree and out-degree arrays of all accounts (None if the sequence is invalid)
+    """
+    _, rows = read_param_rows(deg_path)
+    deg_seq = DegreeSequence.from_rows(rows)
+    try:
+        deg_seq.validate()
+        deg_seq = deg_seq.repeat_to(num_accounts)
+    except ValueError as e:
+        errors.append(str(e))
+        return None, None
+    return deg_seq.in_degrees(np.int64), deg_seq.out_degrees(np.int64)
+
+
+def sample_degrees(conf, num_accounts, errors):
+    """Sample degree sequences from the base model in the same way as the generator
+    :return: In-degree and out-degree arrays of all accounts (None if the base model is invalid)
+    """
+    other_conf = conf["graph_generator"]
+    seed = conf["general"].get("random_seed")
+    seed = os.getenv("RANDOM_SEED", seed)
+    seed = seed if seed is None else int(seed)
+    try:
+        model = parse_base_model(other_conf["base_model"])
+        if other_conf.get("rng_streams", False):
+            seed_seq = RandomStreams(seed).seed_sequence("base_degrees")
+        else:
+            seed_seq = np.random.SeedSequence(seed)
+        return sample_powerlaw_degrees(model, num_accounts, np.random.default_rng(seed_seq))
+    except ValueError as e:
+        errors.append(str(e))
+        return None, None
+
+
+def check_normal_models(path, in_deg, out_deg, threshold, warnings):
+    """Compare the number of normal models of each type with the number of main account candidates.
+    Each fan-in/fan-out candidate can hold a model for every 'degree_threshold' neighbors.
+    :return: List of (type, count, candidates, capacity)
+    """
+    header, rows = read_param_rows(path)
+    idx_count = header.index("count")
+    idx_type = header.index("type")
+    counts = Counter()
+    for row in rows:
+        counts[row[idx_type]] += int(row[idx_count])
+
+    fan_in = in_deg >= threshold
+    fan_out = out_deg >= threshold
+    supply = {
+        "fan_in": (int(fan_in.sum()), int((in_deg[fan_in] // threshold).sum())),
+        "fan_out": (int(fan_out.sum()), int((out_deg[fan_out] // threshold).sum())),
+        "forward": (int(((in_deg >= 1) & (out_deg >= 1)).sum()),) * 2,
+    }
+    for model_type in ("single", "mutual", "periodical"):
+        supply[model_type] = (int((out_deg >= 1).sum()),) * 2
+
+    result = list()
+    for model_type, count in counts.items():
+        if model_type not in supply:
+            warnings.append("Unknown normal model type: %s" % model_type)
+            continue
+        candidates, capacity = supply[model_type]
+        if count > capacity:
+            warnings.append("Normal model %s: %d models requested but only %d can be assigned to %d candidates"
+                            % (model_type, count, capacity, candidates))
+        result.append((model_type, count, candidates, capacity))
+    return result
+
+
+def check_alert_patterns(path, bank_sizes, bank_hubs, errors, warnings):
+    """Compare hub (main account) and member demand of AML typologies with the supply of each bank.
+    The demand is the worst case of each parameter row (all typologies have 'max_accounts' members).
+    :return: List of (row number, type, bank ID, count, hub demand, account demand)
+    """
+    registry = create_registry()
+    header, rows = read_param_rows(path)
+    idx_count = header.index("count")
+    idx_type = header.index("type")
+    idx_max_accts = header.index("max_accounts")
+    idx_bank = header.index("bank_id") if "bank_id" in header else None
+    num_accounts = sum(bank_sizes.values())
+
+    result = list()
+    bank_demand = Counter()
+    for row_num, row in enumerate(rows):
+        count = int(row[idx_count])
+        name = row[idx_type]
+        max_accts = int(row[idx_max_accts])
+        bank_id = row[idx_bank] if idx_bank is not None else ""
+        if name not in registry:
+            warnings.append("Alert row %d: unknown typology %s (skipped by the generator)" % (row_num, name))
+            continue
+        if bank_id != "" and bank_id not in bank_sizes:
+            errors.append("Alert row %d: no such bank ID: %s" % (row_num, bank_id))
+            continue
+        is_external = bank_id == "" and len(bank_sizes) >= 2
+        hubs, accts = registry[name].demand(max_accts, is_external)
+        if bank_id != "" and accts > bank_sizes[bank_id]:
+            errors.append("Alert row %d: %s needs %d accounts but bank %s has %d"
+                          % (row_num, name, accts, bank_id, bank_sizes[bank_id]))
+        if bank_id == "":
+            for bank, size in bank_sizes.items():
+                bank_demand[bank] += count * accts * size / float(num_accounts)
+        else:
+            bank_demand[bank_id] += count * accts
+        result.append((row_num, name, bank_id, count, count * hubs, count * accts))
+
+    hub_demand = sum(r[4] for r in result)
+    hub_supply = sum(bank_hubs.values())
+    if hub_demand > hub_supply:
+        errors.append("AML typologies need %d main accounts but only %d hub accounts exist. "
+                      "Try a smaller 'degree_threshold'." % (hub_demand, hub_supply))
+    elif hub_demand > HUB_WARNING_RATIO * hub_supply:
+        warnings.append("AML typologies use %d of %d hub accounts" % (hub_demand, hub_supply))
+    for bank, demand in bank_demand.items():
+        if demand > bank_sizes[bank]:
+            errors.append("AML typologies need about %d member accounts of bank %s but it has %d"
+                          % (demand, bank, bank_sizes[bank]))
+    return result, bank_demand
+
+
+def preflight(conf, cost_model=None):
+    """Check the feasibility of a configuration and estimate the resources of the generator
+    :param conf: Configuration dict (conf.json)
+    :param cost_model: Cost model dict of amlsim.cost_model (default: calibrated one)
+    :return: Report dict (errors, warnings, banks, typologies, normal_models and stages)
+    """
+    input_conf = conf["input"]
+    input_dir = input_conf["directory"]
+    threshold = int(conf["graph_generator"]["degree_threshold"])
+    errors = list()
+    warnings = list()
+    report = OrderedDict([("errors", errors), ("warnings", warnings)])
+
+    if not input_conf.get("is_aggregated_accounts", True):
+        errors.append("Only aggregated account parameter files are supported")
+        return report
+    bank_sizes = load_bank_sizes(os.path.join(input_dir, input_conf["accounts"]))
+    num_accounts = sum(bank_sizes.values())
+    report["num_accounts"] = num_accounts
+
+    header, rows = read_param_rows(os.path.join(input_dir, input_conf["transaction_type"]))
+    if sum(float(row[1]) for row in rows) <= 0:
+        errors.append("No transaction types with positive frequency in %s" % input_conf["transaction_type"])
+
+    if conf["graph_generator"].get("base_model"):
+        in_deg, out_deg = sample_degrees(conf, num_accounts, errors)
+    else:
+        in_deg, out_deg = check_degrees(os.path.join(input_dir, input_conf["degree"]), num_accounts, errors)
+    if in_deg is None:
+        return report
+    num_edges = int(in_deg.sum())
+    report["num_edges"] = num_edges
+
+    # Accounts are assigned to banks in the order of the parameter rows
+    is_hub = (in_deg >= threshold) | (out_deg >= threshold)
+    bank_hubs = OrderedDict()
+    begin = 0
+    for bank, size in bank_sizes.items():
+        bank_hubs[bank] = int(is_hub[begin:begin + size].sum())
+        begin += size
+
+    if "normal_models" in input_conf:
+        report["normal_models"] = check_normal_models(os.path.join(input_dir, input_conf["normal_models"]),
+                                                      in_deg, out_deg, threshold, warnings)
+    typologies, bank_demand = check_alert_patterns(os.path.join(input_dir, input_conf["alert_patterns"]),
+                                                   bank_sizes, bank_hubs, errors, warnings)
+    report["typologies"] = typologies
+    report["banks"] = [(bank, size, bank_hubs[bank], int(round(bank_demand[bank])))
+                       for bank, size in bank_sizes.items()]
+
+    stages = estimate_stages(num_edges, cost_model)
+    report["stages"] = stages
+    peak_rss = max(rss for _, _, rss in stages)
+    memory = physical_memory_mb()
+    if memory is not None and peak_rss > MEMORY_WARNING_RATIO * memory:
+        warnings.append("Estimated peak RSS %.0f MB is close to or above the physical memory %.0f MB"
+                        % (peak_rss, memory))
+    return report
+
+
+def print_report(report, out=sys.stdout):
+    if "num_edges" in report:
+        out.write("Accounts: %d, requested base transactions: %d\n" % (report["num_accounts"], report["num_edges"]))
+    if "banks" in report:
+        out.write("\n%-20s %10s %10s %16s\n" % ("bank_id", "accounts", "hubs", "alert_members"))
+        for bank, size, hubs, demand in report["banks"]:
+            out.write("%-20s %10d %10d %16d\n" % (bank, size, hubs, demand))
+    if report.get("typologies"):
+        out.write("\n%-4s %-22s %-12s %8s %12s %10s\n" % ("row", "typology", "bank_id", "count", "main_accts",
+                                                        "accounts"))
+        for row_num, name, bank, count, hubs, accts in report["typologies"]:
+            out.write("%-4d %-22s %-12s %8d %12d %10d\n" % (row_num, name, bank or "(all)", count, hubs, accts))
+    if report.get("normal_models"):
+        out.write("\n%-12s %10s %12s %10s\n" % ("normal_model", "count", "candidates", "capacity"))
+        for model_type, count, candidates, capacity in report["normal_models"]:
+            out.write("%-12s %10d %12d %10d\n" % (model_type, count, candidates, capacity))
+    if report.get("stages"):
+        out.write("\n%-22s %12s %14s\n" % ("stage", "seconds", "peak_rss_mb"))
+        for stage, seconds, rss in report["stages"]:
+            out.write("%-22s %12.1f %14.1f\n" % (stage, seconds, rss))
+        out.write("%-22s %12.1f %14.1f\n" % ("total", sum(s[1] for s in report["stages"]),
+                                             max(s[2] for s in report["stages"])))
+    for msg in report["warnings"]:
+        out.write("WARNING: %s\n" % msg)
+    for msg in report["errors"]:
+        out.write("ERROR: %s\n" % msg)
+    out.write("%s\n" % ("Feasible" if not report["errors"] else "Not feasible"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check feasibility and estimate resources of the graph generator.")
+    parser.add_argument("conf_json", help="Configuration JSON file")
+    parser.add_argument("--calibrate", nargs="+", default=None, metavar="LOG",
+                        help="Fit the cost model from logs of the graph generator instead of the default one")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    with open(args.conf_json, "r") as rf:
+        conf = json.load(rf)
+
+    cost_model = None
+    if args.calibrate is not None:
+        samples = list()
+        for log_file in args.calibrate:
+            with open(log_file, "r") as rf:
+                samples.append(parse_stage_log(rf))
+        cost_model = fit_cost_model(samples)
+
+    report = preflight(conf, cost_model)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        print_report(report)
+    sys.exit(1 if report["errors"] else 0)
@@ -2,25 +2,46 @@
 Generate a base transaction graph used in the simulator
 """
 
+import argparse
+import copy
 import networkx as nx
 import numpy as np
-import itertools
 import random
-import csv
 import json
 import os
 import sys
 import logging
+import tempfile
+import time
+from itertools import islice
 
 import cProfile
 
 
-from collections import Counter, defaultdict
+from collections import Counter, defaultdict, namedtuple
+from amlsim.account_table import AccountTable
+from amlsim.alert_store import AlertStore, PendingAlert
+from amlsim.bank_index import BankCapacityIndex
+from amlsim.base_model import parse_base_model, sample_powerlaw_degrees
+from amlsim.batch import log_summary, parse_seeds, run_batch, write_summary
+from amlsim.checkpoint import Checkpointer, config_hash
+from amlsim.cost_model import peak_rss_mb
+from amlsim.csr_graph import CSRGraph
+from amlsim.csv_writer import ChunkedCSVWriter, format_column, format_lines, DEFAULT_CHUNK_SIZE
+from amlsim.degree_sequence import DegreeSequence
+from amlsim.graph_cache import GraphCache, cache_key
+from amlsim.hub_index import HubIndex
+from amlsim.indexed_pool import IndexedPool
 from amlsim.nominator import Nominator
 from amlsim.normal_model import NormalModel
-
-from amlsim.random_amount import RandomAmount
-from amlsim.rounded_amount import RoundedAmount
+from amlsim.param_files import ParamFiles, read_param_rows
+from amlsim.rng import RandomStreams
+from amlsim.sampling import AliasSampler, CumulativeSampler
+from amlsim.sharding import add_local_stubs, expected_inter_ratios, match_inter_group_stubs, run_shards
+from amlsim.sharding import split_degrees, write_shard_inputs
+from amlsim.spill import MemoryBudget, RunFiles, parse_memory_size, read_groups, write_groups
+from amlsim.topology_template import TemplateLibrary, TopologyTemplate
+from amlsim.typologies import concat_ranges, create_registry
 
 
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +53,26 @@ MAIN_ACCT_KEY = "main_acct"  # Main account ID (SAR typology subgraph attribute)
 IS_SAR_KEY = "is_sar"  # SAR flag (account vertex attribute)
 
 DEFAULT_MARGIN_RATIO = 0.1  # Each member will keep this ratio of the received amount
+SPILL_CHECK_INTERVAL = 1024  # Number of alerts between checks of the memory budget
+
+BASE_GRAPH_ENGINES = ("python", "numpy")  # Stub matching implementations for the base transaction graph
+GRAPH_BACKENDS = ("networkx", "csr")  # Data structures of the transaction graph
+TX_TYPE_SAMPLERS = ("python", "alias")  # Weighted choices of transaction types
+MAIN_ACCT_SELECTIONS = ("uniform", "degree")  # Choices of main accounts of AML typologies from hub accounts
+
+# Stages of the generator (name and methods) which can be saved as checkpoints and resumed
+STAGES = (
+    ("normal_transactions", ("set_num_accounts", "generate_normal_transactions")),
+    ("account_list", ("load_account_list",)),
+    ("normal_models", ("load_normal_models", "build_normal_models")),
+    ("main_acct_candidates", ("set_main_acct_candidates",)),
+    ("alert_patterns", ("load_alert_patterns",)),
+    ("active_edges", ("mark_active_edges",)),
+)
+# Warn if the sharded generation realizes less than this ratio of the requested inter-bank transactions
+INTER_BANK_WARNING_RATIO = 0.9
+# Stages run for each bank by the sharded generation (the typology stages are skipped without bank-local typologies)
+SHARD_STAGES = ("normal_transactions", "account_list", "normal_models", "main_acct_candidates", "alert_patterns")
 
 
 # Utility functions parsing values
@@ -125,64 +166,421 @@ def directed_configuration_model(_in_deg, _out_deg, seed=0):
     return _g
 
 
+def directed_configuration_model_edges(_in_deg, _out_deg, seed=0, max_passes=100):
+    """Generate edge arrays of a directed random graph with the given degree sequences without self loop.
+    NumPy counterpart of directed_configuration_model: stubs are built with np.repeat, matched by a seeded
+    permutation and self loops are repaired by swapping beneficiaries with random edges in vectorized passes.
+    :param _in_deg: In-degree sequence (list or array), each entry corresponds to the in-degree of a node.
+    :param _out_deg: Out-degree sequence (list or array), each entry corresponds to the out-degree of a node.
+    :param seed: Seed for random number generator
+    :param max_passes: Maximum number of self loop repair passes
+    :return: Originator and beneficiary node arrays (parallel edges may remain)
+    """
+    in_deg = np.asarray(_in_deg, dtype=np.int64)
+    out_deg = np.asarray(_out_deg, dtype=np.int64)
+    if in_deg.sum() != out_deg.sum():
+        raise nx.NetworkXError('Invalid degree sequences. Sequences must have equal sums.')
+
+    num_nodes = max(len(in_deg), len(out_deg))
+    in_deg = np.pad(in_deg, (0, num_nodes - len(in_deg)), "constant")
+    out_deg = np.pad(out_deg, (0, num_nodes - len(out_deg)), "constant")
+
+    rng = np.random.default_rng(seed)
+    nodes = np.arange(num_nodes, dtype=np.int32)
+    src = rng.permutation(np.repeat(nodes, out_deg))
+    dst = rng.permutation(np.repeat(nodes, in_deg))
+    num_edges = len(dst)
+
+    for _ in range(max_passes):
+        loops = np.flatnonzero(src == dst)
+        if len(loops) == 0:
+            break
+        partners = rng.integers(0, num_edges, size=len(loops))
+        # Swapping beneficiaries keeps all degrees; neither of the new edges may become a self loop
+        valid = (dst[partners] != src[loops]) & (src[partners] != dst[loops])
+        loops, partners = loops[valid], partners[valid]
+        # Each edge can take part in at most one swap per pass
+        touched, counts = np.unique(np.concatenate([loops, partners]), return_counts=True)
+        conflicts = touched[counts > 1]
+        ok = ~(np.isin(loops, conflicts) | np.isin(partners, conflicts))
+        loops, partners = loops[ok], partners[ok]
+        dst[loops], dst[partners] = dst[partners], dst[loops]
+
+    for idx in np.flatnonzero(src == dst):
+        logger.warning("Self loop from/to %d at %d" % (src[idx], idx))
+    return src, dst
+
+
+def unique_edges(src, dst, num_nodes):
+    """Remove parallel edges from edge arrays as nx.DiGraph does for a MultiDiGraph
+    :param src: Originator node array
+    :param dst: Beneficiary node array
+    :param num_nodes: Number of nodes (node IDs must be in [0, num_nodes))
+    :return: Originator and beneficiary node arrays of distinct edges sorted by originator and beneficiary
+    """
+    keys = np.unique(np.asarray(src, dtype=np.int64) * num_nodes + np.asarray(dst, dtype=np.int64))
+    return keys // num_nodes, keys % num_nodes
+
+
+def rewire_simple_edges(src, dst, num_nodes, seed=0, max_passes=100, min_progress=0.001, window=10):
+    """Remove self loops and parallel edges with batched random double-edge swaps.
+    Each pass swaps the beneficiaries of every invalid edge and a random partner edge at once,
+    so all in/out-degrees are kept. Swaps creating a self loop or an existing edge are rejected.
+    :param src: Originator node array
+    :param dst: Beneficiary node array
+    :param num_nodes: Number of nodes (node IDs must be in [0, num_nodes))
+    :param seed: Seed for random number generator
+    :param max_passes: Maximum number of swap passes
+    :param min_progress: Stop when the passes in a window resolve less than this ratio of the remaining invalid edges
+    (the degree sequences may not be realizable as a simple graph)
+    :param window: Number of passes to measure the progress
+    :return: Originator and beneficiary node arrays (invalid edges which could not be resolved remain)
+    """
+    rng = np.random.default_rng(seed)
+    src = np.array(src, dtype=np.int64)
+    dst = np.array(dst, dtype=np.int64)
+    num_edges = len(src)
+
+    keys = src * num_nodes + dst
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    invalid = src == dst
+    invalid[order[1:][sorted_keys[1:] == sorted_keys[:-1]]] = True  # All copies but the first one
+    targets = np.flatnonzero(invalid)
+
+    window_targets = len(targets)
+    for i in range(max_passes):
+        if len(targets) == 0:
+            break
+        if i > 0 and i % window == 0:
+            if window_targets - len(targets) < window_targets * min_progress:
+                break
+            window_targets = len(targets)
+        partners = rng.integers(0, num_edges, size=len(targets))
+        new_keys1 = src[targets] * num_nodes + dst[partners]
+        new_keys2 = src[partners] * num_nodes + dst[targets]
+        valid = ((src[targets] != dst[partners]) & (src[partners] != dst[targets]) & (new_keys1 != new_keys2)
+                 & ~_sorted_contains(sorted_keys, new_keys1) & ~_sorted_contains(sorted_keys, new_keys2))
+        swap_targets, swap_partners = targets[valid], partners[valid]
+        new_keys1, new_keys2 = new_keys1[valid], new_keys2[valid]
+
+        # Each edge can take part in at most one swap, and new edges must be distinct from each other
+        touched, counts = np.unique(np.concatenate([swap_targets, swap_partners]), return_counts=True)
+        new_keys, new_counts = np.unique(np.concatenate([new_keys1, new_keys2]), return_counts=True)
+        ok = ~(np.isin(swap_targets, touched[counts > 1]) | np.isin(swap_partners, touched[counts > 1])
+               | np.isin(new_keys1, new_keys[new_counts > 1]) | np.isin(new_keys2, new_keys[new_counts > 1]))
+        swap_targets, swap_partners = swap_targets[ok], swap_partners[ok]
+        dst[swap_targets], dst[swap_partners] = dst[swap_partners], dst[swap_targets]
+
+        # Swapped edges are distinct from all others now, so only the remaining targets stay invalid
+        targets = np.setdiff1d(targets, np.concatenate([swap_targets, swap_partners]), assume_unique=True)
+        sorted_keys = np.sort(src * num_nodes + dst)
+
+    return src, dst
+
+
+def _sorted_contains(sorted_keys, values):
+    """Vectorized membership test against a sorted key array
+    :param sorted_keys: Sorted key array
+    :param values: Key array to be tested
+    :return: Boolean array, True if the corresponding value is in the sorted keys
+    """
+    if len(sorted_keys) == 0:
+        return np.zeros(len(values), dtype=bool)
+    order = np.argsort(values)  # Sorted queries keep the binary searches cache friendly
+    idx = np.minimum(np.searchsorted(sorted_keys, values[order]), len(sorted_keys) - 1)
+    contained = np.empty(len(values), dtype=bool)
+    contained[order] = sorted_keys[idx] == values[order]
+    return contained
+
+
+class ActiveEdgeIndex:
+    """Sorted (group, member) pairs of account groups (e.g. members of normal models) to find edges
+    between two members of the same group with a sort join (no subgraph construction).
+    Edges can be looked up at once or partition by partition.
+    """
+
+    def __init__(self, member_ids, group_ids):
+        """
+        :param member_ids: Member account ID array of all groups (not empty)
+        :param group_ids: Group index array of the members
+        """
+        # Encode account IDs into dense codes
+        member_ids = np.asarray(member_ids)
+        self.accts = np.unique(member_ids)
+        member_codes = np.searchsorted(self.accts, member_ids)
+        self.num_accts = len(self.accts)
+
+        # Groups of each account as CSR arrays
+        group_ids = np.asarray(group_ids, dtype=np.int64)
+        order = np.argsort(member_codes, kind="stable")
+        self.acct_groups = group_ids[order]
+        self.counts = np.bincount(member_codes, minlength=self.num_accts)
+        self.offsets = np.zeros(self.num_accts + 1, dtype=np.int64)
+        np.cumsum(self.counts, out=self.offsets[1:])
+        self.member_keys = np.unique(group_ids * self.num_accts + member_codes)
+
+    def mark(self, src, dst, edge_ids, active):
+        """Each edge is expanded to (group, account) pairs for the groups of the endpoint with fewer groups,
+        and the pairs with the other endpoint are looked up in the sorted (group, member) pairs.
+        :param src: Originator account ID array
+        :param dst: Beneficiary account ID array
+        :param edge_ids: Edge ID array
+        :param active: Boolean array indexed by edge IDs, set to True for the active edges
+        """
+        if len(edge_ids) == 0:
+            return
+        accts = self.accts
+        num_accts = self.num_accts
+        src = np.asarray(src)
+        dst = np.asarray(dst)
+        src_codes = np.minimum(np.searchsorted(accts, src), num_accts - 1)
+        dst_codes = np.minimum(np.searchsorted(accts, dst), num_accts - 1)
+        valid = (accts[src_codes] == src) & (accts[dst_codes] == dst)
+        edges = np.flatnonzero(valid)
+        src_codes = src_codes[edges]
+        dst_codes = dst_codes[edges]
+
+        # Expand edges by the groups of the endpoint with fewer groups and join with the (group, member) pairs
+        by_src = self.counts[src_codes] <= self.counts[dst_codes]
+        expand_codes = np.where(by_src, src_codes, dst_codes)
+        other_codes = np.where(by_src, dst_codes, src_codes)
+        num_groups = self.counts[expand_codes]
+        pair_edges = np.repeat(np.arange(len(edges)), num_groups)
+        starts = np.repeat(self.offsets[expand_codes] - np.cumsum(num_groups) + num_groups, num_groups)
+        pair_groups = self.acct_groups[starts + np.arange(len(pair_edges))]
+        found = _sorted_contains(self.member_keys, pair_groups * num_accts + other_codes[pair_edges])
+        active[np.asarray(edge_ids)[edges[pair_edges[found]]]] = True
+
+    def mark_chunks(self, src, dst, edge_ids, active, chunk_size):
+        """Mark edges partition by partition to bound the number of expanded pairs (see mark)
+        :param chunk_size: Number of edges of a partition
+        """
+        for begin in range(0, len(edge_ids), chunk_size):
+            end = begin + chunk_size
+            self.mark(src[begin:end], dst[begin:end], edge_ids[begin:end], active)
+
+
+def active_edge_bitmap(src, dst, edge_ids, num_edges, groups, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Find edges between two members of the same account group (see ActiveEdgeIndex)
+    :param src: Originator account ID array
+    :param dst: Beneficiary account ID array
+    :param edge_ids: Edge ID array
+    :param num_edges: Number of edge IDs (size of the bitmap)
+    :param groups: Iterable of account ID collections (e.g. members of normal models)
+    :param chunk_size: Number of edges marked at once
+    :return: Boolean array indexed by edge IDs, True if the edge is active
+    """
+    active = np.zeros(num_edges, dtype=bool)
+    member_ids = list()
+    group_ids = list()
+    for i, members in enumerate(groups):
+        member_ids.extend(members)
+        group_ids.extend([i] * len(members))
+    if not member_ids or len(edge_ids) == 0:
+        return active
+    ActiveEdgeIndex(np.array(member_ids), group_ids).mark_chunks(src, dst, edge_ids, active, chunk_size)
+    return active
+
+
+def degree_sequence_report(src, dst, in_deg, out_deg):
+    """Compare realized degrees of edge arrays with the requested degree sequences
+    :param src: Originator node array
+    :param dst: Beneficiary node array
+    :param in_deg: Requested in-degree sequence
+    :param out_deg: Requested out-degree sequence
+    :return: Dict of requested/realized edge counts, L1 errors and ratios of nodes with exact degrees
+    """
+    in_deg = np.asarray(in_deg, dtype=np.int64)
+    out_deg = np.asarray(out_deg, dtype=np.int64)
+    num_nodes = max(len(in_deg), len(out_deg), 1)
+    in_diff = np.bincount(dst, minlength=len(in_deg))[:len(in_deg)] - in_deg
+    out_diff = np.bincount(src, minlength=len(out_deg))[:len(out_deg)] - out_deg
+    return {
+        "requested_edges": int(in_deg.sum()),
+        "realized_edges": len(src),
+        "in_degree_error": int(np.abs(in_diff).sum()),
+        "out_degree_error": int(np.abs(out_diff).sum()),
+        "exact_in_degree_ratio": float(np.count_nonzero(in_diff == 0)) / num_nodes,
+        "exact_out_degree_ratio": float(np.count_nonzero(out_diff == 0)) / num_nodes,
+    }
+
+
 def get_degrees(deg_csv, num_v):
     """
     :param deg_csv: Degree distribution parameter CSV file
     :param num_v: Number of total account vertices
     :return: In-degree and out-degree sequence list
     """
-    with open(deg_csv, "r") as rf:  # Load in/out-degree sequences from parameter CSV file for each account
-        reader = csv.reader(rf)
-        next(reader)
-        return get_in_and_out_degrees(reader, num_v)
+    return get_degree_sequence(deg_csv, num_v).to_lists()
 
 
 def get_in_and_out_degrees(iterable, num_v):
-    _in_deg = list()  # In-degree sequence
-    _out_deg = list()  # Out-degree sequence
-    
-    for row in iterable:
+    return get_in_and_out_degree_sequence(iterable, num_v).to_lists()
+
+
+def get_degree_sequence(deg_csv, num_v):
+    """
+    :param deg_csv: Degree distribution parameter CSV file
+    :param num_v: Number of total account vertices
+    :return: Run-length encoded in/out-degree sequences (DegreeSequence)
+    """
+    _, rows = read_param_rows(deg_csv)  # Load in/out-degree sequences from parameter CSV file for each account
+    return get_in_and_out_degree_sequence(rows, num_v)
+
+
+def get_in_and_out_degree_sequence(iterable, num_v):
+    """Parse and validate degree CSV rows without expanding them for each account
+    :param iterable: Rows of the degree CSV file (count, in-degree, out-degree)
+    :param num_v: Number of total account vertices
+    :return: Run-length encoded in/out-degree sequences (DegreeSequence)
+    """
+    deg_seq = DegreeSequence.from_rows(iterable)
+    deg_seq.validate()
+    return deg_seq.repeat_to(num_v)
+
+
+# Parsers of parameter file rows (cached by ParamFiles, they must not use random numbers)
+def parse_degree_rows(rows):
+    """
+    :param rows: All rows of a degree CSV file
+    :return: Validated DegreeSequence object (not repeated yet)
+    """
+    deg_seq = DegreeSequence.from_rows(rows[1:])
+    deg_seq.validate()
+    return deg_seq
+
+
+def parse_tx_types(rows):
+    """
+    :param rows: All rows of a transaction type CSV file (type and frequency)
+    :return: List of transaction types and list of their frequencies (weights)
+    """
+    tx_types = list()
+    weights = list()
+    for row in rows[1:]:
         if row[0].startswith("#"):
             continue
-        count = int(row[0])
-        _in_deg.extend([int(row[1])] * count)
-        _out_deg.extend([int(row[2])] * count)
+        tx_types.append(row[0])
+        weights.append(float(row[1]))
+    return tx_types, weights
 
-    in_len, out_len = len(_in_deg), len(_out_deg)
-    if in_len != out_len:
-        raise ValueError("The length of in-degree (%d) and out-degree (%d) sequences must be same."
-                         % (in_len, out_len))
 
-    total_in_deg, total_out_deg = sum(_in_deg), sum(_out_deg)
-    if total_in_deg != total_out_deg:
-        raise ValueError("The sum of in-degree (%d) and out-degree (%d) must be same."
-                         % (total_in_deg, total_out_deg))
+def parse_account_params(rows):
+    """
+    :param rows: All rows of an aggregated account parameter CSV file
+    :return: List of (count, min balance, max balance, country, business type, bank ID)
+    """
+    header = rows[0]
+    params = list()
+    for row in rows[1:]:
+        if row[0].startswith("#"):
+            continue
+        params.append((int(row[header.index('count')]), parse_float(row[header.index('min_balance')]),
+                       parse_float(row[header.index('max_balance')]), row[header.index('country')],
+                       row[header.index('business_type')], row[header.index('bank_id')]))
+    return params
 
-    if num_v % in_len != 0:
-        raise ValueError("The number of total accounts (%d) "
-                         "must be a multiple of the degree sequence length (%d)."
-                         % (num_v, in_len))
 
-    repeats = num_v // in_len
-    _in_deg = _in_deg * repeats
-    _out_deg = _out_deg * repeats
+# AML typology parameters of an alert parameter row
+AlertParam = namedtuple("AlertParam", [
+    "row_num", "count", "type", "schedule", "min_accounts", "max_accounts", "min_amount", "max_amount",
+    "min_period", "max_period", "bank_id", "is_sar"])
 
-    return _in_deg, _out_deg
+
+def parse_alert_params(rows):
+    """
+    :param rows: All rows of an AML typology parameter CSV file
+    :return: List of AlertParam (row_num is the number of the row without comment and empty lines)
+    """
+    idx_num = None
+    idx_type = None
+    idx_schedule = None
+    idx_min_accts = None
+    idx_max_accts = None
+    idx_min_amt = None
+    idx_max_amt = None
+    idx_min_period = None
+    idx_max_period = None
+    idx_bank = None
+    idx_sar = None
+
+    # Parse header
+    header = rows[0]
+    for i, k in enumerate(header):
+        if k == "count":  # Number of pattern subgraphs
+            idx_num = i
+        elif k == "type":  # AML typology type (e.g. fan-out and cycle)
+            idx_type = i
+        elif k == "schedule_id":  # Transaction scheduling type
+            idx_schedule = i
+        elif k == "min_accounts":  # Minimum number of involved accounts
+            idx_min_accts = i
+        elif k == "max_accounts":  # Maximum number of involved accounts
+            idx_max_accts = i
+        elif k == "min_amount":  # Minimum initial transaction amount
+            idx_min_amt = i
+        elif k == "max_amount":  # Maximum initial transaction amount
+            idx_max_amt = i
+        elif k == "min_period":  # Minimum overall transaction period (number of simulation steps)
+            idx_min_period = i
+        elif k == "max_period":  # Maximum overall transaction period (number of simulation steps)
+            idx_max_period = i
+        elif k == "bank_id":  # Bank ID for internal-bank transactions
+            idx_bank = i
+        elif k == "is_sar":  # SAR flag
+            idx_sar = i
+        else:
+            logger.warning("Unknown column name in the alert parameter file: %s" % k)
+
+    params = list()
+    for row in rows[1:]:
+        if len(row) == 0 or row[0].startswith("#"):
+            continue
+        params.append(AlertParam(
+            row_num=len(params),  # Identifies the random stream of each row
+            count=int(row[idx_num]),  # Number of alert patterns
+            type=row[idx_type],
+            schedule=int(row[idx_schedule]),
+            min_accounts=int(row[idx_min_accts]),
+            max_accounts=int(row[idx_max_accts]),
+            min_amount=parse_float(row[idx_min_amt]),
+            max_amount=parse_float(row[idx_max_amt]),
+            min_period=parse_int(row[idx_min_period]),
+            max_period=parse_int(row[idx_max_period]),
+            bank_id=row[idx_bank] if idx_bank is not None else "",  # If empty, it has inter-bank transactions
+            is_sar=parse_flag(row[idx_sar]),
+        ))
+    return params
+
+
+def log_stage(name, begin):
+    """Log the wall time of a stage and the peak RSS (parsed by the cost model of the pre-flight check)
+    :param name: Stage name
+    :param begin: Start time of the stage
+    """
+    rss_mb = peak_rss_mb()
+    logger.info("Finished stage %s in %.3f seconds (peak RSS %.1f MB)"
+                % (name, time.time() - begin, rss_mb if rss_mb is not None else -1))
 
 
 class TransactionGenerator:
 
-    def __init__(self, conf, sim_name=None):
+    def __init__(self, conf, sim_name=None, param_files=None):
         """Initialize transaction network from parameter files.
         :param conf_file: JSON file as configurations
         :param sim_name: Simulation name (overrides the content in the `conf_json`)
+        :param param_files: ParamFiles object of the input directory to share parsed parameter files
+        (e.g. with generators of other random seeds)
         """
         self.g = nx.DiGraph()  # Transaction graph object
         self.num_accounts = 0  # Number of total accounts
-        self.hubs = set()  # Hub account vertices (main account candidates of AML typology subgraphs)
         self.attr_names = list()  # Additional account attribute names
-        self.bank_to_accts = defaultdict(set)  # Bank ID -> account set
+        self.accounts = AccountTable()  # Account attributes
+        self.bank_to_accts = defaultdict(IndexedPool)  # Bank ID -> typology member candidates
+        self.bank_capacity = BankCapacityIndex(self.bank_to_accts)  # Random choices of banks by their candidates
         self.acct_to_bank = dict()  # Account ID -> bank ID
+        self.candidate_accts = IndexedPool()  # Typology member candidates of all banks
         self.normal_model_counts = dict()
         self.normal_models = list()
         self.normal_model_id = 1
@@ -205,6 +603,7 @@ class TransactionGenerator:
         if sim_name is None:
             sim_name = general_conf["simulation_name"]
         logger.info("Simulation name: " + sim_name)
+        self.sim_name = sim_name
 
         self.total_steps = parse_int(general_conf["total_steps"])
 
@@ -236,6 +635,12 @@ class TransactionGenerator:
         self.degree_file = input_conf["degree"]  # Degree distribution file
         self.type_file = input_conf["transaction_type"]  # Transaction type
         self.is_aggregated = input_conf["is_aggregated_accounts"]  # Flag whether the account list is aggregated
+        if param_files is None:
+            param_files = ParamFiles(self.input_dir)
+        elif os.path.abspath(param_files.input_dir) != os.path.abspath(self.input_dir):
+            raise ValueError("Parameter files of %s cannot be used for the input directory %s"
+                             % (param_files.input_dir, self.input_dir))
+        self.param_files = param_files
 
         # Get output file names
         output_conf = self.conf["temporal"]  # The output directory of the graph generator is temporal one
@@ -248,47 +653,123 @@ class TransactionGenerator:
         # Other properties for the transaction graph generator
         other_conf = self.conf["graph_generator"]
         self.degree_threshold = parse_int(other_conf["degree_threshold"])  # Degree for candidates of main accounts
+        # Choose main accounts of AML typologies uniformly ("uniform") or in proportion to their degrees ("degree")
+        self.main_acct_selection = other_conf.get("main_account_selection", "uniform")
+        if self.main_acct_selection not in MAIN_ACCT_SELECTIONS:
+            raise ValueError("Main account selection (%s) must be one of %s"
+                             % (self.main_acct_selection, str(MAIN_ACCT_SELECTIONS)))
+        # Hub account vertices (main account candidates of AML typology subgraphs)
+        self.hub_index = self.new_hub_index()
         high_risk_countries_str = other_conf.get("high_risk_countries", "")
         high_risk_business_str = other_conf.get("high_risk_business", "")
         self.high_risk_countries = set(high_risk_countries_str.split(","))  # List of high-risk country codes
         self.high_risk_business = set(high_risk_business_str.split(","))  # List of high-risk business types
+        # Stub matching engine of the base transaction graph ("python" or "numpy")
+        self.base_graph_engine = other_conf.get("base_graph_engine", "python")
+        if self.base_graph_engine not in BASE_GRAPH_ENGINES:
+            raise ValueError("Base graph engine (%s) must be one of %s"
+                             % (self.base_graph_engine, str(BASE_GRAPH_ENGINES)))
+        # Remove self loops and parallel edges of the base graph by double-edge swaps
+        self.rewire_simple = other_conf.get("rewire_simple", False)
+        # Sample in/out-degree sequences of the base graph from a distribution instead of the degree CSV file
+        base_model = other_conf.get("base_model")
+        self.base_model = parse_base_model(base_model) if base_model else None
+        # Data structure of the transaction graph ("networkx" or array-based "csr")
+        self.graph_backend = other_conf.get("graph_backend", "networkx")
+        if self.graph_backend not in GRAPH_BACKENDS:
+            raise ValueError("Graph backend (%s) must be one of %s" % (self.graph_backend, str(GRAPH_BACKENDS)))
+        # Weighted choices of transaction types: "python" (one random.choice per edge, integer frequencies)
+        # or "alias" (vectorized alias method, which also accepts fractional frequencies)
+        self.tx_type_sampler = other_conf.get("tx_type_sampler", "python")
+        if self.tx_type_sampler not in TX_TYPE_SAMPLERS:
+            raise ValueError("Transaction type sampler (%s) must be one of %s"
+                             % (self.tx_type_sampler, str(TX_TYPE_SAMPLERS)))
+        # Generate regular AML typologies of each alert parameter row at once with NumPy
+        self.batch_typologies = other_conf.get("batch_typologies", False)
+        # Independent random streams of the stages derived from the seed (the global stream if disabled)
+        self.rng_streams = RandomStreams(self.seed) if other_conf.get("rng_streams", False) else None
+        # On-disk cache of base graphs (disabled if the directory is not specified)
+        cache_dir = other_conf.get("base_graph_cache_dir")
+        cache_size = parse_int(other_conf.get("base_graph_cache_size_mb", 1024))
+        self.base_graph_cache = GraphCache(cache_dir, cache_size << 20) if cache_dir else None
+        # Number of worker processes generating the base graph, normal models and typologies of each bank (0 disables)
+        self.shard_workers = parse_int(other_conf.get("shard_workers", 0))
+        if self.shard_workers is None or self.shard_workers < 0:
+            raise ValueError("The number of shard workers must be zero or positive")
+        # Ratio of base transaction stubs matched between banks in the sharded generation
+        # (None for the expected ratio of inter-bank edges when the stubs of all accounts are matched at once)
+        self.inter_bank_ratio = parse_float(other_conf.get("inter_bank_ratio"))
+        # Number of rows formatted at once by the CSV writers
+        self.chunk_size = parse_int(other_conf.get("writer_chunk_size", DEFAULT_CHUNK_SIZE))
+        if self.chunk_size is None or self.chunk_size <= 0:
+            raise ValueError("Writer chunk size must be positive")
 
         self.edge_id = 0  # Edge ID. Formerly Transaction ID
-        self.alert_id = 0  # Alert ID from the alert parameter file
-        self.alert_groups = dict()  # Alert ID and alert transaction subgraph
-        # TODO: Move the mapping of AML pattern to configuration JSON file
-        self.alert_types = {"fan_out": 1, "fan_in": 2, "cycle": 3, "bipartite": 4, "stack": 5,
-                            "random": 6, "scatter_gather": 7, "gather_scatter": 8, "fragmented_deposit": 9, "fragmented_withdrawal": 10 }  # Pattern name and model ID
+        self.num_base_nodes = 0  # Number of account vertices of the base graph (IDs in [0, num_base_nodes))
+        self.active_edges = np.zeros(0, dtype=bool)  # Edge ID -> whether the transaction is active
+        self.alert_groups = AlertStore(self.accounts)  # Alerts (alert IDs are the row numbers)
+        self.normal_models_built = False  # Normal models do not change after build_normal_models
+
+        # Spilling finished artifacts to run files under a memory budget (see set_memory_budget)
+        self.memory_budget = None
+        self.spill_dir = None
+        self.normal_model_runs = None  # Rows of normal models
+        self.normal_model_groups = list()  # Files of the member arrays of the spilled normal models
+        self.alert_runs = None  # Rows of alert members
+        self.num_spilled_alerts = 0  # Alert IDs of alert_groups follow those of the spilled alerts
+        self.transaction_runs = None  # Rows of transactions
+        self.num_spilled_edges = 0
+        # AML typology generators (user-defined ones can be added with amlsim.typologies.register_typology)
+        self.typologies = create_registry()
+        self.alert_types = self.typologies.model_ids()  # Pattern name and model ID
+        self.topology_templates = TemplateLibrary()  # Custom topologies of load_edgelist
 
         self.acct_file = os.path.join(self.input_dir, self.account_file)
+        self.tx_types, self.tx_type_weights = self.param_files.parse(self.type_file, parse_tx_types)
 
-        def get_types(type_csv):
-            tx_types = list()
-            with open(type_csv, "r") as _rf:
-                reader = csv.reader(_rf)
-                next(reader)
-                for row in reader:
-                    if row[0].startswith("#"):
-                        continue
-                    ttype = row[0]
-                    tx_types.extend([ttype] * int(row[1]))
-            return tx_types
+    def parse_param_files(self):
+        """Read and parse all parameter files (e.g. before sharing them with generators of other random seeds)
+        """
+        self.set_num_accounts()
+        if self.base_model is None:  # Sampled degree sequences depend on the random seed
+            self.degree_sequence()
+        if self.is_aggregated:
+            self.param_files.parse(self.account_file, parse_account_params)
+        self.param_files.rows(self.normal_models_file)
+        self.param_files.parse(self.alert_file, parse_alert_params)
 
-        self.tx_types = get_types(os.path.join(self.input_dir, self.type_file))
+    def degree_sequence(self):
+        """
+        :return: Degree sequence (DegreeSequence) repeated for all accounts (call set_num_accounts before)
+        """
+        if self.base_model is None:
+            return self.param_files.parse(self.degree_file, parse_degree_rows).repeat_to(self.num_accounts)
+        if self.rng_streams is not None:
+            seed_seq = self.rng_streams.seed_sequence("base_degrees")
+        else:
+            seed_seq = np.random.SeedSequence(self.seed)
+        in_deg, out_deg = sample_powerlaw_degrees(self.base_model, self.num_accounts, np.random.default_rng(seed_seq))
+        return DegreeSequence(np.ones(self.num_accounts, dtype=np.int64), in_deg, out_deg)
+
+    def new_hub_index(self, num_nodes=0):
+        """
+        :param num_nodes: Initial number of account vertices
+        :return: Empty HubIndex object with the degree threshold and the main account selection
+        """
+        return HubIndex(self.degree_threshold, num_nodes, weighted=self.main_acct_selection == "degree")
 
     def check_hub_exists(self):
         """Validate whether one or more hub accounts exist as main accounts of AML typologies
         """
-        if not self.hubs:
+        if not self.hub_index:
             raise ValueError("No main account candidates found. "
                              "Please try again with smaller value of the 'degree_threshold' parameter in conf.json.")
 
     def set_main_acct_candidates(self):
-        """ Set self.hubs to be a set of hub nodes
+        """ Activate the hub index with the typology member candidates
             Throw an error if not done successfully.
         """
-        hub_list = self.hub_nodes()
-        self.hubs = set(hub_list)
+        self.hub_index.activate(self.acct_to_bank, self.candidate_accts)
         self.check_hub_exists()
 
 
@@ -296,10 +777,7 @@ class TransactionGenerator:
         """Choose hub accounts with larger degree than the specified threshold
         as the main account candidates of alert transaction sets
         """
-        nodes = [n for n in self.g.nodes()  # Hub vertices (with large in/out degrees)
-                 if self.degree_threshold <= self.g.in_degree(n)
-                 or self.degree_threshold <= self.g.out_degree(n)]
-        return nodes
+        return self.hub_index.hub_degree_nodes()
 
 
     def check_account_exist(self, aid):
@@ -326,22 +804,21 @@ class TransactionGenerator:
         """
         return list(self.bank_to_accts.keys())
 
-    def get_typology_members(self, num, bank_id=""):
+    def get_typology_members(self, num, bank_id="", rand=random):
         """Choose accounts randomly as members of AML typologies from one or multiple banks.
         :param num: Number of total account vertices (including the main account)
         :param bank_id: If specified, it chooses members from a single bank with the ID.
         If empty (default), it chooses members from all banks randomly.
+        :param rand: random.Random object or the random module
         :return: Main account and list of member account IDs
         """
         if num <= 1:
             raise ValueError("The number of members must be more than 1")
 
         if bank_id in self.bank_to_accts:  # Choose members from the same bank as the main account
-            bank_accts = self.bank_to_accts[bank_id]
-            main_candidates = self.hubs & bank_accts
-            main_acct = random.sample(main_candidates, 1)[0]
+            main_acct = self.hub_index.choice(bank_id, rand)
             self.remove_typology_candidate(main_acct)
-            sub_accts = random.sample(bank_accts, num - 1)
+            sub_accts = self.bank_to_accts[bank_id].sample(num - 1, rand)
             for n in sub_accts:
                 self.remove_typology_candidate(n)
 
@@ -350,10 +827,10 @@ class TransactionGenerator:
 
         elif bank_id == "":  # Choose members from all accounts
             self.check_hub_exists()
-            main_acct = random.sample(self.hubs, 1)[0]
+            main_acct = self.hub_index.choice(rand=rand)
             self.remove_typology_candidate(main_acct)
 
-            sub_accts = random.sample(self.acct_to_bank.keys(), num - 1)
+            sub_accts = self.candidate_accts.sample(num - 1, rand)
             for n in sub_accts:
                 self.remove_typology_candidate(n)
             members = [main_acct] + sub_accts
@@ -366,14 +843,16 @@ class TransactionGenerator:
         """Load and add account vertices from a CSV file
         """
         if self.is_aggregated:
-            self.load_account_list_param()
+            np_rand = np.random if self.rng_streams is None else self.rng_streams.random_state("balances")
+            self.load_account_list_param(np_rand)
         else:
-            self.load_account_list_raw()
+            rand = random if self.rng_streams is None else self.rng_streams.python_random("balances")
+            self.load_account_list_raw(rand)
 
-    def load_account_list_raw(self):
+    def load_account_list_raw(self, rand=random):
         """Load and add account vertices from a CSV file with raw account info
         header: uuid,seq,first_name,last_name,street_addr,city,state,zip,gender,phone_number,birth_date,ssn
-        :param acct_file: Raw account list file path
+        :param rand: random.Random object or the random module for the active periods and initial balances
         """
         if self.default_min_balance is None:
             raise KeyError("Option 'default_min_balance' is required to load raw account list")
@@ -392,129 +871,347 @@ class TransactionGenerator:
         self.attr_names.extend(["first_name", "last_name", "street_addr", "city", "state", "zip",
                                 "gender", "phone_number", "birth_date", "ssn", "lon", "lat"])
 
-        with open(self.acct_file, "r") as rf:
-            reader = csv.reader(rf)
-            header = next(reader)
-            name2idx = {n: i for i, n in enumerate(header)}
-            idx_aid = name2idx["uuid"]
-            idx_first_name = name2idx["first_name"]
-            idx_last_name = name2idx["last_name"]
-            idx_street_addr = name2idx["street_addr"]
-            idx_city = name2idx["city"]
-            idx_state = name2idx["state"]
-            idx_zip = name2idx["zip"]
-            idx_gender = name2idx["gender"]
-            idx_phone_number = name2idx["phone_number"]
-            idx_birth_date = name2idx["birth_date"]
-            idx_ssn = name2idx["ssn"]
-            idx_lon = name2idx["lon"]
-            idx_lat = name2idx["lat"]
-
-            default_country = "US"
-            default_acct_type = "I"
-
-            count = 0
-            for row in reader:
-                if row[0].startswith("#"):  # Comment line
-                    continue
-                aid = row[idx_aid]
-                first_name = row[idx_first_name]
-                last_name = row[idx_last_name]
-                street_addr = row[idx_street_addr]
-                city = row[idx_city]
-                state = row[idx_state]
-                zip_code = row[idx_zip]
-                gender = row[idx_gender]
-                phone_number = row[idx_phone_number]
-                birth_date = row[idx_birth_date]
-                ssn = row[idx_ssn]
-                lon = row[idx_lon]
-                lat = row[idx_lat]
-                model = default_model
-
-                if start_day is not None and start_range is not None:
-                    start = start_day + random.randrange(start_range)
-                else:
-                    start = -1
-
-                if end_day is not None and end_range is not None:
-                    end = end_day - random.randrange(end_range)
-                else:
-                    end = -1
-
-                attr = {"first_name": first_name, "last_name": last_name, "street_addr": street_addr,
-                        "city": city, "state": state, "zip": zip_code, "gender": gender,
-                        "phone_number": phone_number, "birth_date": birth_date, "ssn": ssn, "lon": lon, "lat": lat}
-
-                init_balance = random.uniform(min_balance, max_balance)  # Generate the initial balance
-                self.add_account(aid, init_balance=init_balance, country=default_country, business=default_acct_type, is_sar=False, **attr)
-                count += 1
+        rows = self.param_files.rows(self.account_file)
+        header = rows[0]
+        name2idx = {n: i for i, n in enumerate(header)}
+        idx_aid = name2idx["uuid"]
+        idx_first_name = name2idx["first_name"]
+        idx_last_name = name2idx["last_name"]
+        idx_street_addr = name2idx["street_addr"]
+        idx_city = name2idx["city"]
+        idx_state = name2idx["state"]
+        idx_zip = name2idx["zip"]
+        idx_gender = name2idx["gender"]
+        idx_phone_number = name2idx["phone_number"]
+        idx_birth_date = name2idx["birth_date"]
+        idx_ssn = name2idx["ssn"]
+        idx_lon = name2idx["lon"]
+        idx_lat = name2idx["lat"]
+
+        default_country = "US"
+        default_acct_type = "I"
+
+        count = 0
+        for row in rows[1:]:
+            if row[0].startswith("#"):  # Comment line
+                continue
+            aid = row[idx_aid]
+            first_name = row[idx_first_name]
+            last_name = row[idx_last_name]
+            street_addr = row[idx_street_addr]
+            city = row[idx_city]
+            state = row[idx_state]
+            zip_code = row[idx_zip]
+            gender = row[idx_gender]
+            phone_number = row[idx_phone_number]
+            birth_date = row[idx_birth_date]
+            ssn = row[idx_ssn]
+            lon = row[idx_lon]
+            lat = row[idx_lat]
+            model = default_model
+
+            if start_day is not None and start_range is not None:
+                start = start_day + rand.randrange(start_range)
+            else:
+                start = -1
+
+            if end_day is not None and end_range is not None:
+                end = end_day - rand.randrange(end_range)
+            else:
+                end = -1
+
+            attr = {"first_name": first_name, "last_name": last_name, "street_addr": street_addr,
+                    "city": city, "state": state, "zip": zip_code, "gender": gender,
+                    "phone_number": phone_number, "birth_date": birth_date, "ssn": ssn, "lon": lon, "lat": lat}
+
+            init_balance = rand.uniform(min_balance, max_balance)  # Generate the initial balance
+            self.add_account(aid, init_balance=init_balance, country=default_country, business=default_acct_type, bank_id=None, is_sar=False, **attr)
+            count += 1
 
     def set_num_accounts(self):
-        with open(self.acct_file, "r") as rf:
-            reader = csv.reader(rf)
-            # Parse header
-            header = next(reader)
-
-            count = 0
-            for row in reader:
-                if row[0].startswith("#"):
-                    continue
-                num = int(row[header.index('count')])
-                count += num
+        rows = self.param_files.rows(self.account_file)
+        # Parse header
+        header = rows[0]
+
+        count = 0
+        for row in rows[1:]:
+            if row[0].startswith("#"):
+                continue
+            num = int(row[header.index('count')])
+            count += num
 
         self.num_accounts = count
 
 
-    def load_account_list_param(self):
+    def load_account_list_param(self, np_rand=np.random):
 
         """Load and add account vertices from a CSV file with aggregated parameters
         Each row may represent two or more accounts
-        :param acct_file: Account parameter file path
-        """
-
-        with open(self.acct_file, "r") as rf:
-            reader = csv.reader(rf)
-            # Parse header
-            header = next(reader)
-
-            acct_id = 0
-            for row in reader:
-                if row[0].startswith("#"):
-                    continue
-                num = int(row[header.index('count')])
-                min_balance = parse_float(row[header.index('min_balance')])
-                max_balance = parse_float(row[header.index('max_balance')])
-                country = row[header.index('country')]
-                business = row[header.index('business_type')]
-                bank_id = row[header.index('bank_id')] 
-                if bank_id is None:
-                    bank_id = self.default_bank_id
-
-                for i in range(num):
-                    init_balance = random.uniform(min_balance, max_balance)  # Generate amount
-                    self.add_account(acct_id, init_balance=init_balance, country=country, business=business, bank_id=bank_id, is_sar=False, normal_models=list())
-                    acct_id += 1
+        :param np_rand: np.random.RandomState object or the np.random module for the initial balances
+        """
+
+        acct_id = 0
+        for num, min_balance, max_balance, country, business, bank_id in self.param_files.parse(
+                self.account_file, parse_account_params):
+            if bank_id is None:
+                bank_id = self.default_bank_id
+
+            init_balances = np_rand.uniform(min_balance, max_balance, num)  # Generate amounts
+            self.accounts.add_accounts(range(acct_id, acct_id + num), init_balances, country, business, bank_id)
+            acct_id += num
 
+        for bank_id, acct_ids in self.accounts.bank_accounts().items():
+            acct_ids = acct_ids.tolist()
+            self.bank_to_accts[bank_id].update(acct_ids)
+            self.bank_capacity.update(bank_id)
+            self.acct_to_bank.update(dict.fromkeys(acct_ids, bank_id))
+            self.candidate_accts.update(acct_ids)
         logger.info("Generated %d accounts." % self.num_accounts)
 
     def generate_normal_transactions(self):
-        """Generate a base directed graph from degree sequences
-        TODO: Add options to call scale-free generator functions directly instead of loading degree CSV files
+        """Generate a base directed graph from degree sequences (the degree CSV file or the base model)
         :return: Directed graph as the base transaction graph (not complete transaction graph)
         """
-        deg_file = os.path.join(self.input_dir, self.degree_file)
-        in_deg, out_deg = get_degrees(deg_file, self.num_accounts)
-        G = directed_configuration_model(in_deg, out_deg, self.seed)
-        G = nx.DiGraph(G)
+        deg_file = os.path.join(self.input_dir, self.degree_file) if self.base_model is None else None
+        cached = self.load_cached_base_graph(deg_file)
+        if cached is not None:
+            src, dst, num_nodes = cached
+            G = self.new_graph(num_nodes, src, dst)
+        else:
+            src, dst, num_nodes, G = self.build_base_graph(deg_file)
+            self.store_cached_base_graph(deg_file, src, dst, num_nodes)
         self.g = G
+        self.num_base_nodes = num_nodes
+        self.hub_index = self.new_hub_index(num_nodes)
 
         logger.info("Add %d base transactions" % self.g.number_of_edges())
-        nodes = self.g.nodes()
-        for src_i, dst_i in self.g.edges():
-            src = nodes[src_i]
-            dst = nodes[dst_i]
-            self.add_edge_info(src, dst)  # Add edge info.
+        self.add_edges_info(src, dst)  # Add edge info in the order of the graph edges
+
+    def new_graph(self, num_nodes, src, dst):
+        """Create a transaction graph of the configured backend from edge arrays
+        :param num_nodes: Number of account vertices
+        :param src: Originator array
+        :param dst: Beneficiary array
+        :return: CSRGraph or networkx DiGraph
+        """
+        if self.graph_backend == "csr":
+            return CSRGraph(num_nodes, src, dst)
+        G = nx.empty_graph(num_nodes, nx.DiGraph())
+        G.add_edges_from(zip(np.asarray(src).tolist(), np.asarray(dst).tolist()))
+        return G
+
+    def build_base_graph(self, deg_file):
+        """Build a base directed graph from degree sequences
+        :param deg_file: Degree sequence CSV file path (None if sampled from the base model)
+        :return: Originator and beneficiary arrays in the order of the graph edges, number of nodes and the graph
+        """
+        deg_seq = self.degree_sequence()
+        num_nodes = deg_seq.num_nodes
+        logger.info("Requested %d base transactions for %d accounts" % (deg_seq.total_in_degree, num_nodes))
+        seed = self.base_graph_seed()
+        if self.base_graph_engine == "python" and not self.rewire_simple and self.graph_backend == "networkx":
+            G = directed_configuration_model(*deg_seq.to_lists(), seed=seed)
+            G = nx.DiGraph(G)
+            src, dst = np.array(G.edges(), dtype=np.int64).reshape(-1, 2).T
+        else:
+            in_deg, out_deg = deg_seq.in_degrees(), deg_seq.out_degrees()
+            if self.base_graph_engine == "numpy":
+                src, dst = directed_configuration_model_edges(in_deg, out_deg, seed)
+            else:
+                multi_g = directed_configuration_model(in_deg.tolist(), out_deg.tolist(), seed)
+                src, dst = np.array(multi_g.edges(), dtype=np.int64).reshape(-1, 2).T
+            if self.rewire_simple:
+                src, dst = rewire_simple_edges(src, dst, num_nodes, seed)
+            src, dst = unique_edges(src[src != dst], dst[src != dst], num_nodes)
+            report = degree_sequence_report(src, dst, in_deg, out_deg)
+            logger.info("Realized %d of %d requested base transactions, in/out-degree L1 error: %d / %d, "
+                        "accounts with exact in/out-degree: %.2f%% / %.2f%%"
+                        % (report["realized_edges"], report["requested_edges"], report["in_degree_error"],
+                           report["out_degree_error"], report["exact_in_degree_ratio"] * 100,
+                           report["exact_out_degree_ratio"] * 100))
+            G = self.new_graph(num_nodes, src, dst)
+        return src, dst, num_nodes, G
+
+    def base_graph_seed(self):
+        """
+        :return: Seed of the base graph generation
+        """
+        return self.rng_streams.int_seed("base_graph") if self.rng_streams is not None else self.seed
+
+    def base_graph_cache_key(self, deg_file):
+        """Key of the base graph in the cache (None if the graph is not reproducible)
+        :param deg_file: Degree sequence CSV file path (None if sampled from the base model)
+        """
+        if self.base_graph_cache is None or self.seed is None:
+            return None
+        params = {
+            "num_accounts": self.num_accounts,
+            "seed": self.base_graph_seed(),
+            "base_graph_engine": self.base_graph_engine,
+            "rewire_simple": self.rewire_simple,
+            # The reference implementation keeps the edge order of networkx instead of sorting edges
+            "networkx_order": self.base_graph_engine == "python" and not self.rewire_simple
+                              and self.graph_backend == "networkx",
+        }
+        if self.base_model is not None:
+            params["base_model"] = self.base_model
+            params["rng_streams"] = self.rng_streams is not None
+        return cache_key([path for path in (deg_file, self.acct_file) if path is not None], params)
+
+    def load_cached_base_graph(self, deg_file):
+        """Load the base graph edges from the cache and restore the random state after the graph generation
+        :param deg_file: Degree sequence CSV file path
+        :return: Memory-mapped originator and beneficiary arrays and the number of nodes, or None if not cached
+        """
+        key = self.base_graph_cache_key(deg_file)
+        if key is None:
+            return None
+        cached = self.base_graph_cache.get(key)
+        if cached is None:
+            logger.info("Base graph %s is not cached" % key)
+            return None
+        src, dst, meta = cached
+        version, state, gauss_next = meta["random_state"]
+        random.setstate((version, tuple(state), gauss_next))
+        logger.info("Loaded %d base transactions from the cache %s" % (len(src), key))
+        return src, dst, meta["num_nodes"]
+
+    def store_cached_base_graph(self, deg_file, src, dst, num_nodes):
+        """Store the base graph edges to the cache with the random state after the graph generation
+        :param deg_file: Degree sequence CSV file path
+        :param src: Originator array
+        :param dst: Beneficiary array
+        :param num_nodes: Number of nodes
+        """
+        key = self.base_graph_cache_key(deg_file)
+        if key is None:
+            return
+        meta = {"num_nodes": num_nodes, "num_edges": len(src), "random_state": random.getstate()}
+        self.base_graph_cache.put(key, src, dst, meta)
+
+    def generate_sharded(self, num_workers):
+        """Generate the base graph, normal models and bank-local AML typologies of each bank on a process pool,
+        and merge them with inter-bank transactions and cross-bank AML typologies (parameter rows without bank IDs).
+        It replaces the stages from normal_transactions to alert_patterns. The degree sequences of all accounts are
+        split into those of each bank and those of inter-bank transactions, and edge IDs and normal model IDs
+        are assigned in the order of the banks. Normal models are built within each bank,
+        and some inter-bank transactions chosen at random become "single" normal models.
+        :param num_workers: Number of worker processes
+        """
+        if not self.is_aggregated:
+            raise ValueError("Sharded generation requires an aggregated account list")
+        begin = time.time()
+        self.set_num_accounts()
+        self.load_account_list()
+        bank_accts = self.accounts.bank_accounts()
+        bank_ids = list(bank_accts.keys())
+        groups = [bank_accts[bank_id].astype(np.int64) for bank_id in bank_ids]
+        bank_sizes = [len(accts) for accts in groups]
+        for bank_id in self.get_alert_bank_ids():
+            if bank_id != "" and bank_id not in bank_accts:
+                raise KeyError("No such bank ID: %s" % bank_id)
+
+        seed_seq = np.random.SeedSequence(self.seed)
+        shard_seeds = [int(ss.generate_state(1)[0]) for ss in seed_seq.spawn(len(bank_ids))]
+        rng = np.random.default_rng(seed_seq.spawn(1)[0])
+        deg_seq = self.degree_sequence()
+        in_deg, out_deg = deg_seq.in_degrees(np.int64), deg_seq.out_degrees(np.int64)
+        if self.inter_bank_ratio is None:  # Expected ratios of each bank if stubs of all accounts are matched at once
+            inter_in_ratio, inter_out_ratio = expected_inter_ratios(in_deg, out_deg, groups)
+        else:
+            inter_in_ratio = inter_out_ratio = self.inter_bank_ratio
+        local_degrees, inter_in, inter_out = split_degrees(in_deg, out_deg, groups, inter_in_ratio, rng,
+                                                           inter_out_ratio)
+        # Match inter-bank stubs before the shards run, and give stubs left within a bank back to the bank
+        acct_banks = np.empty(self.num_accounts, dtype=np.int64)
+        for i, accts in enumerate(groups):
+            acct_banks[accts] = i
+        num_requested = int(inter_in.sum())
+        inter_src, inter_dst, local_src, local_dst = match_inter_group_stubs(inter_in, inter_out, acct_banks, rng)
+        if len(local_src) > 0:
+            add_local_stubs(local_degrees, groups, local_src, local_dst)
+            logger.info("Returned %d unmatched inter-bank transaction stubs to the banks" % len(local_src))
+
+        # Normal models are built on the transactions within each bank
+        local_edges = [max(int(local_out.sum()), 1) for _, local_out in local_degrees]
+        with tempfile.TemporaryDirectory() as shard_root:
+            tasks = list()
+            for i, bank_id in enumerate(bank_ids):
+                conf = copy.deepcopy(self.conf)
+                conf["input"]["directory"] = os.path.join(shard_root, "bank%d" % i)
+                conf["general"]["random_seed"] = shard_seeds[i]
+                conf["general"]["simulation_name"] = bank_id
+                conf["graph_generator"].pop("base_model", None)  # Shards read their split degree sequences
+                num_alert_rows = write_shard_inputs(self.conf["input"], conf["input"]["directory"], bank_id, i,
+                                                    local_edges, *local_degrees[i])
+                stages = SHARD_STAGES if num_alert_rows > 0 else SHARD_STAGES[:-2]
+                methods = [method for name, stage_methods in STAGES if name in stages for method in stage_methods]
+                tasks.append((type(self), conf, methods))
+            shards = run_shards(tasks, num_workers, bank_sizes)
+        for bank_id, shard in zip(bank_ids, shards):
+            logger.info("Generated %d transactions, %d normal models and %d alerts of bank %s (%.3f seconds)"
+                        % (len(shard.src), len(shard.normal_models), len(shard.alerts), bank_id, shard.elapsed))
+
+        # Inter-bank transactions
+        inter_src, inter_dst = unique_edges(inter_src, inter_dst, self.num_accounts)
+        logger.info("Add %d inter-bank transactions of %d requested" % (len(inter_src), num_requested))
+        if len(inter_src) < INTER_BANK_WARNING_RATIO * num_requested:
+            logger.warning("Only %d of %d requested inter-bank transactions (%.1f%%) were realized "
+                           "(most stubs may belong to a few banks)"
+                           % (len(inter_src), num_requested, 100.0 * len(inter_src) / num_requested))
+
+        # Merge the transaction graphs with global account IDs
+        src = np.concatenate([accts[shard.src] for accts, shard in zip(groups, shards)] + [inter_src])
+        dst = np.concatenate([accts[shard.dst] for accts, shard in zip(groups, shards)] + [inter_dst])
+        self.g = self.new_graph(self.num_accounts, src, dst)
+        self.num_base_nodes = self.num_accounts
+        self.hub_index = self.new_hub_index(self.num_accounts)
+        self.add_edges_info(src, dst)
+
+        for accts, shard in zip(groups, shards):
+            for model_type, node_ids, main_id in shard.normal_models:
+                self.add_normal_model(model_type, accts[node_ids].tolist(), int(accts[main_id]))
+            for alert_id in self.alert_groups.extend(shard.alerts, accts):
+                begin_member, end_member = self.alert_groups.member_range(alert_id)
+                for acct in self.alert_groups.members[begin_member:end_member]:
+                    self.accounts.set_sar(acct)
+            for acct in accts[shard.removed].tolist():
+                self.remove_typology_candidate(acct)
+        # Inter-bank "single" normal models with the same number of normal models per transaction as within banks
+        num_local_edges = len(src) - len(inter_src)
+        num_models = min(len(inter_src), int(round(len(self.normal_models) * len(inter_src) / max(num_local_edges, 1))))
+        for e in np.sort(rng.choice(len(inter_src), num_models, replace=False)).tolist():
+            orig, bene = int(inter_src[e]), int(inter_dst[e])
+            self.add_normal_model("single", [orig, bene], orig)
+        logger.info("Merged %d banks: %d transactions, %d normal models and %d alerts (%.3f seconds)"
+                    % (len(bank_ids), self.g.number_of_edges(), len(self.normal_models), len(self.alert_groups),
+                       time.time() - begin))
+
+        # Cross-bank AML typologies
+        random.seed(int(rng.integers(2 ** 32)))
+        np.random.seed(int(rng.integers(2 ** 32)))
+        self.hub_index.activate(self.acct_to_bank, self.candidate_accts)
+        self.load_alert_patterns(bank_ids=[""])
+
+    def get_alert_bank_ids(self):
+        """
+        :return: Set of bank IDs in the AML typology parameter file (empty for cross-bank typologies)
+        """
+        return {param.bank_id for param in self.param_files.parse(self.alert_file, parse_alert_params)}
+
+    def add_normal_model(self, model_type, node_ids, main_id):
+        """Add a normal model of existing accounts
+        :param model_type: Normal model type (e.g. "single" and "fan_out")
+        :param node_ids: Member account IDs
+        :param main_id: Main account ID
+        :return: NormalModel object
+        """
+        normal_model = NormalModel(self.normal_model_id, model_type, set(node_ids), main_id)
+        for node_id in node_ids:
+            self.accounts.add_normal_model(node_id, normal_model)
+        self.normal_models.append(normal_model)
+        self.normal_model_id += 1
+        return normal_model
 
     def add_account(self, acct_id, **attr):
         """Add an account vertex
@@ -525,33 +1222,103 @@ class TransactionGenerator:
         :param country: Country name
         :param business: Business type
         :param bank_id: Bank ID
-        :param attr: Optional attributes-
+        :param is_sar: Whether this account is involved in SAR
+        :param attr: Optional attributes
         :return:
         """
-        
-        if attr['bank_id'] is None:
-            attr['bank_id'] = self.default_bank_id
+        bank_id = attr.pop('bank_id')
+        if bank_id is None:
+            bank_id = self.default_bank_id
+        attr.pop('normal_models', None)  # Normal models are kept by the account table
 
-        self.g.node[acct_id] = attr
+        self.accounts.add_account(acct_id, attr.pop('init_balance'), attr.pop('country'), attr.pop('business'),
+                                  bank_id, attr.pop(IS_SAR_KEY, False), **attr)
 
-        self.bank_to_accts[attr['bank_id']].add(acct_id)
-        self.acct_to_bank[acct_id] = attr['bank_id']
+        self.bank_to_accts[bank_id].add(acct_id)
+        self.bank_capacity.update(bank_id)
+        self.acct_to_bank[acct_id] = bank_id
+        self.candidate_accts.add(acct_id)
 
 
     def remove_typology_candidate(self, acct):
         """Remove an account vertex from AML typology member candidates
         :param acct: Account ID
         """
-        self.hubs.discard(acct)
+        self.candidate_accts.remove(acct)
+        self.hub_index.remove(acct)
         bank_id = self.acct_to_bank[acct]
-        del self.acct_to_bank[acct]
         self.bank_to_accts[bank_id].discard(acct)
+        self.bank_capacity.update(bank_id)
+
+    def remove_typology_candidates(self, accts):
+        """Remove account vertices from AML typology member candidates at once
+        :param accts: Account ID array (no duplicates)
+        """
+        accts = np.asarray(accts)
+        acct_list = accts.tolist()
+        self.candidate_accts.discard_many(acct_list)
+        self.hub_index.remove_many(accts)
+        bank_accts = defaultdict(list)
+        for acct in acct_list:
+            bank_accts[self.acct_to_bank[acct]].append(acct)
+        for bank_id, members in bank_accts.items():
+            self.bank_to_accts[bank_id].discard_many(members)
+            self.bank_capacity.update(bank_id)
+
+    def check_accounts_exist(self, accts):
+        """Validate existences of accounts at once. If any of them is absent, it raises KeyError.
+        Account IDs of the base graph (integers in [0, num_base_nodes)) are validated by a range check.
+        :param accts: Account ID array
+        """
+        accts = np.asarray(accts)
+        if accts.dtype.kind in "iu":
+            accts = accts[(accts < 0) | (accts >= self.num_base_nodes)]
+        for aid in np.unique(accts).tolist():
+            self.check_account_exist(aid)
+
+    def add_edges_info(self, src, dst, new=None):
+        """Assign a contiguous range of edge IDs to existing transaction edges at once.
+        Bulk version of add_edge_info (edge IDs are assigned in the order of the arrays).
+        :param src: Originator account ID array
+        :param dst: Beneficiary account ID array
+        :param new: Boolean array of the edges newly added to the graph (see insert_edges, None if all are new).
+        Only new edges are counted as degrees of hub accounts.
+        :return: Edge ID array
+        """
+        src = np.asarray(src)
+        dst = np.asarray(dst)
+        if len(src) != len(dst):
+            raise ValueError("The numbers of originators (%d) and beneficiaries (%d) must be same"
+                             % (len(src), len(dst)))
+        if len(src) == 0:
+            return np.zeros(0, dtype=np.int64)
+        self.check_accounts_exist(src)  # Ensure the originator and beneficiary accounts exist
+        self.check_accounts_exist(dst)
+        loops = np.flatnonzero(src == dst)
+        if len(loops) > 0:
+            raise ValueError("Self loop from/to %s is not allowed for transaction networks" % str(src[loops[0]]))
+
+        edge_ids = np.arange(self.edge_id, self.edge_id + len(src), dtype=np.int64)
+        if isinstance(self.g, CSRGraph):
+            self.g.set_edge_attrs(src, dst, "edge_id", edge_ids)
+        else:
+            edge = self.g.edge
+            for orig, bene, edge_id in zip(src.tolist(), dst.tolist(), edge_ids.tolist()):
+                edge[orig][bene]['edge_id'] = edge_id
+        self.edge_id += len(src)
+        if new is None:
+            self.hub_index.add_edges(src, dst)
+        else:
+            new = np.asarray(new, dtype=bool)
+            self.hub_index.add_edges(src[new], dst[new])
+        return edge_ids
 
-    def add_edge_info(self, orig, bene):
+    def add_edge_info(self, orig, bene, is_new=True):
         """Adds info to edge. Based on add_transaction.
         Add transaction will go away eventually.
         :param orig: Originator account ID
         :param bene: Beneficiary account ID
+        :param is_new: Whether the edge was newly added to the graph (otherwise it is not counted as degrees)
         :return:
         """
         self.check_account_exist(orig)  # Ensure the originator and beneficiary accounts exist
@@ -560,6 +1327,25 @@ class TransactionGenerator:
             raise ValueError("Self loop from/to %s is not allowed for transaction networks" % str(orig))
         self.g.edge[orig][bene]['edge_id'] = self.edge_id
         self.edge_id += 1
+        if is_new:
+            self.hub_index.add_edge(orig, bene)
+
+    def insert_edges(self, src, dst):
+        """Add transaction edges to the graph
+        :param src: Originator account ID list
+        :param dst: Beneficiary account ID list
+        :return: Boolean array of the edges newly added (False for existing edges and repeated pairs)
+        """
+        g = self.g
+        if isinstance(g, CSRGraph):
+            return g.add_edge_arrays(src, dst)
+        new = list()
+        for orig, bene in zip(src, dst):
+            is_new = not g.has_edge(orig, bene)
+            if is_new:
+                g.add_edge(orig, bene)
+            new.append(is_new)
+        return np.array(new, dtype=bool)
 
     # Load Custom Topology Files
     def add_subgraph(self, members, topology):
@@ -570,13 +1356,18 @@ class TransactionGenerator:
         """
         if len(members) != topology.number_of_nodes():
             raise nx.NetworkXError("The number of account vertices does not match")
-
-        node_map = dict(zip(members, topology.nodes()))
-        for e in topology.edges():
-            src = node_map[e[0]]
-            dst = node_map[e[1]]
-            self.g.add_edge(src, dst)
-            self.add_edge_info(src, dst)
+        self.add_subgraphs([members], TopologyTemplate.from_graph(topology))
+
+    def add_subgraphs(self, member_sets, template):
+        """Add subgraphs of a topology template to existing account vertices at once
+        :param member_sets: List of account vertex lists, the i-th account of each list is mapped to the i-th node
+        of the template
+        :param template: TopologyTemplate object
+        :return: Edge ID array (edges of each member set in order)
+        """
+        src, dst = template.stamp(member_sets)
+        new = self.insert_edges(src.tolist(), dst.tolist())
+        return self.add_edges_info(src, dst, new)
 
     def load_edgelist(self, members, csv_name):
         """Load edgelist and add edges with existing account vertices
@@ -584,25 +1375,185 @@ class TransactionGenerator:
         :param csv_name: Edgelist file name
         :return:
         """
-        topology = nx.DiGraph()
-        topology = nx.read_edgelist(csv_name, delimiter=",", create_using=topology)
-        self.add_subgraph(members, topology)
+        self.load_edgelists([members], csv_name)
+
+    def load_edgelists(self, member_sets, csv_name):
+        """Load edgelist (parsed once as a topology template) and add its edges to many account vertex sets at once
+        :param member_sets: List of account vertex lists
+        :param csv_name: Edgelist file name
+        :return: Edge ID array (edges of each member set in order)
+        """
+        return self.add_subgraphs(member_sets, self.topology_templates.get(csv_name))
 
 
+    def get_edge_id_arrays(self):
+        """Get transaction edges with edge IDs as arrays
+        :return: Originator account ID array, beneficiary account ID array and edge ID array
+        """
+        if isinstance(self.g, CSRGraph):
+            return self.g.edge_id_arrays()
+        edges = [e for e in self.g.edges(data="edge_id") if e[2] is not None]
+        if not edges:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        src, dst, edge_ids = zip(*edges)
+        return np.array(src), np.array(dst), np.array(edge_ids, dtype=np.int64)
+
     def mark_active_edges(self):
-        nx.set_edge_attributes(self.g, 'active', False)
-        for normal_model in self.normal_models:
-            subgraph = self.g.subgraph(normal_model.node_ids)
-            nx.set_edge_attributes(subgraph, 'active', True)
+        """Mark transaction edges between members of the same normal model as active.
+        The activity is held as a bitmap over edge IDs (self.active_edges).
+        If the memory usage is close to the budget, the transactions are spilled to run files partition by partition.
+        """
+        if self.memory_budget is not None and self.memory_budget.is_close(self.memory_budget.estimate(self)):
+            self.mark_and_spill_transactions()
+            return
+        src, dst, edge_ids = self.get_edge_id_arrays()
+        if self.normal_model_groups:  # Some normal models were spilled
+            self.active_edges = np.zeros(self.edge_id, dtype=bool)
+            member_ids, group_ids = self.normal_model_member_arrays()
+            if len(member_ids) > 0:
+                index = ActiveEdgeIndex(member_ids, group_ids)
+                index.mark_chunks(src, dst, edge_ids, self.active_edges, self.chunk_size)
+        else:
+            self.active_edges = active_edge_bitmap(src, dst, edge_ids, self.edge_id,
+                                                   (nm.node_ids for nm in self.normal_models), self.chunk_size)
+        logger.info("Marked %d active transactions" % np.count_nonzero(self.active_edges))
+
+    def set_memory_budget(self, max_bytes, spill_dir=None):
+        """Spill finished artifacts (normal models, alerts and transactions) to run files
+        when the estimated memory usage is close to the budget. The writers merge them at the end.
+        :param max_bytes: Memory budget (bytes)
+        :param spill_dir: Directory of the run files (default: "spill" in the output directory)
+        """
+        if not self.is_aggregated:
+            raise ValueError("Memory budget requires an aggregated account list (integer account IDs)")
+        self.memory_budget = MemoryBudget(max_bytes)
+        self.spill_dir = spill_dir or os.path.join(self.output_dir, "spill")
+        self.normal_model_runs = RunFiles(self.spill_dir, "normal_models")
+        self.alert_runs = RunFiles(self.spill_dir, "alert_members")
+        self.transaction_runs = RunFiles(self.spill_dir, "transactions")
+
+    def check_memory_budget(self):
+        """Spill finished normal models and alerts if the estimated memory usage is close to the budget
+        """
+        if self.memory_budget is None:
+            return
+        num_members = sum(len(nm.node_ids) for nm in self.normal_models) if self.normal_models_built else None
+        usage = self.memory_budget.estimate(self, num_members)
+        if not self.memory_budget.is_close(usage) or not (num_members or len(self.alert_groups)):
+            return
+        logger.info("Estimated memory usage (%s) is close to the budget %.1f MB"
+                    % (", ".join("%s %.1f MB" % (k, v / 1048576.0) for k, v in usage.items()),
+                       self.memory_budget.max_bytes / 1048576.0))
+        if self.normal_models_built:
+            self.spill_normal_models()
+        self.spill_alerts()
+
+    def spill_normal_models(self):
+        """Move all normal models to run files (after build_normal_models)
+        """
+        if not self.normal_models:
+            return
+        self.normal_model_runs.write_run(self.normal_model_records(self.normal_models))
+        path = os.path.join(self.spill_dir, "normal_model_groups.%d.npz" % len(self.normal_model_groups))
+        write_groups(path, (nm.node_ids for nm in self.normal_models))
+        self.normal_model_groups.append(path)
+        self.normal_models = list()
+        self.accounts.normal_models = dict()  # Only the nominator uses them to build normal models
+
+    def spill_alerts(self):
+        """Move the stored alerts to run files
+        """
+        if len(self.alert_groups) == 0:
+            return
+        self.alert_runs.write_run(self.alert_member_records(self.alert_groups, self.num_spilled_alerts))
+        self.num_spilled_alerts += len(self.alert_groups)
+        self.alert_groups = AlertStore(self.accounts)
+
+    def remove_spill_files(self):
+        if self.memory_budget is None:
+            return
+        for runs in (self.normal_model_runs, self.alert_runs, self.transaction_runs):
+            runs.remove()
+        for path in self.normal_model_groups:
+            os.remove(path)
+        self.normal_model_groups = list()
+        if os.path.isdir(self.spill_dir) and not os.listdir(self.spill_dir):
+            os.rmdir(self.spill_dir)
+
+    def normal_model_member_arrays(self):
+        """
+        :return: Member account ID array and group index array of all normal models (spilled ones first)
+        """
+        member_ids = list()
+        group_ids = list()
+        num_groups = 0
+        for path in self.normal_model_groups:
+            members, sizes = read_groups(path)
+            member_ids.append(members)
+            group_ids.append(np.repeat(np.arange(num_groups, num_groups + len(sizes)), sizes))
+            num_groups += len(sizes)
+        members = [acct for nm in self.normal_models for acct in nm.node_ids]
+        sizes = [len(nm.node_ids) for nm in self.normal_models]
+        member_ids.append(np.array(members, dtype=np.int64))
+        group_ids.append(np.repeat(np.arange(num_groups, num_groups + len(sizes)), sizes))
+        return np.concatenate(member_ids), np.concatenate(group_ids)
+
+    def iter_edge_chunks(self):
+        """Transaction edges with edge IDs in chunks (in the order of the graph edges)
+        :return: Generator of originator, beneficiary and edge ID arrays
+        """
+        if isinstance(self.g, CSRGraph):
+            src, dst, edge_ids = self.get_edge_id_arrays()
+            for begin in range(0, len(edge_ids), self.chunk_size):
+                end = begin + self.chunk_size
+                yield src[begin:end], dst[begin:end], edge_ids[begin:end].astype(np.int64)
+            return
+        edges = self.g.edges_iter(data="edge_id")
+        while True:
+            chunk = list(islice(edges, self.chunk_size))
+            if not chunk:
+                break
+            src, dst, edge_ids = zip(*chunk)
+            yield np.array(src), np.array(dst), np.array(edge_ids, dtype=np.int64)
+
+    def mark_and_spill_transactions(self):
+        """Mark active edges and write the active transactions to a run file partition by partition.
+        The edges do not change after this stage, so the transaction graph is released.
+        Transaction types are drawn in the same order as write_transaction_list.
+        """
+        member_ids, group_ids = self.normal_model_member_arrays()
+        index = ActiveEdgeIndex(member_ids, group_ids) if len(member_ids) > 0 else None
+        self.active_edges = np.zeros(self.edge_id, dtype=bool)
+        draw_tx_types = self.tx_type_drawer()
+
+        def records():
+            for src, dst, edge_ids in self.iter_edge_chunks():
+                types = draw_tx_types(len(edge_ids))
+                if index is not None:
+                    index.mark(src, dst, edge_ids, self.active_edges)
+                columns = self.transaction_columns(src, dst, edge_ids, types)
+                yield from zip(range(self.num_spilled_edges, self.num_spilled_edges + len(columns[0])),
+                               format_lines(columns))
+                self.num_spilled_edges += len(edge_ids)
+
+        self.transaction_runs.write_run(records())
+        self.g = self.new_graph(0, [], [])
+        logger.info("Marked %d active transactions" % np.count_nonzero(self.active_edges))
+
+    def is_active_edge(self, orig, bene):
+        """Whether the transaction edge is active (call mark_active_edges before)
+        :param orig: Originator account ID
+        :param bene: Beneficiary account ID
+        :return: True if the edge is active
+        """
+        edge_id = self.g.edge[orig][bene].get('edge_id')
+        return edge_id is not None and bool(self.active_edges[edge_id])
 
 
     def load_normal_models(self):
         """Load a Normal Model parameter file
         """
-        normal_models_file = os.path.join(self.input_dir, self.normal_models_file)
-        with open(normal_models_file, "r") as csvfile:
-            reader = csv.reader(csvfile)
-            self.read_normal_models(reader)
+        self.read_normal_models(iter(self.param_files.rows(self.normal_models_file)))
 
 
     def read_normal_models(self, reader):
@@ -610,7 +1561,7 @@ class TransactionGenerator:
         """
         header = next(reader)
 
-        self.nominator = Nominator(self.g, self.degree_threshold)
+        self.nominator = Nominator(self.g, self.degree_threshold, self.accounts)
 
         for row in reader:
             count = int(row[header.index('count')])
@@ -634,6 +1585,7 @@ class TransactionGenerator:
                 if count > 0:
                     self.choose_normal_model(type)
                     self.normal_model_id += 1
+        self.normal_models_built = True
         logger.info("Generated %d normal models." % len(self.normal_models))
         logger.info("Normal model counts %s", self.nominator.used_count_dict)
         
@@ -672,7 +1624,7 @@ class TransactionGenerator:
         normal_model = NormalModel(self.normal_model_id, type, result_ids, node_id)
 
         for result_id in result_ids:
-            self.g.node[result_id]['normal_models'].append(normal_model)
+            self.accounts.add_normal_model(result_id, normal_model)
 
         self.normal_models.append(normal_model)
         
@@ -697,7 +1649,7 @@ class TransactionGenerator:
         result_ids = candidates | { node_id }
         normal_model = NormalModel(self.normal_model_id, type, result_ids, node_id)
         for id in result_ids:
-            self.g.node[id]['normal_models'].append(normal_model)
+            self.accounts.add_normal_model(id, normal_model)
 
         self.normal_models.append(normal_model)
 
@@ -720,7 +1672,7 @@ class TransactionGenerator:
         )
         normal_model = NormalModel(self.normal_model_id, type, list(set), node_id)
         for id in set:
-            self.g.node[id]['normal_models'].append(normal_model)
+            self.accounts.add_normal_model(id, normal_model)
 
         self.normal_models.append(normal_model)
 
@@ -739,7 +1691,7 @@ class TransactionGenerator:
         result_ids = { node_id, succ_id }
         normal_model = NormalModel(self.normal_model_id, type, result_ids, node_id)
         for id in result_ids:
-            self.g.node[id]['normal_models'].append(normal_model)
+            self.accounts.add_normal_model(id, normal_model)
 
         self.normal_models.append(normal_model)
 
@@ -758,7 +1710,7 @@ class TransactionGenerator:
         result_ids = { node_id, succ_id }
         normal_model = NormalModel(self.normal_model_id, type, result_ids, node_id)
         for id in result_ids:
-            self.g.node[id]['normal_models'].append(normal_model)
+            self.accounts.add_normal_model(id, normal_model)
 
         self.normal_models.append(normal_model)
 
@@ -777,576 +1729,514 @@ class TransactionGenerator:
         result_ids = { node_id, succ_id }
         normal_model = NormalModel(self.normal_model_id, type, result_ids, node_id)
         for id in result_ids:
-            self.g.node[id]['normal_models'].append(normal_model)
+            self.accounts.add_normal_model(id, normal_model)
 
         self.normal_models.append(normal_model)
 
         self.nominator.post_mutual(node_id, type)
         
 
-    def load_alert_patterns(self):
+    def load_alert_patterns(self, bank_ids=None):
         """Load an AML typology parameter file
+        :param bank_ids: If specified, only the parameter rows with these bank IDs are loaded
+        (e.g. [""] for the cross-bank typologies)
         :return:
         """
-        alert_file = os.path.join(self.input_dir, self.alert_file)
-
-        idx_num = None
-        idx_type = None
-        idx_schedule = None
-        idx_min_accts = None
-        idx_max_accts = None
-        idx_min_amt = None
-        idx_max_amt = None
-        idx_min_period = None
-        idx_max_period = None
-        idx_bank = None
-        idx_sar = None
-
-        with open(alert_file, "r") as rf:
-            reader = csv.reader(rf)
-            # Parse header
-            header = next(reader)
-            for i, k in enumerate(header):
-                if k == "count":  # Number of pattern subgraphs
-                    idx_num = i
-                elif k == "type":  # AML typology type (e.g. fan-out and cycle)
-                    idx_type = i
-                elif k == "schedule_id":  # Transaction scheduling type
-                    idx_schedule = i
-                elif k == "min_accounts":  # Minimum number of involved accounts
-                    idx_min_accts = i
-                elif k == "max_accounts":  # Maximum number of involved accounts
-                    idx_max_accts = i
-                elif k == "min_amount":  # Minimum initial transaction amount
-                    idx_min_amt = i
-                elif k == "max_amount":  # Maximum initial transaction amount
-                    idx_max_amt = i
-                elif k == "min_period":  # Minimum overall transaction period (number of simulation steps)
-                    idx_min_period = i
-                elif k == "max_period":  # Maximum overall transaction period (number of simulation steps)
-                    idx_max_period = i
-                elif k == "bank_id":  # Bank ID for internal-bank transactions
-                    idx_bank = i
-                elif k == "is_sar":  # SAR flag
-                    idx_sar = i
-                else:
-                    logger.warning("Unknown column name in %s: %s" % (alert_file, k))
-
-            # Generate transaction set
-            count = 0
-            for row in reader:
-                if len(row) == 0 or row[0].startswith("#"):
-                    continue
-                num_patterns = int(row[idx_num])  # Number of alert patterns
-                typology_name = row[idx_type]
-                schedule = int(row[idx_schedule])
-                min_accts = int(row[idx_min_accts])
-                max_accts = int(row[idx_max_accts])
-                min_amount = parse_float(row[idx_min_amt])
-                max_amount = parse_float(row[idx_max_amt])
-                min_period = parse_int(row[idx_min_period])
-                max_period = parse_int(row[idx_max_period])
-                bank_id = row[idx_bank] if idx_bank is not None else ""  # If empty, it has inter-bank transactions
-                is_sar = parse_flag(row[idx_sar])
-
-                if typology_name not in self.alert_types:
-                    logger.warning("Pattern type name (%s) must be one of %s"
-                                   % (typology_name, str(self.alert_types.keys())))
-                    continue
-
-                for i in range(num_patterns):
-                    num_accts = random.randrange(min_accts, max_accts + 1)
-                    period = random.randrange(min_period, max_period + 1)
-                    self.add_aml_typology(is_sar, typology_name, num_accts, min_amount, max_amount, period, bank_id, schedule)
-                    count += 1
-                    if count % 1000 == 0:
-                        logger.info("Created %d alerts" % count)
-
-    def add_aml_typology(self, is_sar, typology_name, num_accounts, min_amount, max_amount, period, bank_id="", schedule=1):
-        """Add an AML typology transaction set
-        :param is_sar: Whether the alerted transaction set is SAR (True) or false-alert (False)
-        :param typology_name: Name of pattern type
-            ("fan_in", "fan_out", "cycle", "random", "stack", "scatter_gather" or "gather_scatter")
-        :param num_accounts: Number of transaction members (accounts)
-        :param min_amount: Minimum amount of the transaction
-        :param max_amount: Maximum amount of the transaction
-        :param period: Period (number of days) for all transactions
-        :param bank_id: Bank ID which it chooses members from. If empty, it chooses members from all banks.
-        :param schedule: AML pattern transaction schedule model ID
+        count = 0
+        for param in self.param_files.parse(self.alert_file, parse_alert_params):
+            if self.rng_streams is None:
+                rand, np_rand = random, np.random
+            else:
+                rand = self.rng_streams.python_random("alert_patterns", param.row_num)
+                np_rand = self.rng_streams.random_state("alert_patterns", param.row_num)
+            if bank_ids is not None and param.bank_id not in bank_ids:
+                continue
+
+            typology_name = param.type
+            if typology_name not in self.alert_types:
+                logger.warning("Pattern type name (%s) must be one of %s"
+                               % (typology_name, str(self.alert_types.keys())))
+                continue
+
+            if self.batch_typologies and self.typologies[typology_name].batchable:
+                count += self.add_aml_typologies(param.is_sar, typology_name, param.count,
+                                                 param.min_accounts, param.max_accounts,
+                                                 param.min_amount, param.max_amount,
+                                                 param.min_period, param.max_period, param.bank_id, param.schedule,
+                                                 np_rand)
+                logger.info("Created %d alerts" % count)
+                continue
+
+            for i in range(param.count):
+                num_accts = rand.randrange(param.min_accounts, param.max_accounts + 1)
+                period = rand.randrange(param.min_period, param.max_period + 1)
+                self.add_aml_typology(param.is_sar, typology_name, num_accts, param.min_amount, param.max_amount,
+                                      period, param.bank_id, param.schedule, rand)
+                count += 1
+                if count % 1000 == 0:
+                    logger.info("Created %d alerts" % count)
+        self.typologies.log_stats()
+
+    def is_inter_bank_typology(self, bank_id):
+        """Whether an AML typology has inter-bank transactions
+        :param bank_id: Bank ID of the typology. If empty, it chooses members from all banks.
+        :return: True if members are chosen from multiple banks
         """
-
-        def add_node(_acct, _bank_id):
-            """Set an attribute of bank ID to a member account
-            :param _acct: Account ID
-            :param _bank_id: Bank ID
-            """
-            attr_dict = self.g.node[_acct]
-            attr_dict[IS_SAR_KEY] = True
-
-            sub_g.add_node(_acct, attr_dict)
-
-
-        def add_main_acct():
-            """Create a main account ID and a bank ID from hub accounts
-            :return: main account ID and bank ID
-            """
-            self.check_hub_exists()
-            _main_acct = random.sample(self.hubs, 1)[0]
-            _main_bank_id = self.acct_to_bank[_main_acct]
-            self.remove_typology_candidate(_main_acct)
-            add_node(_main_acct, _main_bank_id)
-            return _main_acct, _main_bank_id
-
-        def add_edge(_orig, _bene, _amount, _date):
-            """Add transaction edge to the AML typology subgraph as well as the whole transaction graph
-            :param _orig: Originator account ID
-            :param _bene: Beneficiary account ID
-            :param _amount: Transaction amount
-            :param _date: Transaction timestamp
-            """
-            sub_g.add_edge(_orig, _bene, amount=_amount, date=_date)
-            self.g.add_edge(_orig, _bene)
-            self.add_edge_info(_orig, _bene)
-
-
         if bank_id == "" and len(self.bank_to_accts) >= 2:
-            is_external = True
+            return True
         elif bank_id != "" and bank_id not in self.bank_to_accts:  # Invalid bank ID
             raise KeyError("No such bank ID: %s" % bank_id)
         else:
-            is_external = False
-
-        start_date = random.randrange(0, self.total_steps - period + 1)
-        end_date = start_date + period - 1 # end_date is inclusive
-
-        # Create subgraph structure with transaction attributes
-        model_id = self.alert_types[typology_name]  # alert model ID
-        sub_g = nx.DiGraph(model_id=model_id, reason=typology_name, scheduleID=schedule,
-                           start=start_date, end=end_date)  # Transaction subgraph for a typology
-
+            return False
 
-        if typology_name == "fan_in":  # fan_in pattern (multiple accounts --> single (main) account)
-            main_acct, main_bank_id = add_main_acct()
-            num_neighbors = num_accounts - 1
-            amount = RoundedAmount(min_amount, max_amount).getAmount()
+    def add_aml_typologies(self, is_sar, typology_name, num_patterns, min_accounts, max_accounts,
+                           min_amount, max_amount, min_period, max_period, bank_id="", schedule=1, np_rand=np.random):
+        """Add AML typology transaction sets of an alert parameter row at once.
+        Sizes, periods and start steps are drawn with NumPy for all typologies, members and edges of all typologies
+        are chosen by the plan() method of the typology as arrays, and amounts and dates of all edges are drawn
+        by its emit() method. The alerts and edges are added to the alert store and the graph at once.
+        :param is_sar: Whether the alerted transaction sets are SAR (True) or false-alert (False)
+        :param typology_name: Name of pattern type (its typology must be batchable)
+        :param num_patterns: Number of typologies
+        :param min_accounts: Minimum number of members
+        :param max_accounts: Maximum number of members
+        :param min_amount: Minimum amount of the transaction
+        :param max_amount: Maximum amount of the transaction
+        :param min_period: Minimum period (number of days) for all transactions
+        :param max_period: Maximum period (number of days) for all transactions
+        :param bank_id: Bank ID which it chooses members from. If empty, it chooses members from all banks.
+        :param schedule: AML pattern transaction schedule model ID
+        :param np_rand: np.random.RandomState object or the np.random module
+        :return: Number of added typologies
+        """
+        if num_patterns <= 0:
+            return 0
+        begin = time.time()
+        typology = self.typologies[typology_name]
+        is_external = self.is_inter_bank_typology(bank_id)
+        sizes = np_rand.randint(min_accounts, max_accounts + 1, num_patterns)
+        periods = np_rand.randint(min_period, max_period + 1, num_patterns)
+        starts = np_rand.randint(0, self.total_steps - periods + 1)
+        ends = starts + periods - 1  # inclusive
+
+        # Choose members and edges of all typologies from the candidate pools
+        plan = typology.plan(self, sizes, is_external, np_rand)
+        edge_counts = np.zeros(num_patterns, dtype=np.int64)
+        edge_counts[plan.planned] = plan.edge_counts
+        inst = np.repeat(np.arange(num_patterns), edge_counts)  # Typology index of each edge
+        amounts, dates = typology.emit(self, num_patterns, min_amount, max_amount, starts, ends, inst,
+                                       plan.phases, np_rand)
+
+        # Add the alerts and edges
+        self.accounts.set_sars(plan.members)
+        self.add_alert_groups(typology, schedule, starts[plan.planned], ends[plan.planned], is_sar, plan,
+                              amounts, dates)
+        src = plan.members[plan.src]
+        dst = plan.members[plan.dst]
+        new = self.insert_edges(src, dst)
+        self.add_edges_info(src, dst, new)
+        typology.record(time.time() - begin, len(src), len(plan.planned))
+        return len(plan.planned)
+
+    def reserve_main_acct(self, rand=random):
+        """Choose a main account from hub accounts and remove it from typology member candidates
+        :param rand: random.Random object or the random module
+        :return: Main account ID and bank ID
+        """
+        self.check_hub_exists()
+        main_acct = self.hub_index.choice(rand=rand)
+        main_bank_id = self.acct_to_bank[main_acct]
+        self.remove_typology_candidate(main_acct)
+        return main_acct, main_bank_id
 
-            if is_external:
-                sub_bank_candidates = [b for b, nbs in self.bank_to_accts.items()
-                                       if b != main_bank_id and len(nbs) >= num_neighbors]
-                if not sub_bank_candidates:
-                    logger.warning("No banks with appropriate number of neighboring accounts found.")
-                    return
-                sub_bank_id = random.choice(sub_bank_candidates)
-            else:
-                sub_bank_id = main_bank_id
-            sub_accts = random.sample(self.bank_to_accts[sub_bank_id], num_neighbors)
-            for n in sub_accts:
-                self.remove_typology_candidate(n)
-                add_node(n, sub_bank_id)
-
-            for orig in sub_accts:
-                date = random.randrange(start_date, end_date + 1)
-                add_edge(orig, main_acct, amount, date)
-
-        elif typology_name == "fan_out":  # fan_out pattern (single (main) account --> multiple accounts)
-            main_acct, main_bank_id = add_main_acct()
-            num_neighbors = num_accounts - 1
-            amount = RoundedAmount(min_amount, max_amount).getAmount()
-
-            if is_external:
-                sub_bank_candidates = [b for b, nbs in self.bank_to_accts.items()
-                                       if b != main_bank_id and len(nbs) >= num_neighbors]
-                if not sub_bank_candidates:
-                    logger.warning("No banks with appropriate number of neighboring accounts found.")
-                    return
-                sub_bank_id = random.choice(sub_bank_candidates)
+    def reserve_members(self, bank_id, num, rand=random):
+        """Choose members from a bank and remove them from typology member candidates
+        :param bank_id: Bank ID
+        :param num: Number of members
+        :param rand: random.Random object or the random module
+        :return: Member account list
+        """
+        accts = self.bank_to_accts[bank_id].sample(num, rand)
+        for acct in accts:
+            self.remove_typology_candidate(acct)
+        return accts
+
+    def choose_other_bank(self, main_bank_id, num, rand=random):
+        """Choose a bank with enough member candidates other than the specified one
+        :param main_bank_id: Bank ID to be excluded
+        :param num: Number of members
+        :param rand: random.Random object or the random module
+        :return: Bank ID, or None if not found
+        """
+        bank_id = self.bank_capacity.choice(num, exclude=main_bank_id, rand=rand)
+        if bank_id is None:
+            logger.warning("No banks with appropriate number of neighboring accounts found.")
+        return bank_id
+
+    def reserve_main_accts(self, num, np_rand=np.random):
+        """Choose main accounts of typologies from hub accounts and remove them from typology member candidates
+        :param num: Number of main accounts
+        :param np_rand: np.random.RandomState object or the np.random module
+        :return: Main account ID array and object array of their bank IDs
+        """
+        self.check_hub_exists()
+        main_accts = self.hub_index.take(num, np_rand)
+        self.remove_typology_candidates(main_accts)
+        return main_accts, np.array([self.acct_to_bank[acct] for acct in main_accts.tolist()], dtype=object)
+
+    def reserve_bank_members(self, bank_ids, nums, np_rand=np.random):
+        """Choose members of typologies from their banks and remove them from typology member candidates at once
+        :param bank_ids: Bank ID of each typology
+        :param nums: Number of members of each typology
+        :param np_rand: np.random.RandomState object or the np.random module
+        :return: Member account array (members of each typology are contiguous)
+        """
+        nums = np.asarray(nums, dtype=np.int64)
+        begins = np.cumsum(nums) - nums
+        typologies = defaultdict(list)  # Bank ID -> typology indices
+        for i, bank_id in enumerate(bank_ids):
+            typologies[bank_id].append(i)
+        members = None
+        for bank_id, indices in typologies.items():
+            accts = self.bank_to_accts[bank_id].take(int(nums[indices].sum()), np_rand)
+            if members is None:
+                members = np.empty(int(nums.sum()), dtype=accts.dtype)
+            members[concat_ranges(begins[indices], nums[indices])] = accts
+        if members is None:
+            return np.zeros(0, dtype=np.int64)
+        self.remove_typology_candidates(members)
+        return members
+
+    def choose_other_banks(self, main_bank_ids, nums, np_rand=np.random):
+        """Choose a bank with enough member candidates other than the specified one for each typology at once
+        :param main_bank_ids: Bank ID to be excluded of each typology
+        :param nums: Number of members of each typology
+        :param np_rand: np.random.RandomState object or the np.random module
+        :return: Object array of the bank IDs (None if not found)
+        """
+        bank_ids = self.bank_capacity.choices(nums, main_bank_ids, np_rand)
+        num_missing = sum(bank_id is None for bank_id in bank_ids)
+        if num_missing > 0:
+            logger.warning("No banks with appropriate number of neighboring accounts found for %d typologies."
+                           % num_missing)
+        return bank_ids
+
+    def choose_three_bank_arrays(self, is_external, num, np_rand=np.random):
+        """Choose banks of originator, intermediate and beneficiary accounts of typologies at once
+        :param is_external: Whether members are chosen from multiple banks
+        :param num: Number of typologies
+        :param np_rand: np.random.RandomState object or the np.random module
+        :return: Originator, intermediate and beneficiary bank ID arrays
+        """
+        if is_external:
+            if len(self.bank_capacity) >= 3:
+                orig_bank_ids, mid_bank_ids, bene_bank_ids = self.bank_capacity.samples(3, num, np_rand).T
             else:
-                sub_bank_id = main_bank_id
-            sub_accts = random.sample(self.bank_to_accts[sub_bank_id], num_neighbors)
-            for n in sub_accts:
-                self.remove_typology_candidate(n)
-                add_node(n, sub_bank_id)
-
-            for bene in sub_accts:
-                date = random.randrange(start_date, end_date + 1)
-                add_edge(main_acct, bene, amount, date)
-
-        elif typology_name == "bipartite":  # bipartite (originators -> many-to-many -> beneficiaries)
-            orig_bank_id = random.choice(self.get_all_bank_ids())
-            if is_external:
-                bene_bank_id = random.choice([b for b in self.get_all_bank_ids() if b != orig_bank_id])
+                orig_bank_ids, mid_bank_ids = self.bank_capacity.samples(2, num, np_rand).T
+                bene_bank_ids = orig_bank_ids
+        else:
+            orig_bank_ids = mid_bank_ids = bene_bank_ids = self.bank_capacity.samples(1, num, np_rand)[:, 0]
+        return orig_bank_ids, mid_bank_ids, bene_bank_ids
+
+    def choose_three_banks(self, is_external, rand=random):
+        """Choose banks of originator, intermediate and beneficiary accounts
+        :param is_external: Whether members are chosen from multiple banks
+        :param rand: random.Random object or the random module
+        :return: Originator, intermediate and beneficiary bank IDs
+        """
+        if is_external:
+            if len(self.bank_capacity) >= 3:
+                [orig_bank_id, mid_bank_id, bene_bank_id] = self.bank_capacity.sample(3, rand)
             else:
+                [orig_bank_id, mid_bank_id] = self.bank_capacity.sample(2, rand)
                 bene_bank_id = orig_bank_id
+        else:
+            orig_bank_id = mid_bank_id = bene_bank_id = self.bank_capacity.sample(1, rand)[0]
+        return orig_bank_id, mid_bank_id, bene_bank_id
 
-            num_orig_accts = num_accounts // 2  # The former half members are originator accounts
-            num_bene_accts = num_accounts - num_orig_accts  # The latter half members are beneficiary accounts
-
-            orig_accts = random.sample(self.bank_to_accts[orig_bank_id], num_orig_accts)
-            for n in orig_accts:
-                self.remove_typology_candidate(n)
-                add_node(n, orig_bank_id)
-            main_acct = orig_accts[0]
-
-            bene_accts = random.sample(self.bank_to_accts[bene_bank_id], num_bene_accts)
-            for n in bene_accts:
-                self.remove_typology_candidate(n)
-                add_node(n, bene_bank_id)
-
-            for orig, bene in itertools.product(orig_accts, bene_accts):  # All-to-all transaction edges
-                amount = RandomAmount(min_amount, max_amount).getAmount()
-                date = random.randrange(start_date, end_date + 1)
-                add_edge(orig, bene, amount, date)
-
-        elif typology_name == "stack":  # stacked bipartite layers
-            if is_external:
-                if len(self.get_all_bank_ids()) >= 3:
-                    [orig_bank_id, mid_bank_id, bene_bank_id] = random.sample(self.get_all_bank_ids(), 3)
-                else:
-                    [orig_bank_id, mid_bank_id] = random.sample(self.get_all_bank_ids(), 2)
-                    bene_bank_id = orig_bank_id
-            else:
-                orig_bank_id = mid_bank_id = bene_bank_id = random.sample(self.get_all_bank_ids(), 1)[0]
-
-            # First and second 1/3 of members: originator and intermediate accounts
-            num_orig_accts = num_mid_accts = num_accounts // 3
-            # Last 1/3 of members: beneficiary accounts
-            num_bene_accts = num_accounts - num_orig_accts * 2
-
-            orig_accts = random.sample(self.bank_to_accts[orig_bank_id], num_orig_accts)
-            for n in orig_accts:
-                self.remove_typology_candidate(n)
-                add_node(n, orig_bank_id)
-            main_acct = orig_accts[0]
-
-            mid_accts = random.sample(self.bank_to_accts[mid_bank_id], num_mid_accts)
-            for n in mid_accts:
-                self.remove_typology_candidate(n)
-                add_node(n, mid_bank_id)
-            bene_accts = random.sample(self.bank_to_accts[bene_bank_id], num_bene_accts)
-            for n in bene_accts:
-                self.remove_typology_candidate(n)
-                add_node(n, bene_bank_id)
-
-            for orig, bene in itertools.product(orig_accts, mid_accts):  # all-to-all transactions
-                amount = RandomAmount(min_amount, max_amount).getAmount()
-                date = random.randrange(start_date, end_date + 1)
-                add_edge(orig, bene, amount, date)
-
-            for orig, bene in itertools.product(mid_accts, bene_accts):  # all-to-all transactions
-                amount = RandomAmount(min_amount, max_amount).getAmount()
-                date = random.randrange(start_date, end_date + 1)
-                add_edge(orig, bene, amount, date)
-
-        elif typology_name == "random":  # Random transactions among members
-            amount = RandomAmount(min_amount, max_amount).getAmount()
-            date = random.randrange(start_date, end_date + 1)
-
-            if is_external:
-                all_bank_ids = self.get_all_bank_ids()
-                bank_id_iter = itertools.cycle(all_bank_ids)
-                prev_acct = None
-                main_acct = None
-                for _ in range(num_accounts):
-                    bank_id = next(bank_id_iter)
-                    next_acct = random.sample(self.bank_to_accts[bank_id], 1)[0]
-                    if prev_acct is None:
-                        main_acct = next_acct
-                    else:
-                        add_edge(prev_acct, next_acct, amount, date)
-                    self.remove_typology_candidate(next_acct)
-                    add_node(next_acct, bank_id)
-                    prev_acct = next_acct
-
-            else:
-                main_acct, main_bank_id = add_main_acct()
-                sub_accts = random.sample(self.bank_to_accts[main_bank_id], num_accounts - 1)
-                for n in sub_accts:
-                    self.remove_typology_candidate(n)
-                    add_node(n, main_bank_id)
-                prev_acct = main_acct
-                for _ in range(num_accounts - 1):
-                    next_acct = random.choice([n for n in sub_accts if n != prev_acct])
-                    add_edge(prev_acct, next_acct, amount, date)
-                    prev_acct = next_acct
-
-        elif typology_name == "cycle":  # Cycle transactions
-            amount = RandomAmount(min_amount, max_amount).getAmount()
-            dates = sorted([random.randrange(start_date, end_date + 1) for _ in range(num_accounts)])
-
-            if is_external:
-                all_accts = list()
-                all_bank_ids = self.get_all_bank_ids()
-                remain_num = num_accounts
-
-                while all_bank_ids:
-                    num_accts_per_bank = remain_num // len(all_bank_ids)
-                    bank_id = all_bank_ids.pop()
-                    new_members = random.sample(self.bank_to_accts[bank_id], num_accts_per_bank)
-                    all_accts.extend(new_members)
-
-                    remain_num -= len(new_members)
-                    for n in new_members:
-                        self.remove_typology_candidate(n)
-                        add_node(n, bank_id)
-                main_acct = all_accts[0]
-            else:
-                main_acct, main_bank_id = add_main_acct()
-                sub_accts = random.sample(self.bank_to_accts[main_bank_id], num_accounts - 1)
-                for n in sub_accts:
-                    self.remove_typology_candidate(n)
-                    add_node(n, main_bank_id)
-                all_accts = [main_acct] + sub_accts
-
-            for i in range(num_accounts):
-                orig_i = i
-                bene_i = (i + 1) % num_accounts
-                orig_acct = all_accts[orig_i]
-                bene_acct = all_accts[bene_i]
-                date = dates[i]
-
-                add_edge(orig_acct, bene_acct, amount, date)
-                margin = amount * self.margin_ratio  # Margin the beneficiary account can gain
-                amount = amount - margin  # max(amount - margin, min_amount)
-
-        elif typology_name == "scatter_gather":  # Scatter-Gather (fan-out -> fan-in)
-            if is_external:
-                if len(self.get_all_bank_ids()) >= 3:
-                    [orig_bank_id, mid_bank_id, bene_bank_id] = random.sample(self.get_all_bank_ids(), 3)
-                else:
-                    [orig_bank_id, mid_bank_id] = random.sample(self.get_all_bank_ids(), 2)
-                    bene_bank_id = orig_bank_id
-            else:
-                orig_bank_id = mid_bank_id = bene_bank_id = random.sample(self.get_all_bank_ids(), 1)[0]
-
-            main_acct = orig_acct = random.sample(self.bank_to_accts[orig_bank_id], 1)[0]
-            self.remove_typology_candidate(orig_acct)
-            add_node(orig_acct, orig_bank_id)
-            mid_accts = random.sample(self.bank_to_accts[mid_bank_id], num_accounts - 2)
-            for n in mid_accts:
-                self.remove_typology_candidate(n)
-                add_node(n, mid_bank_id)
-            bene_acct = random.sample(self.bank_to_accts[bene_bank_id], 1)[0]
-            self.remove_typology_candidate(bene_acct)
-            add_node(bene_acct, bene_bank_id)
-
-            # The date of all scatter transactions must be performed before middle day
-            mid_date = (start_date + end_date) // 2
-
-            for i in range(len(mid_accts)):
-                mid_acct = mid_accts[i]
-                scatter_amount = RandomAmount(min_amount, max_amount).getAmount()
-                margin = scatter_amount * self.margin_ratio  # Margin of the intermediate account
-                amount = scatter_amount - margin
-                scatter_date = random.randrange(start_date, mid_date)
-                gather_date = random.randrange(mid_date, end_date + 1)
-
-                add_edge(orig_acct, mid_acct, scatter_amount, scatter_date)
-                add_edge(mid_acct, bene_acct, amount, gather_date)
-
-        elif typology_name == "gather_scatter":  # Gather-Scatter (fan-in -> fan-out)
-            if is_external:
-                if len(self.get_all_bank_ids()) >= 3:
-                    [orig_bank_id, mid_bank_id, bene_bank_id] = random.sample(self.get_all_bank_ids(), 3)
-                else:
-                    [orig_bank_id, mid_bank_id] = random.sample(self.get_all_bank_ids(), 2)
-                    bene_bank_id = orig_bank_id
-            else:
-                orig_bank_id = mid_bank_id = bene_bank_id = random.sample(self.get_all_bank_ids(), 1)[0]
-
-            num_orig_accts = num_bene_accts = (num_accounts - 1) // 2
-
-            orig_accts = random.sample(self.bank_to_accts[orig_bank_id], num_orig_accts)
-            for n in orig_accts:
-                self.remove_typology_candidate(n)
-                add_node(n, orig_bank_id)
-            main_acct = mid_acct = random.sample(self.bank_to_accts[mid_bank_id], 1)[0]
-            self.remove_typology_candidate(mid_acct)
-            add_node(mid_acct, mid_bank_id)
-            bene_accts = random.sample(self.bank_to_accts[bene_bank_id], num_bene_accts)
-            for n in bene_accts:
-                self.remove_typology_candidate(n)
-                add_node(n, bene_bank_id)
-
-            accumulated_amount = 0.0
-            mid_date = (start_date + end_date) // 2
-            amount = RandomAmount(min_amount, max_amount).getAmount()
-
-            for i in range(num_orig_accts):
-                orig_acct = orig_accts[i]
-                date = random.randrange(start_date, mid_date)
-                add_edge(orig_acct, mid_acct, amount, date)
-                accumulated_amount += amount
-                # print(orig_acct, "->", date, "->", mid_acct)
-
-            for i in range(num_bene_accts):
-                bene_acct = bene_accts[i]
-                date = random.randrange(mid_date, end_date + 1)
-                add_edge(mid_acct, bene_acct, amount, date)
-                # print(mid_acct, "->", date, "->", bene_acct)
-            # print(orig_accts, mid_acct, bene_accts)
-        elif typology_name == "fragmented_deposit":
-            # Seleciona a conta principal (alvo dos depósitos)
-            main_acct, main_bank_id = add_main_acct()
-            add_node(main_acct, main_bank_id)
-
-            # Fragmenta o valor total em vários depósitos menores
-            total_amount = RoundedAmount(min_amount, max_amount).getAmount()
-            num_deposits = random.randint(3, 7)  # Número de depósitos fragmentados
-
-            # Gera valores aleatórios que somam o total_amount
-            deposit_amounts = []
-            remaining = total_amount
-            for i in range(num_deposits - 1):
-                amt = random.uniform(remaining * 0.1, remaining * 0.5)
-                deposit_amounts.append(amt)
-                remaining -= amt
-            deposit_amounts.append(remaining)  # O último depósito recebe o restante
-
-            # Distribui os depósitos ao longo do período
-            if num_deposits > (end_date - start_date + 1):
-                # Todos os depósitos no mesmo dia
-                deposit_steps = [start_date] * num_deposits
-            else:
-                deposit_steps = sorted(random.sample(range(start_date, end_date + 1), num_deposits))
-
-            for amt, step in zip(deposit_amounts, deposit_steps):
-                # Adiciona uma aresta fictícia de um nó externo (ex: -1) para a conta principal
-                add_edge(-1, main_acct, amt, step)
-        elif typology_name == "fragmented_withdrawal":
-            # Seleciona a conta principal (origem dos saques)
-            main_acct, main_bank_id = add_main_acct()
-            add_node(main_acct, main_bank_id)
-
-            # Fragmenta o valor total em vários saques menores
-            total_amount = RoundedAmount(min_amount, max_amount).getAmount()
-            num_withdrawals = random.randint(3, 7)  # Número de saques fragmentados
-
-            # Gera valores aleatórios que somam o total_amount
-            withdrawal_amounts = []
-            remaining = total_amount
-            for i in range(num_withdrawals - 1):
-                amt = random.uniform(remaining * 0.1, remaining * 0.5)
-                withdrawal_amounts.append(amt)
-                remaining -= amt
-            withdrawal_amounts.append(remaining)  # O último saque recebe o restante
-
-            # Distribui os saques ao longo do período
-            if num_withdrawals > (end_date - start_date + 1):
-                # Todos os saques no mesmo dia
-                withdrawal_steps = [start_date] * num_withdrawals
-            else:
-                withdrawal_steps = sorted(random.sample(range(start_date, end_date + 1), num_withdrawals))
-
-            for amt, step in zip(withdrawal_amounts, withdrawal_steps):
-                # Adiciona uma aresta fictícia da conta principal para um nó externo (ex: -1)
-                add_edge(main_acct, -1, amt, step)
-
-        # TODO: Please add user-defined typology implementations here
+    def add_typology_node(self, sub_g, acct):
+        """Add a member account to an AML typology alert and set the SAR flag of the account
+        :param sub_g: PendingAlert object of the typology
+        :param acct: Account ID
+        """
+        self.accounts.set_sar(acct)
+        sub_g.add_member(acct)
 
-        else:
+    def add_typology_edge(self, sub_g, orig, bene, amount, date):
+        """Add transaction edge to the AML typology alert as well as the whole transaction graph
+        :param sub_g: PendingAlert object of the typology
+        :param orig: Originator account ID
+        :param bene: Beneficiary account ID
+        :param amount: Transaction amount
+        :param date: Transaction timestamp
+        """
+        self.add_alert_edge(sub_g, orig, bene, amount, date)
+        is_new = not self.g.has_edge(orig, bene)
+        if is_new:
+            self.g.add_edge(orig, bene)
+        self.add_edge_info(orig, bene, is_new)
+
+    def add_alert_edge(self, sub_g, orig, bene, amount, date):
+        """Add transaction edge to the AML typology alert (the amount ranges of the members are updated)
+        :param sub_g: PendingAlert object of the typology
+        :param orig: Originator account ID
+        :param bene: Beneficiary account ID
+        :param amount: Transaction amount
+        :param date: Transaction timestamp
+        """
+        sub_g.add_edge(orig, bene, amount, date)
+
+    def add_alert_group(self, sub_g, main_acct, is_sar):
+        """Register an AML typology as an alert
+        :param sub_g: PendingAlert object of the typology
+        :param main_acct: Main account ID
+        :param is_sar: SAR flag
+        :return: Alert ID
+        """
+        alert_id = self.num_spilled_alerts + self.alert_groups.add(sub_g, main_acct, is_sar)
+        if self.memory_budget is not None and len(self.alert_groups) % SPILL_CHECK_INTERVAL == 0:
+            self.check_memory_budget()
+        return alert_id
+
+    def add_alert_groups(self, typology, schedule, starts, ends, is_sar, plan, amounts, dates):
+        """Register planned AML typologies as alerts at once
+        :param typology: Typology object
+        :param schedule: Transaction schedule model ID
+        :param starts: Start step of each planned typology
+        :param ends: End step (inclusive) of each planned typology
+        :param is_sar: SAR flag
+        :param plan: TypologyPlan object
+        :param amounts: Amount of each planned edge
+        :param dates: Date of each planned edge
+        :return: Alert IDs
+        """
+        num_alerts = len(self.alert_groups)
+        alert_ids = self.alert_groups.add_alerts(typology.model_id, typology.name, schedule, starts, ends, is_sar,
+                                                 plan.members, plan.member_counts, plan.mains, plan.src, plan.dst,
+                                                 amounts, dates, plan.edge_counts)
+        alert_ids = range(self.num_spilled_alerts + alert_ids.start, self.num_spilled_alerts + alert_ids.stop)
+        if self.memory_budget is not None \
+                and len(self.alert_groups) // SPILL_CHECK_INTERVAL > num_alerts // SPILL_CHECK_INTERVAL:
+            self.check_memory_budget()
+        return alert_ids
+
+    def add_aml_typology(self, is_sar, typology_name, num_accounts, min_amount, max_amount, period, bank_id="", schedule=1,
+                         rand=random):
+        """Add an AML typology transaction set
+        :param is_sar: Whether the alerted transaction set is SAR (True) or false-alert (False)
+        :param typology_name: Name of pattern type registered in self.typologies
+            (e.g. "fan_in", "fan_out", "cycle", "random", "stack", "scatter_gather" or "gather_scatter")
+        :param num_accounts: Number of transaction members (accounts)
+        :param min_amount: Minimum amount of the transaction
+        :param max_amount: Maximum amount of the transaction
+        :param period: Period (number of days) for all transactions
+        :param bank_id: Bank ID which it chooses members from. If empty, it chooses members from all banks.
+        :param schedule: AML pattern transaction schedule model ID
+        :param rand: random.Random object or the random module
+        """
+        if typology_name not in self.typologies:
             logger.warning("Unknown AML typology name: %s" % typology_name)
             return
+        begin = time.time()
+        edge_id = self.edge_id
+        typology = self.typologies[typology_name]
+        is_external = self.is_inter_bank_typology(bank_id)
+
+        start_date = rand.randrange(0, self.total_steps - period + 1)
+        end_date = start_date + period - 1 # end_date is inclusive
 
-        # Add the generated transaction edges to whole transaction graph
-        sub_g.graph[MAIN_ACCT_KEY] = main_acct  # Main account ID
-        sub_g.graph[IS_SAR_KEY] = is_sar  # SAR flag
-        self.alert_groups[self.alert_id] = sub_g
-        self.alert_id += 1
+        # Create alert record with transaction attributes
+        sub_g = PendingAlert(typology.model_id, typology_name, schedule, start_date, end_date)
+        main_acct = typology.generate(self, sub_g, num_accounts, min_amount, max_amount,
+                                      start_date, end_date, is_external, rand)
+        if main_acct is not None:
+            self.add_alert_group(sub_g, main_acct, is_sar)
+        typology.record(time.time() - begin, self.edge_id - edge_id)
 
     def write_account_list(self):
         os.makedirs(self.output_dir, exist_ok=True)
         acct_file = os.path.join(self.output_dir, self.out_account_file)
-        with open(acct_file, "w") as wf:
-            writer = csv.writer(wf)
-            base_attrs = ["ACCOUNT_ID", "CUSTOMER_ID", "INIT_BALANCE", "COUNTRY",
-                          "ACCOUNT_TYPE", "IS_SAR", "BANK_ID"]
-            writer.writerow(base_attrs + self.attr_names)
-            for n in self.g.nodes(data=True):
-                aid = n[0]  # Account ID
-                cid = "C_" + str(aid)  # Customer ID bounded to this account
-                prop = n[1]  # Account attributes
-                if "init_balance" not in prop:
-                    continue
-                balance = "{0:.2f}".format(prop["init_balance"])  # Initial balance
-                country = prop["country"]  # Country
-                business = prop["business"]  # Business type
-                is_sar = "true" if prop[IS_SAR_KEY] else "false"  # Whether this account is involved in SAR
-                bank_id = prop["bank_id"]  # Bank ID
-                values = [aid, cid, balance, country, business, is_sar, bank_id]
+        base_attrs = ["ACCOUNT_ID", "CUSTOMER_ID", "INIT_BALANCE", "COUNTRY",
+                      "ACCOUNT_TYPE", "IS_SAR", "BANK_ID"]
+        accts = self.accounts
+        num = len(accts)
+        acct_ids = accts.acct_ids()
+        with ChunkedCSVWriter(acct_file, base_attrs + self.attr_names) as writer:
+            for begin in range(0, num, self.chunk_size):
+                end = min(begin + self.chunk_size, num)
+                aids = format_column(acct_ids[begin:end])
+                columns = [
+                    aids,
+                    ["C_" + aid for aid in aids],  # Customer ID bounded to this account
+                    format_column(accts.init_balance[begin:end], "%.2f"),  # Initial balances
+                    format_column(accts.countries.decode(accts.country_code[begin:end])),  # Countries
+                    format_column(accts.businesses.decode(accts.business_code[begin:end])),  # Business types
+                    np.where(accts.is_sar[begin:end], "true", "false").tolist(),  # Whether this account is SAR
+                    format_column(accts.banks.decode(accts.bank_code[begin:end])),  # Bank IDs
+                ]
                 for attr_name in self.attr_names:
-                    values.append(prop[attr_name])
-                writer.writerow(values)
-        logger.info("Exported %d accounts to %s" % (self.g.number_of_nodes(), acct_file))
+                    columns.append(format_column(accts.attrs[attr_name][begin:end]))
+                writer.write_columns(columns)
+        logger.info("Exported %d accounts to %s" % (len(self.accounts), acct_file))
+
+    def tx_type_drawer(self):
+        """
+        :return: Function drawing transaction types of a number of edges
+        """
+        tx_types = self.tx_types
+        if self.tx_type_sampler == "alias":
+            sampler = AliasSampler(self.tx_type_weights)
+            rng = self.rng_streams.numpy_random("tx_types") if self.rng_streams is not None else None
+            return lambda num: [tx_types[i] for i in sampler.draw(num, rng).tolist()]
+        sampler = CumulativeSampler(self.tx_type_weights)
+        rand = self.rng_streams.python_random("tx_types") if self.rng_streams is not None else random
+        return lambda num: [tx_types[sampler.draw_one(rand)] for _ in range(num)]
+
+    def transaction_columns(self, src, dst, edge_ids, types):
+        """Format active transactions of a chunk of edges (call mark_active_edges before)
+        :param src: Originator account ID array
+        :param dst: Beneficiary account ID array
+        :param edge_ids: Edge ID array
+        :param types: Transaction types of the edges
+        :return: Formatted columns of the transaction CSV file
+        """
+        active = self.active_edges[edge_ids]
+        rows = np.flatnonzero(active).tolist()
+        return [
+            format_column(edge_ids[active]),
+            format_column(src[active]),
+            format_column(dst[active]),
+            format_column([types[i] for i in rows]),
+        ]
 
     def write_transaction_list(self):
+        """Export active transactions. Transaction types are drawn for all edges (including inactive ones)
+        chunk by chunk, in the same order of random numbers as one draw per edge.
+        """
         tx_file = os.path.join(self.output_dir, self.out_tx_file)
-        with open(tx_file, "w") as wf:
-            writer = csv.writer(wf)
-            writer.writerow(["id", "src", "dst", "ttype"])
-            for e in self.g.edges(data=True):
-                src = e[0]
-                dst = e[1]
-                attr = e[2]
-                tid = attr['edge_id']
-                tx_type = random.choice(self.tx_types)
-                if attr['active']:
-                    writer.writerow([tid, src, dst, tx_type])
+        if self.transaction_runs is not None and len(self.transaction_runs) > 0:  # Spilled at mark_active_edges
+            with ChunkedCSVWriter(tx_file, ["id", "src", "dst", "ttype"]) as writer:
+                writer.write_lines(self.transaction_runs.merge(), self.chunk_size)
+            logger.info("Exported %d transactions to %s" % (self.num_spilled_edges, tx_file))
+            return
+        draw_tx_types = self.tx_type_drawer()
+        with ChunkedCSVWriter(tx_file, ["id", "src", "dst", "ttype"]) as writer:
+            for src, dst, edge_ids in self.iter_edge_chunks():
+                types = draw_tx_types(len(edge_ids))
+                writer.write_columns(self.transaction_columns(src, dst, edge_ids, types))
         logger.info("Exported %d transactions to %s" % (self.g.number_of_edges(), tx_file))
 
-    def write_alert_account_list(self):
-        def get_out_edge_attrs(g, vid, name):
-            return [v for k, v in nx.get_edge_attributes(g, name).items() if (k[0] == vid or k[1] == vid)]
+    def alert_member_columns(self, alerts, first_id=0):
+        """Format rows of alert members chunk by chunk
+        :param alerts: AlertStore object
+        :param first_id: Alert ID of the first alert of the store
+        :return: Generator of alert ID arrays and formatted columns of the alert member CSV file
+        """
+        num = len(alerts.members)
+        sizes = np.diff(np.frombuffer(alerts.member_offsets, dtype=np.int64))
+        rows = alerts.rows[:len(alerts)]
+        member_alert_ids = np.repeat(np.arange(len(alerts)), sizes)  # Alert record of each member
+        for begin in range(0, num, self.chunk_size):
+            end = min(begin + self.chunk_size, num)
+            alert_ids = member_alert_ids[begin:end]
+            member_rows = rows[alert_ids]
+            accts = alerts.members[begin:end]
+            is_main = member_rows["main"] == np.arange(begin, end)
+            columns = [
+                format_column(alert_ids + first_id),
+                format_column(alerts.reasons.decode(member_rows["reason"])),
+                format_column(accts),
+                np.where(is_main, "true", "false").tolist(),
+                np.where(member_rows["is_sar"], "true", "false").tolist(),
+                format_column(member_rows["model_id"]),
+                format_column(np.frombuffer(alerts.min_amounts, dtype=np.float64)[begin:end], "%.2f"),
+                format_column(np.frombuffer(alerts.max_amounts, dtype=np.float64)[begin:end], "%.2f"),
+                format_column(member_rows["start"]),
+                format_column(member_rows["end"]),
+                format_column(member_rows["schedule"]),
+                format_column([self.accounts.bank_id(acct) for acct in accts]),
+            ]
+            for attr_name in self.attr_names:
+                columns.append(format_column([self.accounts.attr(acct, attr_name) for acct in accts]))
+            yield alert_ids + first_id, columns
+
+    def alert_member_records(self, alerts, first_id=0):
+        """
+        :return: Generator of (alert ID, formatted line) of alert members for run files
+        """
+        for alert_ids, columns in self.alert_member_columns(alerts, first_id):
+            yield from zip(alert_ids.tolist(), format_lines(columns))
 
-        acct_count = 0
+    def write_alert_account_list(self):
         alert_member_file = os.path.join(self.output_dir, self.out_alert_member_file)
         logger.info("Output alert member list to: " + alert_member_file)
-        with open(alert_member_file, "w") as wf:
-            writer = csv.writer(wf)
-            base_attrs = ["alertID", "reason", "accountID", "isMain", "isSAR", "modelID",
-                          "minAmount", "maxAmount", "startStep", "endStep", "scheduleID", "bankID"]
-            writer.writerow(base_attrs + self.attr_names)
-            for gid, sub_g in self.alert_groups.items():
-                main_id = sub_g.graph[MAIN_ACCT_KEY]
-                model_id = sub_g.graph["model_id"]
-                schedule_id = sub_g.graph["scheduleID"]
-                reason = sub_g.graph["reason"]
-                start = sub_g.graph["start"]
-                end = sub_g.graph["end"]
-                for n in sub_g.nodes():
-                    if "bank_id" not in sub_g.node[n]:
-                        continue
-                    is_main = "true" if n == main_id else "false"
-                    is_sar = "true" if sub_g.graph[IS_SAR_KEY] else "false"
-                    min_amt = '{:.2f}'.format(min(get_out_edge_attrs(sub_g, n, "amount")))
-                    max_amt = '{:.2f}'.format(max(get_out_edge_attrs(sub_g, n, "amount")))
-                    min_step = start
-                    max_step = end
-                    bank_id = sub_g.node[n]["bank_id"]
-                    values = [gid, reason, n, is_main, is_sar, model_id, min_amt, max_amt,
-                              min_step, max_step, schedule_id, bank_id]
-                    prop = self.g.node[n]
-                    for attr_name in self.attr_names:
-                        values.append(prop[attr_name])
-                    writer.writerow(values)
-                    acct_count += 1
+        base_attrs = ["alertID", "reason", "accountID", "isMain", "isSAR", "modelID",
+                      "minAmount", "maxAmount", "startStep", "endStep", "scheduleID", "bankID"]
+        alerts = self.alert_groups
+        with ChunkedCSVWriter(alert_member_file, base_attrs + self.attr_names) as writer:
+            if self.alert_runs is not None and len(self.alert_runs) > 0:
+                writer.write_lines(self.alert_runs.merge(self.alert_member_records(alerts, self.num_spilled_alerts)),
+                                   self.chunk_size)
+            else:
+                for _, columns in self.alert_member_columns(alerts):
+                    writer.write_columns(columns)
+            acct_count = writer.num_rows
 
         logger.info("Exported %d members for %d AML typologies to %s" %
-                    (acct_count, len(self.alert_groups), alert_member_file))
+                    (acct_count, self.num_spilled_alerts + len(alerts), alert_member_file))
+
+    def normal_model_columns(self, normal_models):
+        """Format rows of normal models chunk by chunk
+        :param normal_models: List of NormalModel objects
+        :return: Generator of model ID lists and formatted columns of the normal model CSV file
+        """
+        columns = [list() for _ in range(4)]
+        for normal_model in normal_models:
+            account_ids = list(normal_model.node_ids)
+            num = len(account_ids)
+            columns[0].extend([normal_model.id] * num)
+            columns[1].extend([normal_model.type] * num)
+            columns[2].extend(account_ids)
+            columns[3].extend([normal_model.is_main(account_id) for account_id in account_ids])
+            if len(columns[0]) >= self.chunk_size:
+                yield columns[0], self.format_normal_model_columns(columns)
+                columns = [list() for _ in range(4)]
+        yield columns[0], self.format_normal_model_columns(columns)
+
+    def normal_model_records(self, normal_models):
+        """
+        :return: Generator of (model ID, formatted line) of normal models for run files
+        """
+        for model_ids, columns in self.normal_model_columns(normal_models):
+            yield from zip(model_ids, format_lines(columns))
 
     def write_normal_models(self):
         output_file = os.path.join(self.output_dir, self.out_normal_models_file)
-        with open(output_file, "w") as wf:
-            writer = csv.writer(wf)
-            column_headers = ["modelID", "type", "accountID", "isMain", "isSAR", "scheduleID"]
-            writer.writerow(column_headers)
-            
-            for normal_model in self.normal_models:
-                for account_id in normal_model.node_ids:
-                    values = [normal_model.id, normal_model.type, account_id, normal_model.is_main(account_id), False, 2]
-                    writer.writerow(values)
+        column_headers = ["modelID", "type", "accountID", "isMain", "isSAR", "scheduleID"]
+        with ChunkedCSVWriter(output_file, column_headers) as writer:
+            if self.normal_model_runs is not None and len(self.normal_model_runs) > 0:
+                writer.write_lines(self.normal_model_runs.merge(self.normal_model_records(self.normal_models)),
+                                   self.chunk_size)
+            else:
+                for _, columns in self.normal_model_columns(self.normal_models):
+                    writer.write_columns(columns)
+
+    @staticmethod
+    def format_normal_model_columns(columns):
+        num = len(columns[0])
+        return [format_column(columns[0]), format_column(columns[1]), format_column(columns[2]),
+                format_column(columns[3]), ["False"] * num, ["2"] * num]
 
+    def export(self):
+        """Export accounts, transactions, alert members and normal models to the CSV files
+        """
+        self.write_account_list()  # Export accounts to a CSV file
+        self.write_transaction_list()  # Export transactions to a CSV file
+        self.write_alert_account_list()  # Export alert accounts to a CSV file
+        self.write_normal_models()
+        self.remove_spill_files()
 
-    def count__patterns(self, threshold=2):
+    def count_fan_in_out_patterns(self, threshold=2):
         """Count the number of fan-in and fan-out patterns in the generated transaction graph
         """
         in_deg = Counter(self.g.in_degree().values())  # in-degree, count
@@ -1359,8 +2249,7 @@ class TransactionGenerator:
 
         main_in_deg = Counter()
         main_out_deg = Counter()
-        for sub_g in self.alert_groups.values():
-            main_acct = sub_g.graph[MAIN_ACCT_KEY]
+        for main_acct in self.alert_groups.main_accts():
             main_in_deg[self.g.in_degree(main_acct)] += 1
             main_out_deg[self.g.out_degree(main_acct)] += 1
         for th in range(2, threshold + 1):
@@ -1371,42 +2260,100 @@ class TransactionGenerator:
 
 
 if __name__ == "__main__":
-    argv = sys.argv
-    argc = len(argv)
-    if argc < 2:
-        print("Usage: python3 %s [ConfJSON]" % argv[0])
-        exit(1)
-
-    _conf_file = argv[1]
-    _sim_name = argv[2] if argc >= 3 else None
-
-
+    parser = argparse.ArgumentParser(description="Generate the transaction graph and AML typologies of AMLSim.")
+    parser.add_argument("conf_json", help="Configuration JSON file")
+    parser.add_argument("sim_name", nargs="?", default=None, help="Simulation name (overrides the configuration)")
+    parser.add_argument("extra", nargs="*", help=argparse.SUPPRESS)  # Ignored (e.g. edge ratio of batch scripts)
+    parser.add_argument("--checkpoint-dir", default=None,
+                        help="Save a snapshot after each stage to this directory")
+    parser.add_argument("--resume-from", default=None, choices=[name for name, _ in STAGES],
+                        help="Load the snapshot saved after this stage and run the following stages")
+    parser.add_argument("--max-memory", default=None, type=parse_memory_size,
+                        help="Memory budget (e.g. 16G) to spill finished normal models, alerts and transactions "
+                             "to run files")
+    parser.add_argument("--spill-dir", default=None,
+                        help="Directory of the run files (default: spill in the output directory)")
+    parser.add_argument("--seeds", default=None, type=parse_seeds,
+                        help="Comma-separated random seeds generated in a batch (outputs to <simulation name>_<seed>)")
+    parser.add_argument("--num-seeds", default=None, type=int,
+                        help="Generate this number of consecutive random seeds from the configured one in a batch")
+    parser.add_argument("--batch-workers", default=1, type=int,
+                        help="Number of worker processes of the batch generation")
+    args = parser.parse_args()
 
     # Validation option for graph contractions
     deg_param = os.getenv("DEGREE")
     degree_threshold = 0 if deg_param is None else int(deg_param)
 
-    with open(_conf_file, "r") as rf:
+    with open(args.conf_json, "r") as rf:
         conf = json.load(rf)
 
-    txg = TransactionGenerator(conf, _sim_name)
-    txg.set_num_accounts()
-    txg.generate_normal_transactions()  # Load a parameter CSV file for the base transaction types
-    txg.load_account_list()  # Load account list CSV file
-    if degree_threshold > 0:
-        logger.info("Generated normal transaction network")
-        txg.count_fan_in_out_patterns(degree_threshold)
-    txg.load_normal_models() # Load a parameter CSV file for Normal Models
-    #cProfile.run('txg.build_normal_models()')
-    txg.build_normal_models()
-    txg.set_main_acct_candidates()
-    txg.load_alert_patterns()  # Load a parameter CSV file for AML typology subgraphs
-    txg.mark_active_edges()
-
-    if degree_threshold > 0:
-        logger.info("Added alert transaction patterns")
-        txg.count_fan_in_out_patterns(degree_threshold)
-    txg.write_account_list()  # Export accounts to a CSV file
-    txg.write_transaction_list()  # Export transactions to a CSV file
-    txg.write_alert_account_list()  # Export alert accounts to a CSV file
-    txg.write_normal_models()
+    txg = TransactionGenerator(conf, args.sim_name)
+    if txg.shard_workers > 0 and (args.checkpoint_dir is not None or args.resume_from is not None):
+        parser.error("Checkpoints are not supported by the sharded generation (shard_workers)")
+    if args.max_memory is not None:
+        if txg.shard_workers > 0 or args.checkpoint_dir is not None or args.resume_from is not None:
+            parser.error("The memory budget is not supported with checkpoints or the sharded generation")
+        txg.set_memory_budget(args.max_memory, args.spill_dir)
+
+    if args.seeds is not None or args.num_seeds is not None:
+        if args.seeds is not None and args.num_seeds is not None:
+            parser.error("Specify either --seeds or --num-seeds")
+        if txg.shard_workers > 0 or args.max_memory is not None \
+                or args.checkpoint_dir is not None or args.resume_from is not None:
+            parser.error("The batch generation is not supported with checkpoints, the memory budget "
+                         "or the sharded generation")
+        if args.num_seeds is not None and args.num_seeds <= 0:
+            parser.error("--num-seeds must be positive")
+        if args.seeds is not None:
+            seeds = args.seeds
+        else:
+            seeds = [(txg.seed or 0) + i for i in range(args.num_seeds)]
+
+        # Parse the parameter files once and share them with the generators of all seeds
+        batch_begin = time.time()
+        txg.parse_param_files()
+        tasks = list()
+        for seed in seeds:
+            seed_conf = copy.deepcopy(conf)
+            seed_conf["general"]["random_seed"] = seed
+            tasks.append((TransactionGenerator, seed_conf, "%s_%d" % (txg.sim_name, seed), STAGES))
+        results = run_batch(tasks, args.batch_workers, txg.param_files)
+        log_summary(results)
+        summary_file = os.path.join(conf["temporal"]["directory"], "%s_batch_summary.csv" % txg.sim_name)
+        write_summary(summary_file, results)
+        logger.info("Wrote the batch summary to %s" % summary_file)
+        log_stage("batch", batch_begin)
+        sys.exit(0)
+    checkpointer = None
+    if args.checkpoint_dir is not None or args.resume_from is not None:
+        checkpoint_dir = args.checkpoint_dir or os.path.join(txg.output_dir, "checkpoints")
+        digest = config_hash(conf, txg.input_dir, {"sim_name": args.sim_name, "seed": txg.seed})
+        checkpointer = Checkpointer(checkpoint_dir, digest)
+
+    stage_names = [name for name, _ in STAGES]
+    first = 0
+    if txg.shard_workers > 0:
+        stage_begin = time.time()
+        txg.generate_sharded(txg.shard_workers)
+        log_stage("sharded", stage_begin)
+        first = stage_names.index(SHARD_STAGES[-1]) + 1
+    if args.resume_from is not None:
+        checkpointer.load(args.resume_from, txg)
+        first = stage_names.index(args.resume_from) + 1
+    for name, methods in STAGES[first:]:
+        stage_begin = time.time()
+        for method in methods:
+            getattr(txg, method)()
+        log_stage(name, stage_begin)
+        txg.check_memory_budget()
+        if degree_threshold > 0 and name in ("account_list", "alert_patterns"):
+            logger.info("Generated normal transaction network" if name == "account_list"
+                        else "Added alert transaction patterns")
+            txg.count_fan_in_out_patterns(degree_threshold)
+        if args.checkpoint_dir is not None:
+            checkpointer.save(name, txg)
+
+    stage_begin = time.time()
+    txg.export()
+    log_stage("export", stage_begin)
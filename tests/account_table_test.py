@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+
+from amlsim.account_table import AccountTable
+
+
+class AccountTableTests(unittest.TestCase):
+
+    def test_add_accounts_encodes_categories(self):
+        table = AccountTable(capacity=2)
+        table.add_accounts(range(0, 3), np.array([1.0, 2.0, 3.0]), 'US', 'I', 'bank_a')
+        table.add_accounts(range(3, 5), np.array([4.0, 5.0]), 'JP', 'I', 'bank_b')
+        self.assertEqual(len(table), 5)
+        self.assertEqual(table.countries.values, ['US', 'JP'])
+        self.assertEqual(table.businesses.values, ['I'])
+        self.assertEqual(table.bank_code[:5].tolist(), [0, 0, 0, 1, 1])
+        self.assertEqual(table.init_balance[:5].tolist(), [1.0, 2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(table.bank_id(4), 'bank_b')
+        self.assertEqual(table.acct_ids(), [0, 1, 2, 3, 4])
+
+
+    def test_bank_accounts(self):
+        table = AccountTable()
+        table.add_accounts(range(0, 2), np.zeros(2), 'US', 'I', 'bank_a')
+        table.add_accounts(range(2, 3), np.zeros(1), 'US', 'I', 'bank_b')
+        table.add_accounts(range(3, 5), np.zeros(2), 'US', 'I', 'bank_a')
+        bank_accts = table.bank_accounts()
+        self.assertEqual(bank_accts['bank_a'].tolist(), [0, 1, 3, 4])
+        self.assertEqual(bank_accts['bank_b'].tolist(), [2])
+
+
+    def test_raw_account_ids_and_attributes(self):
+        table = AccountTable()
+        table.add_account('uuid-1', 10.0, 'US', 'I', 'bank', first_name='Alice')
+        table.add_account('uuid-2', 20.0, 'US', 'I', 'bank', is_sar=True, first_name='Bob')
+        self.assertEqual(table.acct_ids(), ['uuid-1', 'uuid-2'])
+        self.assertEqual(table.attr('uuid-2', 'first_name'), 'Bob')
+        self.assertEqual(table.to_dict('uuid-1'), {'init_balance': 10.0, 'country': 'US', 'business': 'I',
+                                                   'bank_id': 'bank', 'is_sar': False, 'first_name': 'Alice'})
+        self.assertTrue(table.is_sar[1])
+        self.assertNotIn('uuid-3', table)
+
+
+    def test_set_sar(self):
+        table = AccountTable()
+        table.add_accounts(range(0, 3), np.zeros(3), 'US', 'I', 'bank')
+        table.set_sar(1)
+        self.assertEqual(table.is_sar[:3].tolist(), [False, True, False])
+        with self.assertRaises(KeyError):
+            table.set_sar(3)
+
+
+    def test_normal_models(self):
+        table = AccountTable()
+        table.add_accounts(range(0, 3), np.zeros(3), 'US', 'I', 'bank')
+        table.add_normal_model(2, 'model')
+        self.assertEqual(table.get_normal_models(2), ['model'])
+        self.assertEqual(table.get_normal_models(0), [])
+
+
+    def test_set_sars(self):
+        table = AccountTable()
+        table.add_accounts(range(0, 4), np.zeros(4), 'US', 'I', 'bank')
+        table.set_sars(np.array([1, 3]))
+        self.assertEqual(table.is_sar[:4].tolist(), [False, True, False, True])
+        with self.assertRaises(KeyError):
+            table.set_sars(np.array([2, 4]))
@@ -0,0 +1,107 @@
+import unittest
+
+from amlsim.account_table import AccountTable
+from amlsim.alert_store import AlertStore, PendingAlert
+
+
+class AlertStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.accounts = AccountTable()
+        self.accounts.add_accounts(range(4), [100.0] * 4, 'US', 'I', 'bank_a')
+        self.store = AlertStore(self.accounts, capacity=1)
+        alert = PendingAlert(1, 'fan_out', 2, 5, 10)
+        alert.add_member(0)
+        alert.add_member(1)
+        alert.add_member(2)
+        alert.add_edge(0, 1, 100.0, 5)
+        alert.add_edge(0, 2, 50.0, 6)
+        self.store.add(alert, 0, True)
+
+
+    def test_add_alerts(self):
+        alert = PendingAlert(9, 'fragmented_deposit', 1, 0, 3)
+        alert.add_member(3)
+        alert.add_edge(-1, 3, 10.0, 0)
+        alert.add_edge(-1, 3, 20.0, 1)  # The amount is overwritten
+        self.assertEqual(self.store.add(alert, 3, False), 1)
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(self.store.members, [0, 1, 2, 3])
+        self.assertEqual(list(self.store.min_amounts), [50.0, 100.0, 50.0, 20.0])
+        self.assertEqual(list(self.store.max_amounts), [100.0, 100.0, 50.0, 20.0])
+        self.assertEqual(self.store.main_accts(), [0, 3])
+        self.assertEqual(self.store.reason(1), 'fragmented_deposit')
+        self.assertEqual(self.store.edge_range(1), (2, 3))
+
+
+    def test_subgraph_view(self):
+        sub_g = self.store[0]
+        self.assertEqual(sub_g.graph['main_acct'], 0)
+        self.assertEqual(sub_g.graph['reason'], 'fan_out')
+        self.assertEqual(sub_g.graph['scheduleID'], 2)
+        self.assertTrue(sub_g.graph['is_sar'])
+        self.assertEqual(sub_g.node[1]['bank_id'], 'bank_a')
+        self.assertEqual(sub_g[0][2], {'amount': 50.0, 'date': 6})
+        self.assertEqual([g.number_of_edges() for g in self.store.values()], [2])
+        with self.assertRaises(KeyError):
+            self.store[1]
+
+
+    def test_extend_translates_accounts(self):
+        other = AlertStore()
+        alert = PendingAlert(9, 'fragmented_deposit', 1, 0, 3)
+        alert.add_member(1)
+        alert.add_edge(-1, 1, 10.0, 0)
+        other.add(alert, 1, False)
+        alert = PendingAlert(1, 'fan_out', 2, 5, 10)
+        alert.add_member(0)
+        alert.add_member(1)
+        alert.add_edge(0, 1, 30.0, 7)
+        other.add(alert, 0, True)
+
+        self.assertEqual(list(self.store.extend(other, [2, 3])), [1, 2])
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.members, [0, 1, 2, 3, 2, 3])
+        self.assertEqual(self.store.main_accts(), [0, 3, 2])
+        self.assertEqual([self.store.reason(i) for i in range(3)], ['fan_out', 'fragmented_deposit', 'fan_out'])
+        self.assertEqual(self.store.edge_src, [0, 0, -1, 2])
+        self.assertEqual(self.store.edge_dst, [1, 2, 3, 3])
+        self.assertEqual(self.store.member_range(2), (4, 6))
+        self.assertEqual(self.store.edge_range(2), (3, 4))
+        self.assertEqual(list(self.store.min_amounts), [50.0, 100.0, 50.0, 10.0, 30.0, 30.0])
+        self.assertTrue(self.store.row(2)['is_sar'])
+        self.assertEqual(self.store[2][2][3], {'amount': 30.0, 'date': 7})
+
+
+    def test_bad_alerts_throw(self):
+        alert = PendingAlert(1, 'fan_out', 1, 0, 3)
+        alert.add_member(1)
+        alert.add_member(2)
+        alert.add_edge(1, 3, 10.0, 0)
+        with self.assertRaises(ValueError):
+            self.store.add(alert, 3, False)  # Not a member
+        with self.assertRaises(ValueError):
+            self.store.add(alert, 1, False)  # Member 2 has no transactions
+        self.assertEqual(len(self.store), 1)
+
+
+    def test_add_alerts_at_once(self):
+        store = AlertStore(self.accounts)
+        alert_ids = store.add_alerts(1, 'fan_out', 2, [5, 0], [10, 3], True, [0, 1, 2, 3, 1], [3, 2], [0, 3],
+                                     [0, 0, 3], [1, 2, 4], [100.0, 50.0, 20.0], [5, 6, 1], [2, 1])
+        self.assertEqual(alert_ids, range(0, 2))
+        self.assertEqual(store.members[:3], self.store.members)
+        self.assertEqual(list(store.min_amounts), [50.0, 100.0, 50.0, 20.0, 20.0])
+        self.assertEqual(list(store.max_amounts), [100.0, 100.0, 50.0, 20.0, 20.0])
+        self.assertEqual(store.main_accts(), [0, 3])
+        self.assertEqual(store.edge_range(1), (2, 3))
+        self.assertEqual(sorted(store[1].edges(data=True)), [(3, 1, {'amount': 20.0, 'date': 1})])
+        self.assertEqual(sorted(store[0].edges(data=True)), sorted(self.store[0].edges(data=True)))
+        with self.assertRaises(ValueError):  # Member 2 has no transactions
+            store.add_alerts(1, 'fan_out', 2, [0], [1], True, [0, 1, 2], [3], [0], [0], [1], [1.0], [0], [1])
+        with self.assertRaises(ValueError):  # Transaction between alerts
+            store.add_alerts(1, 'fan_out', 2, [0, 0], [1, 1], True, [0, 1, 2, 3], [2, 2], [0, 2],
+                             [0, 1], [2, 3], [1.0, 1.0], [0, 0], [1, 1])
+
+if __name__ == ' main ':
+    unittest.main()
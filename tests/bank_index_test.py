@@ -0,0 +1,83 @@
+import random
+import unittest
+from collections import defaultdict
+
+import numpy as np
+
+from amlsim.bank_index import BankCapacityIndex
+from amlsim.indexed_pool import IndexedPool
+
+
+class BankCapacityIndexTests(unittest.TestCase):
+
+    def build_index(self, sizes):
+        pools = defaultdict(IndexedPool)
+        acct = 0
+        for bank_id, size in sizes:
+            pools[bank_id].update(range(acct, acct + size))
+            acct += size
+        return pools, BankCapacityIndex(pools)
+
+
+    def test_choice_same_as_random_choice(self):
+        pools, index = self.build_index([('a', 3), ('b', 1), ('c', 5), ('d', 2), ('e', 4)])
+        random.seed(0)
+        for _ in range(200):
+            num = random.randrange(0, 6)
+            exclude = random.choice(['a', 'c', 'e', None])
+            state = random.getstate()
+            candidates = [b for b, pool in pools.items() if b != exclude and len(pool) >= num]
+            expected = random.choice(candidates) if candidates else None
+            random.setstate(state)
+            self.assertEqual(index.choice(num, exclude=exclude), expected)
+            bank_id = random.choice(['a', 'b', 'c', 'd', 'e'])
+            if random.random() < 0.5 and len(pools[bank_id]) > 0:  # Reserve a member
+                pools[bank_id].discard(pools[bank_id].choice())
+            else:
+                pools[bank_id].add(1000 + random.randrange(1000))
+            index.update(bank_id)
+
+
+    def test_choice_none_without_candidates(self):
+        _, index = self.build_index([('a', 3), ('b', 1)])
+        self.assertIsNone(index.choice(2, exclude='a'))
+        self.assertEqual(index.choice(2, exclude='b'), 'a')
+
+
+    def test_sample_same_as_random_sample(self):
+        pools, index = self.build_index([('bank_%d' % i, 1) for i in range(100)])
+        pools['new'].add(-1)
+        index.update('new')
+        self.assertEqual(index.ids(), list(pools.keys()))
+        random.seed(1)
+        expected = random.sample(list(pools.keys()), 3)
+        random.seed(1)
+        self.assertEqual(index.sample(3), expected)
+
+
+    def test_choices_reserve_candidates(self):
+        pools, index = self.build_index([('a', 10), ('b', 3), ('c', 20)])
+        nums = [5, 5, 5, 5, 5, 3, 1, 30]
+        excludes = ['c', None, None, None, None, None, 'a', None]
+        bank_ids = index.choices(nums, excludes, np.random.RandomState(0))
+        self.assertIsNone(bank_ids[-1])
+        demands = defaultdict(int)
+        for num, exclude, bank_id in zip(nums, excludes, bank_ids):
+            if bank_id is not None:
+                self.assertNotEqual(bank_id, exclude)
+                demands[bank_id] += num
+        for bank_id, demand in demands.items():
+            self.assertLessEqual(demand, len(pools[bank_id]))
+
+
+    def test_samples_are_distinct(self):
+        _, index = self.build_index([('bank_%d' % i, 1) for i in range(5)])
+        bank_ids = index.samples(3, 100, np.random.RandomState(0))
+        self.assertEqual(bank_ids.shape, (100, 3))
+        for row in bank_ids.tolist():
+            self.assertEqual(len(set(row)), 3)
+        with self.assertRaises(ValueError):
+            index.samples(6, 1)
+
+if __name__ == ' main ':
+    unittest.main()
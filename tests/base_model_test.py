@@ -0,0 +1,59 @@
+import unittest
+
+import numpy as np
+
+from amlsim.base_model import fit_powerlaw_exponent, parse_base_model, powerlaw_mean, powerlaw_pmf
+from amlsim.base_model import sample_powerlaw_degrees
+
+
+class BaseModelTests(unittest.TestCase):
+
+    def test_parse_base_model_defaults(self):
+        model = parse_base_model({'type': 'powerlaw'})
+        self.assertEqual(model, {'type': 'powerlaw', 'exponent': 2.0, 'min_degree': 1, 'max_degree': None,
+                                 'mean_degree': None})
+
+
+    def test_parse_invalid_base_model_throws(self):
+        for conf in ({'type': 'kronecker'}, {'type': 'powerlaw', 'alpha': 2},
+                     {'type': 'powerlaw', 'exponent': 2, 'mean_degree': 3},
+                     {'type': 'powerlaw', 'min_degree': 0},
+                     {'type': 'powerlaw', 'min_degree': 5, 'max_degree': 4}):
+            with self.assertRaises(ValueError):
+                parse_base_model(conf)
+
+
+    def test_powerlaw_pmf(self):
+        pmf = powerlaw_pmf(2.0, 1, 4)
+        expected = np.array([1.0, 1 / 4.0, 1 / 9.0, 1 / 16.0])
+        np.testing.assert_allclose(pmf, expected / expected.sum())
+
+
+    def test_fit_powerlaw_exponent(self):
+        exponent = fit_powerlaw_exponent(3.0, 1, 100)
+        self.assertAlmostEqual(powerlaw_mean(exponent, 1, 100), 3.0, places=4)
+        with self.assertRaises(ValueError):
+            fit_powerlaw_exponent(60.0, 1, 100)
+
+
+    def test_sample_degrees_balanced_and_bounded(self):
+        model = parse_base_model({'type': 'powerlaw', 'mean_degree': 4.0, 'min_degree': 2, 'max_degree': 50})
+        in_deg, out_deg = sample_powerlaw_degrees(model, 1001, np.random.default_rng(0))
+        self.assertEqual(len(in_deg), 1001)
+        self.assertEqual(in_deg.sum(), out_deg.sum())
+        for deg in (in_deg, out_deg):
+            self.assertGreaterEqual(deg.min(), 2)
+            self.assertLessEqual(deg.max(), 50)
+        self.assertAlmostEqual(out_deg.mean(), 4.0, delta=0.5)
+
+
+    def test_sample_degrees_reproducible(self):
+        model = parse_base_model({'type': 'powerlaw', 'exponent': 2.5})
+        first = sample_powerlaw_degrees(model, 100, np.random.default_rng(1))
+        second = sample_powerlaw_degrees(model, 100, np.random.default_rng(1))
+        np.testing.assert_array_equal(first[0], second[0])
+        np.testing.assert_array_equal(first[1], second[1])
+        self.assertLessEqual(first[0].max(), 99)  # At most the number of accounts - 1
+
+if __name__ == ' main ':
+    unittest.main()
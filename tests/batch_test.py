@@ -0,0 +1,32 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from amlsim.batch import SeedResult, parse_seeds, write_summary
+
+
+class BatchTests(unittest.TestCase):
+
+    def test_parse_seeds(self):
+        self.assertEqual(parse_seeds('1,2, 30'), [1, 2, 30])
+        with self.assertRaises(ValueError):
+            parse_seeds('')
+        with self.assertRaises(ValueError):
+            parse_seeds('1,2,1')
+
+
+    def test_write_summary(self):
+        results = [SeedResult(1, 'tmp/sim_1', [('normal_transactions', 0.5), ('export', 0.25)], 0.75, 40.0),
+                   SeedResult(2, 'tmp/sim_2', [('normal_transactions', 0.5), ('export', 0.5)], 1.0, None)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'summary.csv')
+            write_summary(path, results)
+            with open(path, 'r') as rf:
+                rows = list(csv.reader(rf))
+        self.assertEqual(rows[0], ['seed', 'output_dir', 'normal_transactions', 'export', 'total', 'peak_rss_mb'])
+        self.assertEqual(rows[1], ['1', 'tmp/sim_1', '0.500', '0.250', '0.750', '40.0'])
+        self.assertEqual(rows[2], ['2', 'tmp/sim_2', '0.500', '0.500', '1.000', ''])
+
+if __name__ == ' main ':
+    unittest.main()
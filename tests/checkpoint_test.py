@@ -0,0 +1,72 @@
+import os
+import random
+import tempfile
+import unittest
+from array import array
+
+import numpy as np
+
+from amlsim.checkpoint import Checkpointer, config_hash
+
+
+class State:
+    pass
+
+
+class CheckpointTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.dir.name, 'input')
+        os.makedirs(self.input_dir)
+        with open(os.path.join(self.input_dir, 'accounts.csv'), 'w') as wf:
+            wf.write('count,min_balance\n10,100\n')
+        self.conf = {'general': {'random_seed': 0}}
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    def test_save_and_load(self):
+        checkpointer = Checkpointer(os.path.join(self.dir.name, 'ckpt'), config_hash(self.conf, self.input_dir))
+        state = State()
+        state.balances = np.arange(5000, dtype=np.float64)
+        state.view = state.balances  # Shared references are kept
+        state.degrees = array('q', range(2000))
+        state.pools = {'bank_a': {1, 2, 3}}
+        random.seed(1)
+        np.random.seed(1)
+        checkpointer.save('stage', state)
+        expected = (random.random(), np.random.rand())
+
+        loaded = State()
+        checkpointer.load('stage', loaded)
+        self.assertEqual(loaded.balances.tolist(), state.balances.tolist())
+        self.assertIs(loaded.view, loaded.balances)
+        self.assertEqual(loaded.degrees, state.degrees)
+        self.assertEqual(loaded.pools, state.pools)
+        self.assertEqual((random.random(), np.random.rand()), expected)
+
+
+    def test_changed_inputs_throw(self):
+        ckpt_dir = os.path.join(self.dir.name, 'ckpt')
+        Checkpointer(ckpt_dir, config_hash(self.conf, self.input_dir)).save('stage', State())
+        with open(os.path.join(self.input_dir, 'accounts.csv'), 'a') as wf:
+            wf.write('20,100\n')
+        checkpointer = Checkpointer(ckpt_dir, config_hash(self.conf, self.input_dir))
+        with self.assertRaises(ValueError):
+            checkpointer.load('stage', State())
+        with self.assertRaises(ValueError):
+            checkpointer.load('other_stage', State())
+
+
+    def test_config_hash(self):
+        digest = config_hash(self.conf, self.input_dir)
+        self.assertEqual(digest, config_hash({'general': {'random_seed': 0}}, self.input_dir))
+        self.assertNotEqual(digest, config_hash({'general': {'random_seed': 1}}, self.input_dir))
+        self.assertNotEqual(digest, config_hash(self.conf, self.input_dir, {'seed': 1}))
+
+
+if __name__ == ' main ':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+from amlsim.cost_model import STAGE_NAMES, estimate_stages, fit_cost_model, fit_power, parse_stage_log
+
+
+class CostModelTests(unittest.TestCase):
+
+    def test_fit_power(self):
+        sizes = [100, 1000, 10000, 100000]
+        values = [0.5 + 2e-4 * s ** 1.2 for s in sizes]
+        intercept, coefficient, exponent = fit_power(sizes, values)
+        self.assertAlmostEqual(exponent, 1.2)
+        self.assertAlmostEqual(intercept, 0.5, places=3)
+        self.assertAlmostEqual(coefficient, 2e-4, places=6)
+
+
+    def test_parse_stage_log(self):
+        lines = [
+            'INFO:__main__:Requested 2000 base transactions for 100 accounts',
+            'INFO:__main__:Add 1800 base transactions',
+            'INFO:__main__:Finished stage normal_transactions in 1.500 seconds (peak RSS 40.5 MB)',
+            'INFO:__main__:Finished stage export in 0.250 seconds (peak RSS 42.0 MB)',
+        ]
+        num_edges, stages = parse_stage_log(lines)
+        self.assertEqual(num_edges, 2000)
+        self.assertEqual(stages, {'normal_transactions': (1.5, 40.5), 'export': (0.25, 42.0)})
+
+
+    def test_fit_cost_model(self):
+        samples = [(size, {'export': (1e-3 * size, 40.0)}) for size in (100, 1000, 10000)]
+        samples.append((0, {'export': (100.0, 40.0)}))  # Base graph loaded from the cache
+        model = fit_cost_model(samples)
+        self.assertEqual(list(model.keys()), ['export'])
+        (stage, seconds, rss_mb), = estimate_stages(100000, model)
+        self.assertAlmostEqual(seconds, 100.0, places=3)
+        self.assertAlmostEqual(rss_mb, 40.0)
+        self.assertEqual([s[0] for s in estimate_stages(1000)], list(STAGE_NAMES))
+
+
+if __name__ == ' main ':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from amlsim.csr_graph import CSRGraph
+
+
+class CSRGraphTests(unittest.TestCase):
+
+    def setUp(self):
+        self.g = CSRGraph(4, [0, 0, 1, 2], [1, 2, 2, 3])
+
+
+    def test_adjacency(self):
+        self.assertEqual(self.g.successors(0), [1, 2])
+        self.assertEqual(self.g.predecessors(2), [0, 1])
+        self.assertEqual(self.g.out_degree(0), 2)
+        self.assertEqual(self.g.in_degree(2), 2)
+        self.assertEqual(self.g.number_of_edges(), 4)
+        self.assertTrue(self.g.has_node(3))
+        self.assertFalse(self.g.has_node(4))
+
+
+    def test_add_edge_to_buffer(self):
+        self.g.add_edge(3, 0)
+        self.g.add_edge(-1, 3, edge_id=7)
+        self.assertEqual(self.g.successors(3), [0])
+        self.assertEqual(self.g.predecessors(3), [2, -1])
+        self.assertEqual(self.g.nodes(), [0, 1, 2, 3, -1])
+        self.assertEqual(self.g.edge[-1][3]['edge_id'], 7)
+        self.assertEqual(self.g.number_of_edges(), 6)
+
+
+    def test_compact_keeps_edges_and_attributes(self):
+        self.g.add_edge(3, 0, edge_id=5)
+        self.g.add_edge(0, -1, edge_id=6)
+        self.g.compact()
+        self.assertEqual(self.g.successors(0), [1, 2, -1])
+        self.assertEqual(self.g.predecessors(0), [3])
+        self.assertEqual(self.g[0][-1]['edge_id'], 6)
+        self.assertEqual(self.g[3][0]['edge_id'], 5)
+
+
+    def test_set_edge_attributes_on_subgraph(self):
+        nx.set_edge_attributes(self.g, 'active', False)
+        nx.set_edge_attributes(self.g.subgraph([0, 1]), 'active', True)
+        self.assertEqual(self.g[0][1]['active'], True)
+        self.assertEqual(self.g[0][2]['active'], False)
+        self.assertEqual([e[2]['active'] for e in self.g.edges(data=True)], [True, False, False, False])
+
+
+    def test_set_edge_attrs(self):
+        self.g.add_edge(3, 0)
+        self.assertEqual(self.g.edge_positions([0, 1, 2, 3], [2, 2, 0, 0]).tolist(), [1, 2, -1, -1])
+        self.g.set_edge_attrs([1, 3, 0], [2, 0, 1], 'edge_id', [10, 11, 12])
+        self.assertEqual(self.g[1][2]['edge_id'], 10)
+        self.assertEqual(self.g[3][0]['edge_id'], 11)
+        self.assertEqual(self.g[0][1]['edge_id'], 12)
+        with self.assertRaises(KeyError):
+            self.g.set_edge_attrs([0], [1], 'amount', [1.0])
+
+
+
+    def test_degree_of_absent_node_throws(self):
+        for degree in (self.g.out_degree, self.g.in_degree):
+            with self.assertRaises(KeyError):
+                degree(100)
+
+
+    def test_add_edge_arrays(self):
+        new = self.g.add_edge_arrays(np.array([3, 0, 3, 2, -1]), np.array([0, 1, 0, 1, 3]))
+        self.assertEqual(new.tolist(), [True, False, False, True, True])
+        self.assertEqual(self.g.number_of_edges(), 7)
+        self.assertEqual(self.g.successors(3), [0])
+        self.assertEqual(self.g.predecessors(1), [0, 2])
+        self.assertEqual(self.g.in_degree(3), 2)
+        self.g.add_edge(0, 3)
+        self.assertEqual(self.g.successors(0), [1, 2, 3])
+        self.g.compact()
+        new = self.g.add_edge_arrays(np.array([-1, 3]), np.array([3, 1]))
+        self.assertEqual(new.tolist(), [False, True])
+        self.g.add_edges_from(np.array([[1, 0], [1, 0]]))
+        self.assertEqual(self.g.number_of_edges(), 10)
+        self.g.set_edge_attrs([3, 1], [1, 0], 'edge_id', [8, 9])
+        self.assertEqual((self.g[3][1]['edge_id'], self.g[1][0]['edge_id']), (8, 9))
+
+
+    def test_edge_id_arrays_in_edge_order(self):
+        self.g.set_edge_attrs([0, 0, 1], [1, 2, 2], 'edge_id', [0, 1, 2])
+        self.g.add_edge(3, 0, edge_id=3)
+        self.g.add_edge(-1, 2, edge_id=4)
+        self.g.add_edge(0, -1, edge_id=5)
+        self.g.add_edge(1, 3)
+        src, dst, edge_ids = self.g.edge_id_arrays()
+        expected = [e for e in self.g.edges(data='edge_id') if e[2] is not None]
+        self.assertEqual(list(zip(src.tolist(), dst.tolist(), edge_ids.tolist())), expected)
+        self.assertEqual(edge_ids.tolist(), [0, 1, 5, 2, 3, 4])
+        self.g.compact()
+        self.assertEqual(self.g.edge_id_arrays()[2].tolist(), [0, 1, 5, 2, 3, 4])
+
+if __name__ == ' main ':
+    unittest.main()
@@ -0,0 +1,77 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from amlsim.csv_writer import ChunkedCSVWriter, format_column
+
+
+class CSVWriterTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.header = ['id', 'name', 'flag', 'amount']
+        self.rows = [
+            [1, 'plain', True, 1.5],
+            [2, 'comma, inside', False, None],
+            [-1, 'say "hi"', True, 0.1],
+            [3, 'line\nbreak', False, 12],
+        ]
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    def read_bytes(self, name):
+        with open(os.path.join(self.dir.name, name), 'rb') as rf:
+            return rf.read()
+
+
+    def write_expected(self):
+        with open(os.path.join(self.dir.name, 'expected.csv'), 'w') as wf:
+            writer = csv.writer(wf)
+            writer.writerow(self.header)
+            for row in self.rows:
+                writer.writerow(row)
+        return self.read_bytes('expected.csv')
+
+
+    def test_write_rows_same_as_csv_writer(self):
+        path = os.path.join(self.dir.name, 'actual.csv')
+        with ChunkedCSVWriter(path, self.header) as writer:
+            writer.write_rows(self.rows[:3])
+            writer.write_rows([])
+            writer.write_rows(self.rows[3:])
+        self.assertEqual(writer.num_rows, 4)
+        self.assertEqual(self.read_bytes('actual.csv'), self.write_expected())
+
+
+    def test_write_columns_same_as_csv_writer(self):
+        path = os.path.join(self.dir.name, 'actual.csv')
+        with ChunkedCSVWriter(path, self.header) as writer:
+            writer.write_columns([
+                format_column(np.array([1, 2, -1, 3])),
+                format_column([row[1] for row in self.rows]),
+                format_column(np.array([True, False, True, False])),
+                format_column([row[3] for row in self.rows]),
+            ])
+        self.assertEqual(self.read_bytes('actual.csv'), self.write_expected())
+
+
+    def test_format_float_column(self):
+        self.assertEqual(format_column(np.array([1.005, 2.0, 1234.5678]), '%.2f'),
+                         ['{:.2f}'.format(v) for v in [1.005, 2.0, 1234.5678]])
+
+
+    def test_wrong_number_of_columns_throws(self):
+        path = os.path.join(self.dir.name, 'actual.csv')
+        with ChunkedCSVWriter(path, self.header) as writer:
+            with self.assertRaises(ValueError):
+                writer.write_columns([['1'], ['a']])
+
+
+if __name__ == ' main ':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+import numpy as np
+
+from amlsim.degree_sequence import DegreeSequence, remove_stubs
+
+
+class DegreeSequenceTests(unittest.TestCase):
+
+    def test_from_rows_skips_comments(self):
+        deg_seq = DegreeSequence.from_rows([
+            ['1', '2', '4'],
+            ['# comment', '0', '0'],
+            ['2', '4', '2']
+        ])
+        self.assertEqual(deg_seq.length, 3)
+        self.assertEqual(deg_seq.total_in_degree, 10)
+        self.assertEqual(deg_seq.total_out_degree, 8)
+
+
+    def test_repeat_to_expands_lazily(self):
+        deg_seq = DegreeSequence([1, 2], [2, 4], [4, 2]).repeat_to(6)
+        self.assertEqual(deg_seq.num_nodes, 6)
+        self.assertEqual(deg_seq.total_in_degree, 20)
+        self.assertEqual(deg_seq.in_degrees().tolist(), [2, 4, 4, 2, 4, 4])
+        self.assertEqual(deg_seq.out_degrees().tolist(), [4, 2, 2, 4, 2, 2])
+        self.assertEqual(str(deg_seq.in_degrees().dtype), 'int32')
+
+
+    def test_repeat_to_bad_mod_throws(self):
+        with self.assertRaises(ValueError) as context:
+            DegreeSequence([1, 2], [2, 4], [4, 2]).repeat_to(4)
+        self.assertEqual('The number of total accounts (4) must be a multiple of the degree sequence length (3).',
+            str(context.exception))
+
+
+    def test_validate_unequal_degrees_throws(self):
+        with self.assertRaises(ValueError):
+            DegreeSequence([1, 2], [2, 4], [4, 1]).validate()
+
+
+    def test_remove_stubs_within_degrees(self):
+        degrees = np.array([3, 0, 1, 5])
+        removed = remove_stubs(degrees, 6, np.random.default_rng(0))
+        self.assertEqual(int(removed.sum()), 6)
+        self.assertTrue(np.all(removed <= degrees))
+
+
+if __name__ == ' main ':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from amlsim.graph_cache import GraphCache, cache_key
+
+
+class GraphCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = GraphCache(os.path.join(self.dir.name, 'cache'), 1 << 20)
+
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+
+    def test_put_and_get(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.put('key', np.array([0, 1, 2]), np.array([1, 2, 0]), {'num_nodes': 3})
+        src, dst, meta = self.cache.get('key')
+        self.assertIsInstance(src, np.memmap)
+        self.assertEqual(src.tolist(), [0, 1, 2])
+        self.assertEqual(dst.tolist(), [1, 2, 0])
+        self.assertEqual(meta, {'num_nodes': 3})
+
+
+    def test_evict_least_recently_used(self):
+        edges = np.arange(1000)
+        for key in ['a', 'b']:
+            self.cache.put(key, edges, edges, {})
+        entry_size = self.cache.entries()[0][1]
+        a_meta = os.path.join(self.cache.directory, 'a', 'meta.json')
+        b_meta = os.path.join(self.cache.directory, 'b', 'meta.json')
+        os.utime(a_meta, (1000, 1000))
+        os.utime(b_meta, (2000, 2000))
+        self.assertIsNotNone(self.cache.get('a'))  # 'a' becomes the most recently used
+        self.cache.max_bytes = entry_size * 2
+        self.cache.put('c', edges, edges, {})
+        self.assertEqual(sorted(key for _, _, key in self.cache.entries()), ['a', 'c'])
+
+
+    def test_cache_key(self):
+        path = os.path.join(self.dir.name, 'degree.csv')
+        with open(path, 'w') as wf:
+            wf.write('Count,In-degree,Out-degree\n10,1,1\n')
+        key = cache_key([path], {'seed': 0})
+        self.assertEqual(key, cache_key([path], {'seed': 0}))
+        self.assertNotEqual(key, cache_key([path], {'seed': 1}))
+        with open(path, 'a') as wf:
+            wf.write('10,2,2\n')
+        self.assertNotEqual(key, cache_key([path], {'seed': 0}))
+
+
+if __name__ == ' main ':
+    unittest.main()
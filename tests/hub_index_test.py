@@ -0,0 +1,95 @@
+import random
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from amlsim.hub_index import HubIndex
+from amlsim.indexed_pool import IndexedPool
+
+
+class HubIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.acct_to_bank = {0: 'bank_a', 1: 'bank_a', 2: 'bank_b', 3: 'bank_b'}
+        self.candidates = IndexedPool(range(4))
+        self.index = HubIndex(2, 4)
+        for orig, bene in [(0, 1), (0, 2), (3, 2), (1, -1)]:
+            self.index.add_edge(orig, bene)
+
+
+    def test_degrees_skip_non_accounts(self):
+        self.assertEqual(list(self.index.out_degrees), [2, 1, 0, 1])
+        self.assertEqual(list(self.index.in_degrees), [0, 1, 2, 0])
+        self.assertEqual(self.index.hub_degree_nodes(), [0, 2])
+
+
+    def test_activate_builds_bank_pools(self):
+        self.candidates.remove(2)
+        self.index.activate(self.acct_to_bank, self.candidates)
+        self.assertEqual(len(self.index), 1)
+        self.assertIn(0, self.index)
+        self.assertEqual(self.index.choice('bank_a'), 0)
+        with self.assertRaises(IndexError):
+            self.index.choice('bank_b')
+
+
+    def test_edges_after_activation_update_hubs(self):
+        self.index.activate(self.acct_to_bank, self.candidates)
+        self.index.add_edge(3, 1)
+        self.assertIn(3, self.index)
+        self.assertIn(1, self.index)
+        self.assertEqual(len(self.index.bank_hubs['bank_b']), 2)
+
+
+    def test_removed_accounts_are_not_hubs(self):
+        self.index.activate(self.acct_to_bank, self.candidates)
+        self.index.remove(0)
+        self.index.remove(3)
+        self.index.add_edge(3, 1)
+        self.assertNotIn(0, self.index)
+        self.assertNotIn(3, self.index)
+        self.assertEqual(len(self.index.bank_hubs['bank_a']), 1)
+
+
+    def test_add_edges_same_as_add_edge(self):
+        index = HubIndex(2)
+        index.add_edges([0, 0, 3, 1], [1, 2, 2, -1])
+        self.assertEqual(list(index.out_degrees), list(self.index.out_degrees))
+        self.assertEqual(list(index.in_degrees), list(self.index.in_degrees))
+        index.activate(self.acct_to_bank, self.candidates)
+        index.add_edges([3, 3], [1, 0])
+        self.assertIn(3, index)
+        self.assertIn(1, index)
+
+
+    def test_weighted_choice_by_degrees(self):
+        index = HubIndex(1, 4, weighted=True)
+        index.add_edges([0, 0, 0, 1, 2], [1, 3, 3, 2, 3])  # Degrees: 3, 2, 2, 3
+        index.activate({0: 'bank_a', 1: 'bank_a', 2: 'bank_b', 3: 'bank_b'}, IndexedPool(range(4)))
+        random.seed(0)
+        counts = Counter(index.choice('bank_a') for _ in range(10000))
+        self.assertAlmostEqual(counts[0] / 10000, 0.6, delta=0.03)
+        index.remove(0)
+        self.assertEqual(set(index.choice() for _ in range(100)), {1, 2, 3})
+        index.remove(1)
+        index.remove(2)
+        self.assertEqual(index.choice(), 3)
+        with self.assertRaises(IndexError):
+            index.choice('bank_a')
+
+
+    def test_take_excludes_hubs(self):
+        for weighted in (False, True):
+            index = HubIndex(1, 4, weighted)
+            for orig, bene in [(0, 1), (0, 2), (3, 2)]:
+                index.add_edge(orig, bene)
+            index.activate(self.acct_to_bank, self.candidates)
+            accts = index.take(3, np.random.RandomState(0))
+            self.assertEqual(len(set(accts.tolist())), 3)
+            self.assertEqual(len(index), 1)
+            self.assertEqual(sum(len(pool) for pool in index.bank_hubs.values()), 1)
+            for acct in accts.tolist():
+                self.assertTrue(index.removed[acct])
+            with self.assertRaises(ValueError):
+                index.take(2)
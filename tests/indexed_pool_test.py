@@ -0,0 +1,73 @@
+import random
+import unittest
+
+import numpy as np
+
+from amlsim.indexed_pool import IndexedPool
+
+
+class IndexedPoolTests(unittest.TestCase):
+
+    def test_remove_swaps_with_last(self):
+        pool = IndexedPool(range(5))
+        pool.remove(1)
+        self.assertEqual(pool.items, [0, 4, 2, 3])
+        self.assertEqual(pool.pos[4], 1)
+        self.assertNotIn(1, pool)
+        pool.remove(3)
+        self.assertEqual(pool.items, [0, 4, 2])
+        self.assertEqual(len(pool), 3)
+
+
+    def test_remove_absent_throws(self):
+        pool = IndexedPool([1, 2])
+        with self.assertRaises(KeyError):
+            pool.remove(3)
+        pool.discard(3)
+        self.assertEqual(len(pool), 2)
+
+
+    def test_add_ignores_duplicates(self):
+        pool = IndexedPool([1, 2])
+        pool.add(2)
+        pool.add(3)
+        self.assertEqual(pool.items, [1, 2, 3])
+
+
+    def test_sample_is_reproducible(self):
+        pool = IndexedPool(range(100))
+        random.seed(0)
+        first = pool.sample(10)
+        random.seed(0)
+        second = pool.sample(10)
+        self.assertEqual(first, second)
+        self.assertEqual(len(set(first)), 10)
+        with self.assertRaises(ValueError):
+            pool.sample(101)
+
+
+    def test_choice_from_empty_pool_throws(self):
+        pool = IndexedPool([1])
+        self.assertEqual(pool.choice(), 1)
+        pool.remove(1)
+        with self.assertRaises(IndexError):
+            pool.choice()
+
+
+    def test_take_removes_sampled_items(self):
+        pool = IndexedPool(range(10))
+        taken = pool.take(4, np.random.RandomState(0))
+        self.assertEqual(len(set(taken.tolist())), 4)
+        self.assertEqual(len(pool), 6)
+        self.assertEqual(sorted(pool.items + taken.tolist()), list(range(10)))
+        for i, item in enumerate(pool.items):
+            self.assertEqual(pool.pos[item], i)
+        with self.assertRaises(ValueError):
+            pool.take(7)
+
+
+    def test_discard_many(self):
+        pool = IndexedPool(range(6))
+        pool.discard_many([0, 4, 5, 9])
+        self.assertEqual(sorted(pool.items), [1, 2, 3])
+        self.assertEqual(pool.pos, {item: i for i, item in enumerate(pool.items)})
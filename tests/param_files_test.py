@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from amlsim.param_files import ParamFiles, read_param_rows, write_param_rows
+
+
+def count_rows(rows):
+    return len(rows) - 1
+
+
+class ParamFilesTests(unittest.TestCase):
+
+    def test_rows_are_read_once(self):
+        with tempfile.TemporaryDirectory() as input_dir:
+            path = os.path.join(input_dir, 'degree.csv')
+            with open(path, 'w') as wf:
+                wf.write('Count,In-degree,Out-degree\n2,1,1\n')
+            param_files = ParamFiles(input_dir)
+            rows = param_files.rows('degree.csv')
+            self.assertEqual(rows, [['Count', 'In-degree', 'Out-degree'], ['2', '1', '1']])
+            os.remove(path)
+            self.assertIs(param_files.rows('degree.csv'), rows)
+
+
+    def test_parse_caches_each_parser(self):
+        calls = list()
+
+        def parse_header(rows):
+            calls.append(rows[0])
+            return rows[0]
+
+        with tempfile.TemporaryDirectory() as input_dir:
+            with open(os.path.join(input_dir, 'accounts.csv'), 'w') as wf:
+                wf.write('count,bank_id\n10,bank_a\n5,bank_b\n')
+            param_files = ParamFiles(input_dir)
+            self.assertEqual(param_files.parse('accounts.csv', parse_header), ['count', 'bank_id'])
+            self.assertEqual(param_files.parse('accounts.csv', parse_header), ['count', 'bank_id'])
+            self.assertEqual(param_files.parse('accounts.csv', count_rows), 2)
+        self.assertEqual(len(calls), 1)
+
+
+    def test_param_rows_skip_comments(self):
+        with tempfile.TemporaryDirectory() as input_dir:
+            path = os.path.join(input_dir, 'degree.csv')
+            write_param_rows(path, ['Count', 'In-degree', 'Out-degree'], [[2, 1, 1], ['# comment'], [], [1, 0, 2]])
+            header, rows = read_param_rows(path)
+        self.assertEqual(header, ['Count', 'In-degree', 'Out-degree'])
+        self.assertEqual(rows, [['2', '1', '1'], ['1', '0', '2']])
+
+if __name__ == ' main ':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from preflight import preflight
+
+
+class PreflightTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        shutil.copytree('paramFiles/typologies', os.path.join(self.tmp_dir, 'params'))
+        with open('paramFiles/typologies/conf.json', 'r') as rf:
+            self.conf = json.load(rf)
+        self.conf['input']['directory'] = os.path.join(self.tmp_dir, 'params')
+        self.conf['input']['normal_models'] = 'normalModels.csv'
+
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
+    def write_params(self, name, lines):
+        with open(os.path.join(self.tmp_dir, 'params', name), 'w') as wf:
+            wf.write('\n'.join(lines) + '\n')
+
+
+    def test_feasible_configuration(self):
+        report = preflight(self.conf)
+        self.assertEqual(report['errors'], [])
+        self.assertEqual(report['num_accounts'], 389)
+        self.assertEqual([bank for bank, _, _, _ in report['banks']], ['bank_a', 'bank_b', 'bank_c'])
+        self.assertEqual(len(report['typologies']), 8)
+        self.assertEqual([model_type for model_type, _, _, _ in report['normal_models']],
+                         ['single', 'fan_out', 'fan_in', 'forward'])
+        self.assertEqual(sum(hubs for _, _, _, _, hubs, _ in report['typologies']), 2)
+        self.assertEqual([stage for stage, _, _ in report['stages']][-1], 'export')
+
+
+    def test_too_few_bank_accounts(self):
+        self.write_params('alertPatterns.csv', [
+            'count,type,schedule_id,min_accounts,max_accounts,min_amount,max_amount,min_period,max_period,bank_id,is_sar',
+            '1,fan_out,2,5,150,100,200,10,20,bank_a,True',
+        ])
+        report = preflight(self.conf)
+        self.assertEqual(len(report['errors']), 2)  # Member accounts of the row and of the bank
+        self.assertIn('bank bank_a has 100', report['errors'][0])
+
+
+    def test_no_hub_accounts(self):
+        self.conf['graph_generator']['degree_threshold'] = 1000
+        report = preflight(self.conf)
+        self.assertTrue(any('hub accounts' in msg for msg in report['errors']))
+        self.assertTrue(any('Normal model fan_in' in msg for msg in report['warnings']))
+
+
+    def test_invalid_degree_sequence(self):
+        self.write_params('degree.csv', ['Count,In-degree,Out-degree', '100,1,2'])
+        report = preflight(self.conf)
+        self.assertEqual(len(report['errors']), 1)
+        self.assertNotIn('stages', report)
+
+
+
+    def test_base_model_without_degree_file(self):
+        os.remove(os.path.join(self.tmp_dir, 'params', 'degree.csv'))
+        self.conf['graph_generator']['base_model'] = {'type': 'powerlaw', 'mean_degree': 3.0}
+        report = preflight(self.conf)
+        self.assertEqual(report['errors'], [])
+        self.assertGreater(report['num_edges'], 389)
+        self.conf['graph_generator']['base_model'] = {'type': 'powerlaw', 'mean_degree': 1000.0}
+        report = preflight(self.conf)
+        self.assertEqual(len(report['errors']), 1)
+
+
+if __name__ == ' main ':
+    unittest.main()
@@ -0,0 +1,50 @@
+import random
+import unittest
+
+import numpy as np
+
+from amlsim.rng import RandomStreams
+
+
+class RandomStreamsTests(unittest.TestCase):
+
+    def test_streams_are_reproducible(self):
+        first = RandomStreams(0)
+        second = RandomStreams(0)
+        self.assertEqual(first.int_seed('base_graph'), second.int_seed('base_graph'))
+        self.assertEqual(first.python_random('tx_types').random(), second.python_random('tx_types').random())
+        self.assertEqual(first.numpy_random('balances').random(), second.numpy_random('balances').random())
+
+
+    def test_streams_are_independent(self):
+        streams = RandomStreams(0)
+        seeds = [streams.int_seed('alert_patterns', row) for row in range(10)]
+        seeds.append(streams.int_seed('normal_models'))
+        self.assertEqual(len(set(seeds)), 11)
+        self.assertNotEqual(streams.int_seed('base_graph'), RandomStreams(1).int_seed('base_graph'))
+
+
+    def test_streams_do_not_touch_globals(self):
+        streams = RandomStreams(0)
+        random.seed(1)
+        np.random.seed(1)
+        expected = (random.random(), np.random.rand())
+        random.seed(1)
+        np.random.seed(1)
+        rand = streams.python_random('alert_patterns', 3)
+        np_rand = streams.random_state('alert_patterns', 3)
+        values = (rand.random(), np_rand.rand())
+        self.assertEqual((random.random(), np.random.rand()), expected)
+        self.assertEqual((streams.python_random('alert_patterns', 3).random(),
+                          streams.random_state('alert_patterns', 3).rand()), values)
+
+
+    def test_bad_streams_throw(self):
+        with self.assertRaises(ValueError):
+            RandomStreams(None)
+        with self.assertRaises(KeyError):
+            RandomStreams(0).int_seed('unknown')
+
+
+if __name__ == ' main ':
+    unittest.main()
@@ -37,6 +37,14 @@ class RoundedAmountTests(unittest.TestCase):
         self.assertGreaterEqual(amount, 1000.0)
         self.assertLessEqual(amount, 12000.0)
         self.assertEqual(amount % 1000, 0.0)
+
+
+    def test_get_45_12000_amounts(self):
+        amounts = RoundedAmount(45.0, 12000.0).getAmounts(100)
+        self.assertEqual(len(amounts), 100)
+        self.assertGreaterEqual(amounts.min(), 1000.0)
+        self.assertLessEqual(amounts.max(), 12000.0)
+        self.assertTrue(((amounts % 1000) == 0.0).all())
         
 
 
@@ -0,0 +1,39 @@
+import random
+import unittest
+
+import numpy as np
+
+from amlsim.sampling import AliasSampler, CumulativeSampler
+
+
+class SamplingTests(unittest.TestCase):
+
+    def test_cumulative_sampler_same_as_random_choice(self):
+        weights = [2, 0, 3, 1]
+        expanded = [i for i, w in enumerate(weights) for _ in range(w)]
+        sampler = CumulativeSampler(weights)
+        random.seed(0)
+        expected = [random.choice(expanded) for _ in range(100)]
+        random.seed(0)
+        self.assertEqual([sampler.draw_one() for _ in range(100)], expected)
+        with self.assertRaises(ValueError):
+            CumulativeSampler([1.5, 1])
+
+
+    def test_alias_sampler_distribution(self):
+        weights = np.array([0.5, 0.0, 2.5, 1.0])
+        sampler = AliasSampler(weights)
+        counts = np.bincount(sampler.draw(200000, np.random.default_rng(0)), minlength=4)
+        np.testing.assert_allclose(counts / 200000, weights / weights.sum(), atol=0.005)
+        rand = random.Random(1)
+        counts = np.bincount([sampler.draw_one(rand) for _ in range(100000)], minlength=4)
+        np.testing.assert_allclose(counts / 100000, weights / weights.sum(), atol=0.01)
+
+
+    def test_invalid_weights_throw(self):
+        for weights in ([], [0, 0], [1, -1], [1, float('nan')]):
+            with self.assertRaises(ValueError):
+                AliasSampler(weights)
+
+if __name__ == ' main ':
+    unittest.main()
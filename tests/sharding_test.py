@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from amlsim.param_files import read_param_rows
+from amlsim.sharding import add_local_stubs, expected_inter_ratios, match_inter_group_stubs, split_counts
+from amlsim.sharding import split_degrees, write_degree_csv
+from transaction_graph_generator import get_degree_sequence
+
+
+class ShardingTests(unittest.TestCase):
+
+    def test_split_counts(self):
+        self.assertEqual(split_counts(10, [1, 1, 1]).tolist(), [4, 3, 3])
+        self.assertEqual(split_counts(7, [100, 300]).tolist(), [2, 5])
+        self.assertEqual(split_counts(0, [1, 2]).tolist(), [0, 0])
+
+
+    def test_split_degrees_balances_groups(self):
+        rng = np.random.default_rng(0)
+        in_deg = rng.integers(0, 10, 100)
+        out_deg = rng.permutation(in_deg)
+        groups = [np.arange(0, 30), np.arange(30, 100)]
+        local_degrees, inter_in, inter_out = split_degrees(in_deg, out_deg, groups, 0.3, rng)
+        for accts, (local_in, local_out) in zip(groups, local_degrees):
+            self.assertEqual(local_in.sum(), local_out.sum())
+            self.assertTrue((local_in >= 0).all() and (local_out >= 0).all())
+            self.assertTrue((local_in + inter_in[accts] <= in_deg[accts]).all())
+            self.assertTrue((local_out + inter_out[accts] <= out_deg[accts]).all())
+        self.assertEqual(inter_in.sum(), inter_out.sum())
+        self.assertGreater(inter_in.sum(), 0)
+
+
+    def test_match_inter_group_stubs(self):
+        rng = np.random.default_rng(0)
+        in_deg = np.array([2, 1, 0, 1, 1, 1])
+        out_deg = np.array([0, 1, 2, 1, 1, 1])
+        groups = np.array([0, 0, 0, 1, 1, 1])
+        src, dst, local_src, local_dst = match_inter_group_stubs(in_deg, out_deg, groups, rng)
+        self.assertGreater(len(src), 0)
+        self.assertTrue((groups[src] != groups[dst]).all())
+        self.assertTrue((groups[local_src] == groups[local_dst]).all())
+        self.assertEqual(np.bincount(np.concatenate([src, local_src]), minlength=6).tolist(), out_deg.tolist())
+        self.assertEqual(np.bincount(np.concatenate([dst, local_dst]), minlength=6).tolist(), in_deg.tolist())
+
+
+    def test_unmatched_stubs_return_to_groups(self):
+        rng = np.random.default_rng(0)
+        in_deg = np.array([3, 3, 0, 1])  # Most stubs belong to group 0
+        out_deg = np.array([3, 3, 1, 0])
+        groups = [np.array([0, 1]), np.array([2, 3])]
+        acct_groups = np.array([0, 0, 1, 1])
+        src, dst, local_src, local_dst = match_inter_group_stubs(in_deg, out_deg, acct_groups, rng)
+        self.assertLessEqual(len(src), 2)
+        self.assertEqual(len(src) + len(local_src), 7)
+        local_degrees = [(np.zeros(2, dtype=np.int64), np.zeros(2, dtype=np.int64)) for _ in groups]
+        add_local_stubs(local_degrees, groups, local_src, local_dst)
+        self.assertEqual(local_degrees[0][0].sum() + local_degrees[1][0].sum(), len(local_src))
+        for local_in, local_out in local_degrees:
+            self.assertEqual(local_in.sum(), local_out.sum())
+        self.assertEqual(np.concatenate([local_degrees[0][1], local_degrees[1][1]]).tolist(),
+                         (out_deg - np.bincount(src, minlength=4)).tolist())
+
+
+    def test_expected_inter_ratios(self):
+        in_deg = np.array([3, 1, 0, 0])
+        out_deg = np.array([1, 1, 1, 1])
+        in_ratios, out_ratios = expected_inter_ratios(in_deg, out_deg, [np.array([0, 1]), np.array([2, 3])])
+        self.assertEqual(in_ratios.tolist(), [0.5, 0.5, 0.5, 0.5])
+        self.assertEqual(out_ratios.tolist(), [0.0, 0.0, 1.0, 1.0])
+
+
+    def test_write_degree_csv(self):
+        in_deg = [1, 1, 2, 0, 0]
+        out_deg = [1, 1, 0, 2, 0]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'degree.csv')
+            write_degree_csv(path, in_deg, out_deg)
+            header, rows = read_param_rows(path)
+            self.assertEqual(header, ['Count', 'In-degree', 'Out-degree'])
+            self.assertEqual(len(rows), 4)
+            deg_seq = get_degree_sequence(path, 5)
+        self.assertEqual(deg_seq.in_degrees().tolist(), in_deg)
+        self.assertEqual(deg_seq.out_degrees().tolist(), out_deg)
+
+
+if __name__ == ' main ':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from amlsim.spill import MemoryBudget, RunFiles, parse_memory_size, read_groups, write_groups
+
+
+class SpillTests(unittest.TestCase):
+
+    def test_parse_memory_size(self):
+        self.assertEqual(parse_memory_size('16G'), 16 << 30)
+        self.assertEqual(parse_memory_size('512MB'), 512 << 20)
+        self.assertEqual(parse_memory_size('1.5k'), 1536)
+        self.assertEqual(parse_memory_size('1048576'), 1 << 20)
+        with self.assertRaises(ValueError):
+            parse_memory_size('16X')
+
+
+    def test_memory_budget(self):
+        with self.assertRaises(ValueError):
+            MemoryBudget(0)
+        budget = MemoryBudget(1000, spill_ratio=0.5)
+        self.assertFalse(budget.is_close({'graph': 200, 'alerts': 200}))
+        self.assertTrue(budget.is_close({'graph': 300, 'alerts': 200}))
+
+
+    def test_run_files_merge(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            runs = RunFiles(tmp_dir, 'alert_members')
+            runs.write_run([(0, '0,a'), (2, '2,"b,c"'), (2, '2,d')])
+            runs.write_run([(1, '1,e'), (5, '5,é')])
+            self.assertEqual(len(runs), 2)
+            self.assertEqual(runs.num_lines, 5)
+            lines = list(runs.merge(iter([(3, '3,f'), (6, '6,g')])))
+            self.assertEqual(lines, ['0,a', '1,e', '2,"b,c"', '2,d', '3,f', '5,é', '6,g'])
+            runs.remove()
+            self.assertEqual(os.listdir(tmp_dir), [])
+
+
+    def test_write_and_read_groups(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'groups.npz')
+            write_groups(path, [{1, 2}, [5], range(7, 10)])
+            members, sizes = read_groups(path)
+        self.assertEqual(sizes.tolist(), [2, 1, 3])
+        self.assertEqual(sorted(members[:2].tolist()), [1, 2])
+        self.assertEqual(members[2:].tolist(), [5, 7, 8, 9])
+        self.assertEqual(members.dtype, np.int64)
+
+
+if __name__ == ' main ':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+import networkx as nx
+import numpy as np
+
+from amlsim.topology_template import TemplateLibrary, TopologyTemplate, parse_edgelist
+
+
+class TopologyTemplateTests(unittest.TestCase):
+
+    def test_parse_edgelist_same_order_as_networkx(self):
+        lines = ['# comment\n', 'b,c\n', 'a,b\n', 'b,a  # comment\n', '\n', 'a,c\n', 'b,c\n', 'c,a\n']
+        nodes, src, dst = parse_edgelist(lines)
+        g = nx.parse_edgelist(lines, delimiter=',', create_using=nx.DiGraph())
+        self.assertEqual(nodes, g.nodes())
+        self.assertEqual([(nodes[u], nodes[v]) for u, v in zip(src, dst)], g.edges())
+
+
+    def test_stamp(self):
+        template = TopologyTemplate(['a', 'b', 'c'], [0, 1, 2], [1, 2, 0])
+        src, dst = template.stamp([[10, 11, 12], [20, 21, 22]])
+        self.assertEqual(src.tolist(), [10, 11, 12, 20, 21, 22])
+        self.assertEqual(dst.tolist(), [11, 12, 10, 21, 22, 20])
+        with self.assertRaises(ValueError):
+            template.stamp([[10, 11]])
+
+
+    def test_from_graph(self):
+        g = nx.DiGraph()
+        g.add_edges_from([('x', 'y'), ('y', 'z')])
+        template = TopologyTemplate.from_graph(g)
+        src, dst = template.stamp(np.array([[1, 2, 3]]))
+        mapping = dict(zip(template.nodes, [1, 2, 3]))
+        self.assertEqual(sorted(zip(src.tolist(), dst.tolist())), [(mapping['x'], mapping['y']),
+                                                                  (mapping['y'], mapping['z'])])
+
+
+    def test_library_reloads_modified_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'topology.csv')
+            with open(path, 'w') as wf:
+                wf.write('a,b\n')
+            library = TemplateLibrary()
+            template = library.get(path)
+            self.assertIs(library.get(path), template)
+            self.assertEqual(template.num_edges, 1)
+            with open(path, 'w') as wf:
+                wf.write('a,b\nb,c\n')
+            os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1000000000))
+            self.assertEqual(library.get(path).num_edges, 2)
+            self.assertEqual(len(library), 1)
+
+if __name__ == ' main ':
+    unittest.main()
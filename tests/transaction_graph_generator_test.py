@@ -1,11 +1,39 @@
+import copy
+import os
+import random
+import shutil
+import tempfile
 import unittest
 
 from transaction_graph_generator import TransactionGenerator, get_degrees
-from transaction_graph_generator import get_in_and_out_degrees
+from transaction_graph_generator import get_in_and_out_degrees, get_degree_sequence
 from transaction_graph_generator import directed_configuration_model
+from transaction_graph_generator import directed_configuration_model_edges, unique_edges
+from transaction_graph_generator import rewire_simple_edges, degree_sequence_report
+from transaction_graph_generator import active_edge_bitmap, STAGES
 import networkx as nx
+import numpy as np
 from fixtures.conf import CONFIG
+from amlsim.alert_store import PendingAlert
+from amlsim.batch import run_batch
 from amlsim.normal_model import NormalModel
+from amlsim.param_files import ParamFiles
+
+
+def typology_conf(directory='paramFiles/typologies', inputs=None, **options):
+    """Configuration of the typology parameter set with a fixed seed
+    :param directory: Input parameter directory
+    :param inputs: Input file names replacing the default ones
+    :param options: Graph generator options replacing the default ones
+    :return: Configuration dict
+    """
+    conf = copy.deepcopy(CONFIG)
+    conf['general']['random_seed'] = 0  # The base graph may have a self loop with an unfixed seed
+    conf['input']['directory'] = directory
+    conf['input'].update(inputs or dict())
+    conf['graph_generator']['degree_threshold'] = 1
+    conf['graph_generator'].update(options)
+    return conf
 
 
 class TransactionGraphGeneratorTests(unittest.TestCase):
@@ -19,6 +47,12 @@ class TransactionGraphGeneratorTests(unittest.TestCase):
         ))
 
 
+    def test_get_degree_sequence(self):
+        result = get_degree_sequence('tests/csv/degree.csv', 24)
+        self.assertEqual(result.num_nodes, 24)
+        self.assertEqual(result.in_degrees().tolist(), [2, 2, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1] * 2)
+
+
     def test_get_in_and_out_degrees_no_padding(self):
         result = get_in_and_out_degrees([
             ['1', '2', '4'],
@@ -116,34 +150,388 @@ class TransactionGraphGeneratorTests(unittest.TestCase):
         self.assertEqual(G.selfloop_edges(), [])
 
 
+    def test_directed_configuration_model_edges_keeps_degrees(self):
+        in_deg = [10, 1, 3, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+        out_deg = [2, 10, 2, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+        src, dst = directed_configuration_model_edges(in_deg, out_deg, 0)
+        self.assertEqual(np.bincount(dst, minlength=12).tolist(), in_deg)
+        self.assertEqual(np.bincount(src, minlength=12).tolist(), out_deg)
+        self.assertFalse(np.any(src == dst))
+
+
+    def test_directed_configuration_model_edges_same_seed_same_edges(self):
+        in_deg = [2, 2, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1]
+        out_deg = [0, 0, 2, 1, 1, 0, 0, 0, 1, 1, 0, 0]
+        src1, dst1 = directed_configuration_model_edges(in_deg, out_deg, 3)
+        src2, dst2 = directed_configuration_model_edges(in_deg, out_deg, 3)
+        self.assertEqual(src1.tolist(), src2.tolist())
+        self.assertEqual(dst1.tolist(), dst2.tolist())
+
+
+    def test_directed_configuration_model_edges_unequal_sums_throws(self):
+        with self.assertRaises(nx.NetworkXError):
+            directed_configuration_model_edges([1, 1], [1, 0], 0)
+
+
+    def test_unique_edges(self):
+        src, dst = unique_edges([2, 0, 2, 1], [1, 2, 1, 0], 3)
+        self.assertEqual(list(zip(src.tolist(), dst.tolist())), [(0, 2), (1, 0), (2, 1)])
+
+
+    def test_rewire_simple_edges_removes_loops_and_parallel_edges(self):
+        in_deg = [3, 3, 4, 4, 1, 1, 0, 0, 0, 0]
+        out_deg = [0, 0, 1, 1, 3, 3, 3, 3, 1, 1]
+        src = [4, 4, 4, 5, 5, 5, 6, 6, 6, 7, 7, 7, 2, 3, 8, 9]
+        dst = [0, 0, 0, 1, 1, 1, 2, 2, 2, 3, 3, 3, 2, 3, 4, 5]
+        src, dst = rewire_simple_edges(src, dst, 10, 0)
+        self.assertFalse(np.any(src == dst))
+        self.assertEqual(len(set(zip(src.tolist(), dst.tolist()))), 16)
+        report = degree_sequence_report(src, dst, in_deg, out_deg)
+        self.assertEqual(report['in_degree_error'], 0)
+        self.assertEqual(report['out_degree_error'], 0)
+
+
+    def test_degree_sequence_report(self):
+        report = degree_sequence_report(np.array([0, 1]), np.array([1, 0]), [1, 2], [1, 1])
+        self.assertEqual(report['requested_edges'], 3)
+        self.assertEqual(report['realized_edges'], 2)
+        self.assertEqual(report['in_degree_error'], 1)
+        self.assertEqual(report['out_degree_error'], 0)
+        self.assertEqual(report['exact_in_degree_ratio'], 0.5)
+
+
     def test_mark_active_edges_marks_default_as_false(self):
         G = nx.DiGraph()
         G.add_nodes_from([1, 2, 3])
-        G.add_edge(2, 3)
+        G.add_edge(2, 3, edge_id=0)
 
         txg = TransactionGenerator(CONFIG)
         txg.g = G
+        txg.edge_id = 1
         txg.mark_active_edges()
-        self.assertEqual(txg.g[2][3]['active'], False)
+        self.assertEqual(txg.is_active_edge(2, 3), False)
 
 
     def test_mark_active_edges_marks_real_path_as_active(self):
         G = nx.DiGraph()
         G.add_nodes_from([1, 2, 3])
-        G.add_edge(2, 3)
-        G.add_edge(1, 2)
+        G.add_edge(2, 3, edge_id=0)
+        G.add_edge(1, 2, edge_id=1)
 
         txg = TransactionGenerator(CONFIG)
         txg.g = G
+        txg.edge_id = 2
         txg.normal_models = [
             NormalModel(
                 1, 'single', {2,3}, 2
             )
         ]
         txg.mark_active_edges()
-        self.assertEqual(txg.g[2][3]['active'], True)
-        self.assertEqual(txg.g[1][2]['active'], False)
+        self.assertEqual(txg.is_active_edge(2, 3), True)
+        self.assertEqual(txg.is_active_edge(1, 2), False)
+
+
+    def test_active_edge_bitmap_joins_same_group_members(self):
+        src = np.array([0, 1, 2, 3, 0, 4])
+        dst = np.array([1, 2, 3, 0, 3, 0])
+        groups = [{0, 1}, {1, 2, 3}, {3, 0}]
+        active = active_edge_bitmap(src, dst, np.array([5, 4, 3, 2, 1, 0]), 6, groups)
+        self.assertEqual(active.tolist(), [False, True, True, True, True, True])
+        self.assertEqual(active_edge_bitmap(src, dst, np.arange(6), 6, []).tolist(), [False] * 6)
+
+
+    def test_active_edge_bitmap_chunks_match_subgraphs(self):
+        rand = random.Random(0)
+        g = nx.gnm_random_graph(50, 300, seed=0, directed=True)
+        for edge_id, (orig, bene) in enumerate(g.edges()):
+            g.edge[orig][bene]['edge_id'] = edge_id
+        groups = [rand.sample(range(50), rand.randint(2, 8)) for _ in range(20)]
+        groups.append(list(range(5)))  # Accounts in many groups
+        groups.extend([[0, 1, 2]] * 3)
+        expected = [False] * g.number_of_edges()
+        for members in groups:
+            for _, _, edge_id in g.subgraph(members).edges(data='edge_id'):
+                expected[edge_id] = True
+        src, dst, edge_ids = (np.array(c) for c in zip(*g.edges(data='edge_id')))
+        for chunk_size in (1, 7, 1000):
+            active = active_edge_bitmap(src, dst, edge_ids, len(expected), groups, chunk_size)
+            self.assertEqual(active.tolist(), expected)
+
+
+    def build_batch_generator(self):
+        conf = copy.deepcopy(CONFIG)
+        conf['general']['random_seed'] = 0  # The base graph may have a self loop with an unfixed seed
+        txg = TransactionGenerator(conf)
+        txg.set_num_accounts()
+        txg.generate_normal_transactions()
+        txg.load_account_list()
+        txg.hub_index.degree_threshold = 1
+        txg.set_main_acct_candidates()
+        return txg
+
+
+    def test_add_aml_typologies_cycle(self):
+        txg = self.build_batch_generator()
+        num_edges = txg.g.number_of_edges()
+        self.assertEqual(txg.add_aml_typologies(True, 'cycle', 2, 3, 3, 100.0, 200.0, 5, 10), 2)
+        self.assertEqual(len(txg.alert_groups), 2)
+        members = set()
+        for sub_g in txg.alert_groups.values():
+            self.assertEqual(sub_g.number_of_nodes(), 3)
+            self.assertEqual(sub_g.number_of_edges(), 3)
+            self.assertEqual(sub_g.in_degree(sub_g.graph['main_acct']), 1)
+            members.update(sub_g.nodes())
+            edges = sorted(sub_g.edges(data=True), key=lambda e: e[2]['date'])
+            for _, _, attr in edges:
+                self.assertTrue(sub_g.graph['start'] <= attr['date'] <= sub_g.graph['end'])
+            amounts = [attr['amount'] for _, _, attr in edges]
+            self.assertEqual(amounts, sorted(amounts, reverse=True))
+            for n in sub_g.nodes():
+                self.assertTrue(txg.accounts.is_sar[n])
+        self.assertEqual(len(members), 6)
+        self.assertEqual(len(txg.candidate_accts), 2)
+        self.assertLessEqual(txg.g.number_of_edges(), num_edges + 6)
+
+
+    def test_add_aml_typologies_fan_in(self):
+        txg = self.build_batch_generator()
+        self.assertEqual(txg.add_aml_typologies(False, 'fan_in', 1, 4, 4, 100.0, 200.0, 5, 10), 1)
+        sub_g = txg.alert_groups[0]
+        main_acct = sub_g.graph['main_acct']
+        self.assertEqual(sub_g.in_degree(main_acct), 3)
+        amounts = set(attr['amount'] for _, _, attr in sub_g.edges(data=True))
+        self.assertEqual(len(amounts), 1)
+        for orig, bene in sub_g.edges():
+            self.assertIn('edge_id', txg.g[orig][bene])
+
+
+    def test_add_edges_info_assigns_contiguous_edge_ids(self):
+        txg = self.build_batch_generator()
+        edge_id = txg.edge_id
+        src, dst = [0, 1], [3, 5]
+        txg.g.add_edges_from(zip(src, dst))
+        out_degree = txg.hub_index.out_degrees[0]
+        self.assertEqual(txg.add_edges_info(src, dst).tolist(), [edge_id, edge_id + 1])
+        self.assertEqual(txg.g[0][3]['edge_id'], edge_id)
+        self.assertEqual(txg.g[1][5]['edge_id'], edge_id + 1)
+        self.assertEqual(txg.edge_id, edge_id + 2)
+        self.assertEqual(txg.hub_index.out_degrees[0], out_degree + 1)
+
+
+    def test_hub_degrees_count_only_new_edges(self):
+        for backend in ('networkx', 'csr'):
+            for batch in (False, True):
+                txg = TransactionGenerator(typology_conf(graph_backend=backend, batch_typologies=batch))
+                for _, methods in STAGES[:5]:  # Up to alert_patterns
+                    for method in methods:
+                        getattr(txg, method)()
+                orig, bene = next(iter(txg.g.edges()))
+                txg.add_typology_edge(PendingAlert(1, 'fan_out', 2, 0, 10), orig, bene, 100.0, 1)  # Existing edge
+                accts = list(range(txg.num_accounts))
+                self.assertEqual([txg.hub_index.in_degrees[a] for a in accts], [txg.g.in_degree(a) for a in accts])
+                self.assertEqual([txg.hub_index.out_degrees[a] for a in accts],
+                                 [txg.g.out_degree(a) for a in accts])
+
+
+    def test_add_edges_info_bad_edges_throw(self):
+        txg = self.build_batch_generator()
+        with self.assertRaises(ValueError):
+            txg.add_edges_info([0, 1], [2, 1])
+        with self.assertRaises(KeyError):
+            txg.add_edges_info([0], [10000])
+        with self.assertRaises(ValueError):
+            txg.add_edges_info([0, 1], [2])
+
+
+    def test_load_edgelists_maps_template_nodes_to_members(self):
+        txg = self.build_batch_generator()
+        edge_id = txg.edge_id
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'topology.csv')
+            with open(path, 'w') as wf:
+                wf.write('a,b\nb,c\n')
+            edge_ids = txg.load_edgelists([[10, 11, 12], [20, 21, 22]], path)
+            txg.load_edgelist([30, 31, 32], path)
+        self.assertEqual(edge_ids.tolist(), list(range(edge_id, edge_id + 4)))
+        self.assertEqual(txg.g[10][11]['edge_id'], edge_id)
+        self.assertEqual(txg.g[11][12]['edge_id'], edge_id + 1)
+        self.assertEqual(txg.g[21][22]['edge_id'], edge_id + 3)
+        self.assertEqual(txg.g[31][32]['edge_id'], edge_id + 5)
+        self.assertEqual(len(txg.topology_templates), 1)
+
+
+    def test_alert_store_keeps_member_amount_ranges(self):
+        txg = self.build_batch_generator()
+        txg.add_aml_typologies(False, 'bipartite', 1, 4, 4, 100.0, 200.0, 5, 10)
+        alerts = txg.alert_groups
+        sub_g = alerts[0]
+        begin, end = alerts.member_range(0)
+        for i in range(begin, end):
+            acct = alerts.members[i]
+            amounts = [attr['amount'] for orig, bene, attr in sub_g.edges(data=True) if acct in (orig, bene)]
+            self.assertEqual(alerts.min_amounts[i], min(amounts))
+            self.assertEqual(alerts.max_amounts[i], max(amounts))
+
+
+    def test_base_graph_cache_reproduces_graph_and_random_state(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            conf = copy.deepcopy(CONFIG)
+            conf['general']['random_seed'] = 0
+            conf['graph_generator']['base_graph_cache_dir'] = cache_dir
+            results = list()
+            for _ in range(2):
+                txg = TransactionGenerator(conf)
+                txg.set_num_accounts()
+                txg.generate_normal_transactions()
+                results.append((txg.g.edges(data=True), random.random()))
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            self.assertEqual(results[0], results[1])
+
+
+
+    def test_generate_sharded_merges_banks(self):
+        txg = TransactionGenerator(typology_conf())
+        txg.generate_sharded(2)
+        txg.mark_active_edges()
+        self.assertEqual(txg.num_accounts, 389)
+        self.assertEqual(sorted(txg.get_all_bank_ids()), ['bank_a', 'bank_b', 'bank_c'])
+        src, dst, edge_ids = txg.get_edge_id_arrays()
+        self.assertEqual(sorted(edge_ids.tolist()), list(range(txg.edge_id)))
+        self.assertTrue((src != dst).all())
+        banks = np.array([txg.acct_to_bank[acct] for acct in range(txg.num_accounts)])
+        self.assertTrue((banks[src] != banks[dst]).any())
+        self.assertEqual(len(txg.alert_groups), 8)  # All typologies of the parameter file are cross-bank
+        for acct in txg.alert_groups.members:
+            self.assertTrue(txg.accounts.is_sar[acct])
+            self.assertNotIn(acct, txg.candidate_accts)
+        self.assertEqual([nm.id for nm in txg.normal_models], list(range(1, len(txg.normal_models) + 1)))
+        for nm in txg.normal_models:
+            for acct in nm.node_ids:
+                self.assertIn(acct, txg.g)
+        self.assertTrue(txg.active_edges.any())
+
+
+    def test_generate_sharded_bank_local_typologies(self):
+        with tempfile.TemporaryDirectory() as input_dir:
+            for name in os.listdir('paramFiles/typologies'):
+                shutil.copy(os.path.join('paramFiles/typologies', name), input_dir)
+            with open(os.path.join(input_dir, 'alertPatterns.csv'), 'w') as wf:
+                wf.write('count,type,schedule_id,min_accounts,max_accounts,min_amount,max_amount,'
+                         'min_period,max_period,bank_id,is_sar\n')
+                wf.write('2,cycle,2,3,3,100,200,10,20,bank_c,True\n')
+                wf.write('1,fan_out,2,4,4,100,200,10,20,,True\n')
+            txg = TransactionGenerator(typology_conf(input_dir))
+            txg.generate_sharded(2)
+        alerts = txg.alert_groups
+        self.assertEqual([alerts.reason(i) for i in alerts], ['cycle', 'cycle', 'fan_out'])
+        for alert_id in range(2):
+            begin, end = alerts.member_range(alert_id)
+            self.assertEqual(set(txg.acct_to_bank[acct] for acct in alerts.members[begin:end]), {'bank_c'})
+            sub_g = alerts[alert_id]
+            for orig, bene in sub_g.edges():
+                self.assertIn('edge_id', txg.g[orig][bene])
+
+
+    def run_and_read_outputs(self, conf, max_bytes=None):
+        with tempfile.TemporaryDirectory() as output_dir:
+            conf = copy.deepcopy(conf)
+            conf['temporal']['directory'] = output_dir
+            txg = TransactionGenerator(conf)
+            if max_bytes is not None:
+                txg.set_memory_budget(max_bytes)
+            for _, methods in STAGES:
+                for method in methods:
+                    getattr(txg, method)()
+                txg.check_memory_budget()
+            txg.export()
+            outputs = self.read_outputs(txg.output_dir)
+        return txg, outputs
+
+
+    @staticmethod
+    def read_outputs(output_dir):
+        outputs = dict()
+        for name in os.listdir(output_dir):
+            with open(os.path.join(output_dir, name), 'r') as rf:
+                outputs[name] = rf.read()
+        return outputs
+
+
+    def test_memory_budget_spills_same_outputs(self):
+        conf = typology_conf(inputs={'normal_models': 'normalModels.csv'})
+        _, expected = self.run_and_read_outputs(conf)
+        txg, outputs = self.run_and_read_outputs(conf, max_bytes=1)
+        self.assertEqual(sorted(outputs.keys()), ['accounts.csv', 'alert_members.csv', 'normal_models.csv',
+                                                  'transactions.csv'])
+        self.assertEqual(outputs, expected)
+        self.assertEqual(len(txg.normal_models), 0)
+        self.assertEqual(txg.num_spilled_alerts, 8)
+        self.assertGreater(txg.num_spilled_edges, 0)
+        self.assertEqual(txg.g.number_of_edges(), 0)
+
+
+    def test_alias_tx_types_and_degree_main_accounts(self):
+        with tempfile.TemporaryDirectory() as input_dir:
+            for name in os.listdir('paramFiles/typologies'):
+                shutil.copy(os.path.join('paramFiles/typologies', name), input_dir)
+            with open(os.path.join(input_dir, 'transactionType.csv'), 'w') as wf:
+                wf.write('Type,Frequency\nTRANSFER,2.5\nCASH-IN,0.5\n')
+            conf = typology_conf(input_dir, {'transaction_type': 'transactionType.csv',
+                                             'normal_models': 'normalModels.csv'}, main_account_selection='degree')
+            with self.assertRaises(ValueError):  # Fractional frequencies need the alias sampler
+                self.run_and_read_outputs(conf)
+            conf['graph_generator']['tx_type_sampler'] = 'alias'
+            txg, outputs = self.run_and_read_outputs(conf)
+        self.assertTrue(txg.hub_index.weighted)
+        self.assertEqual(len(txg.alert_groups), 8)
+        types = [line.split(',')[3] for line in outputs['transactions.csv'].splitlines()[1:]]
+        self.assertEqual(set(types), {'TRANSFER', 'CASH-IN'})
+        self.assertGreater(types.count('TRANSFER'), types.count('CASH-IN'))
+
+
+    def test_base_model_without_degree_file(self):
+        conf = typology_conf(inputs={'degree': 'missing_degree.csv', 'normal_models': 'normalModels.csv'},
+                             base_model={'type': 'powerlaw', 'mean_degree': 3.0, 'max_degree': 30})
+        txg, outputs = self.run_and_read_outputs(conf)
+        _, expected = self.run_and_read_outputs(conf)
+        self.assertEqual(outputs, expected)
+        self.assertEqual(txg.num_accounts, 389)
+        deg_seq = txg.degree_sequence()
+        self.assertEqual(deg_seq.num_nodes, 389)
+        self.assertEqual(deg_seq.total_in_degree, deg_seq.total_out_degree)
+        self.assertGreater(txg.g.number_of_edges(), 389)
+        self.assertEqual(len(txg.alert_groups), 8)
+
+
+    def test_count_fan_in_out_patterns(self):
+        txg = TransactionGenerator(typology_conf())
+        for _, methods in STAGES[:5]:  # Up to alert_patterns
+            for method in methods:
+                getattr(txg, method)()
+        with self.assertLogs('transaction_graph_generator', level='INFO') as logs:
+            txg.count_fan_in_out_patterns(3)
+        self.assertEqual(len(logs.output), 4)
+
 
+    def test_batch_same_outputs_as_single_seeds(self):
+        conf = typology_conf(inputs={'normal_models': 'normalModels.csv'})
+        param_files = ParamFiles(conf['input']['directory'])
+        with tempfile.TemporaryDirectory() as output_dir:
+            tasks = list()
+            for seed in (1, 2):
+                seed_conf = copy.deepcopy(conf)
+                seed_conf['general']['random_seed'] = seed
+                seed_conf['temporal']['directory'] = output_dir
+                tasks.append((TransactionGenerator, seed_conf, 'batch_%d' % seed, STAGES))
+            results = run_batch(tasks, 1, param_files)
+            self.assertEqual([result.seed for result in results], [1, 2])
+            outputs = [self.read_outputs(result.output_dir) for result in results]
+        self.assertEqual([name for name, _ in results[0].stages], [name for name, _ in STAGES] + ['export'])
+        self.assertNotEqual(outputs[0], outputs[1])
+        for seed, output in zip((1, 2), outputs):
+            conf['general']['random_seed'] = seed
+            _, expected = self.run_and_read_outputs(conf)
+            self.assertEqual(output, expected)
 
 if __name__ == ' main ':
     unittest.main()
\ No newline at end of file
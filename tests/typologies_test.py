@@ -0,0 +1,77 @@
+import random
+import unittest
+
+import numpy as np
+
+from amlsim.typologies import Typology, TypologyRegistry, concat_ranges, create_registry, fragment_amount
+from amlsim.typologies import join_groups, product_edges
+
+
+class CustomTypology(Typology):
+    name = 'custom'
+    model_id = 100
+
+    def generate(self, txg, sub_g, num_accounts, min_amount, max_amount, start_date, end_date, is_external):
+        return None
+
+
+class TypologiesTests(unittest.TestCase):
+
+    def test_create_registry_model_ids(self):
+        registry = create_registry()
+        self.assertEqual(registry.model_ids(), {
+            'fan_out': 1, 'fan_in': 2, 'cycle': 3, 'bipartite': 4, 'stack': 5, 'random': 6,
+            'scatter_gather': 7, 'gather_scatter': 8, 'fragmented_deposit': 9, 'fragmented_withdrawal': 10
+        })
+
+
+    def test_batchable_typologies(self):
+        registry = create_registry()
+        batchable = [t.name for t in registry if t.batchable]
+        self.assertEqual(batchable, ['fan_out', 'fan_in', 'cycle', 'bipartite', 'stack',
+                                     'scatter_gather', 'gather_scatter'])
+
+
+    def test_register_custom_typology(self):
+        registry = create_registry()
+        registry.register(CustomTypology())
+        self.assertIn('custom', registry)
+        self.assertFalse(registry['custom'].batchable)
+        self.assertEqual(registry.model_ids()['custom'], 100)
+
+
+    def test_register_duplicates_throw(self):
+        registry = TypologyRegistry()
+        registry.register(CustomTypology())
+        with self.assertRaises(ValueError):
+            registry.register(CustomTypology())
+
+
+    def test_record(self):
+        typology = CustomTypology()
+        typology.record(0.5, 3)
+        typology.record(0.25, 4, calls=2)
+        self.assertEqual(typology.calls, 3)
+        self.assertEqual(typology.edges, 7)
+        self.assertAlmostEqual(typology.seconds, 0.75)
+
+
+    def test_fragment_amount(self):
+        rand = random.Random(0)
+        amounts = fragment_amount(1000.0, 5, rand)
+        self.assertEqual(len(amounts), 5)
+        self.assertAlmostEqual(sum(amounts), 1000.0)
+
+
+    def test_join_groups(self):
+        self.assertEqual(concat_ranges([5, 0, 10], [2, 0, 3]).tolist(), [5, 6, 10, 11, 12])
+        joined, totals, begins = join_groups([np.array([1, 2, 3]), np.array([7, 8])], [[1, 2], [2, 0]])
+        self.assertEqual(joined.tolist(), [1, 7, 8, 2, 3])
+        self.assertEqual(totals.tolist(), [3, 2])
+        self.assertEqual(begins.tolist(), [[0, 1], [3, 5]])
+
+
+    def test_product_edges(self):
+        src, dst, counts = product_edges(np.array([0, 4]), np.array([2, 1]), np.array([2, 5]), np.array([2, 1]))
+        self.assertEqual(list(zip(src.tolist(), dst.tolist())), [(0, 2), (0, 3), (1, 2), (1, 3), (4, 5)])
+        self.assertEqual(counts.tolist(), [4, 1])